@@ -0,0 +1,410 @@
+"""
+Bulk import of voice memo archives.
+
+Walks a directory and feeds every audio file through WhisperTranscriber and
+VoiceNotesAgent in-process (no HTTP), several files at a time.
+
+Progress is kept in a JSONL checkpoint file, so an interrupted import can be
+re-run with the same command and continues where it stopped:
+
+- files are identified by content hash, so moved or duplicated recordings
+  are processed once;
+- transcriptions are checkpointed, a retry does not pay for Whisper again;
+- vault writes are buffered and committed every --commit-every notes; a
+  note is marked done only after the commit with its writes, so notes cut
+  off by a crash are re-run without duplicating vault content.
+  (Calendar events are created immediately; a re-run of the same note is
+  caught by the free/busy conflict check.)
+
+Usage:
+    voice-notes-import ~/Recordings
+    voice-notes-import ~/Recordings --concurrency 8 --checkpoint import.jsonl
+    voice-notes-import ~/Recordings --retry-failed
+    python -m app.cli ~/Recordings --dry-run
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from app.config import settings
+from app.services.agent import VoiceNotesAgent
+from app.services.fast_path import FastPath
+from app.services.free_busy import FreeBusyService
+from app.services.github_vault import GitHubVaultService
+from app.services.log_pipeline import configure_logging
+from app.services.google_calendar import GoogleCalendarService
+from app.services.model_router import ModelRouter
+from app.services.transcriber import AUDIO_EXTENSIONS, WhisperTranscriber
+from app.services.vault_batch import BufferedVault
+
+logger = logging.getLogger("voice_notes_import")
+
+# Checkpoint stages
+TRANSCRIBED = "transcribed"
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+
+class Checkpoint:
+    """
+    Append-only JSONL log of per-file progress; the last record of a file wins.
+
+    Every record is flushed and fsynced before the next step starts, so the
+    file is accurate up to the moment of a crash.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.state: dict[str, dict] = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last line after a crash
+                        continue
+                    self.state.setdefault(record["key"], {}).update(record)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def get(self, key: str) -> dict | None:
+        return self.state.get(key)
+
+    def record(self, key: str, stage: str, **fields) -> None:
+        record = {"key": key, "stage": stage, "at": time.strftime("%Y-%m-%dT%H:%M:%S"), **fields}
+        self.state.setdefault(key, {}).update(record)
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class Progress:
+    """Live throughput / ETA line on stderr."""
+
+    def __init__(self, total: int, interval: float = 2.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._task: asyncio.Task | None = None
+
+    def line(self) -> str:
+        finished = self.done + self.failed
+        elapsed = time.monotonic() - self.started
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - finished) / rate if rate > 0 else None
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta is not None else "--:--:--"
+        return (
+            f"{finished}/{self.total} files ({self.failed} failed) | "
+            f"{rate * 60:.1f} files/min | elapsed {time.strftime('%H:%M:%S', time.gmtime(elapsed))} | "
+            f"ETA {eta_text}"
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            print(f"\r{self.line()}", end="", file=sys.stderr, flush=True)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        print(f"\r{self.line()}", file=sys.stderr, flush=True)
+
+
+class BulkImporter:
+    """
+    Runs files through transcription and the agent with bounded concurrency.
+
+    Args:
+        transcriber: WhisperTranscriber
+        agent: VoiceNotesAgent
+        fast_path: FastPath or None
+        vault: GitHubVaultService (writes are buffered and committed in groups)
+        checkpoint: Checkpoint
+        concurrency: Files processed at the same time
+        commit_every: Notes per vault commit
+    """
+
+    def __init__(
+        self,
+        transcriber: WhisperTranscriber,
+        agent: VoiceNotesAgent,
+        fast_path: FastPath | None,
+        vault: GitHubVaultService,
+        checkpoint: Checkpoint,
+        concurrency: int = 4,
+        commit_every: int = 20
+    ):
+        self.transcriber = transcriber
+        self.agent = agent
+        self.fast_path = fast_path
+        self.buffer = BufferedVault(vault)
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.commit_every = commit_every
+
+        # Notes whose agent run finished and that wait for the next vault commit
+        self._uncommitted: list[tuple[str, str]] = []
+        # A commit waits until no agent run is half-way through its writes
+        self._agents_running = 0
+        self._flushing = False
+        self._gate = asyncio.Condition()
+        self._note_index = 0
+        self.progress = Progress(0)
+
+    async def run(self, files: list[tuple[Path, str]], progress: Progress) -> None:
+        self.progress = progress
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in files:
+            queue.put_nowait(item)
+
+        async def worker():
+            while True:
+                try:
+                    path, key = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self.process(path, key)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        await self.flush()
+
+    async def process(self, path: Path, key: str) -> None:
+        """Transcribes (unless checkpointed) and runs the agent for one file."""
+        state = self.checkpoint.get(key) or {}
+        stage = "transcription"
+        try:
+            transcription = state.get("transcription")
+            if transcription is None:
+                transcription = await self.transcriber.transcribe(str(path))
+                self.checkpoint.record(key, TRANSCRIBED, file=str(path), transcription=transcription)
+
+            stage = "agent"
+            async with self._gate:
+                await self._gate.wait_for(lambda: not self._flushing)
+                self._agents_running += 1
+            try:
+                self._note_index += 1
+                self.checkpoint.record(key, STARTED, file=str(path))
+                summary = await self._run_agent(transcription, self.buffer.view(self._note_index))
+            finally:
+                async with self._gate:
+                    self._agents_running -= 1
+                    self._gate.notify_all()
+        except Exception as e:
+            logger.error("%s: %s failed: %s", path, stage, e)
+            self.checkpoint.record(key, FAILED, file=str(path), error=f"{stage}: {e}")
+            self.progress.failed += 1
+            return
+
+        self._uncommitted.append((key, summary))
+        if len(self._uncommitted) >= self.commit_every:
+            await self.flush()
+
+    async def _run_agent(self, transcription: str, vault) -> str:
+        result = await self.fast_path.run(transcription, vault=vault) if self.fast_path else None
+        if result is None:
+            result = await self.agent.process_transcription(transcription, vault=vault)
+        return result["summary"]
+
+    async def flush(self) -> None:
+        """Commits buffered vault writes and marks the notes behind them done."""
+        async with self._gate:
+            if self._flushing:
+                return
+            self._flushing = True
+            await self._gate.wait_for(lambda: self._agents_running == 0)
+        try:
+            notes, self._uncommitted = self._uncommitted, []
+            if not notes:
+                return
+            try:
+                sha = await self.buffer.flush(f"Voice import: {len(notes)} notes")
+            except Exception as e:
+                logger.error("Vault commit failed for %d notes: %s", len(notes), e)
+                for key, _ in notes:
+                    self.checkpoint.record(key, FAILED, error=f"vault commit: {e}")
+                self.progress.failed += len(notes)
+                return
+            for key, summary in notes:
+                self.checkpoint.record(key, DONE, summary=summary, commit=sha)
+            self.progress.done += len(notes)
+        finally:
+            async with self._gate:
+                self._flushing = False
+                self._gate.notify_all()
+
+
+def scan(directory: Path, recursive: bool = True) -> list[Path]:
+    """Audio files under directory, in a stable order."""
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        path for path in directory.glob(pattern)
+        if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS
+    )
+
+
+def file_key(path: Path) -> str:
+    """Content hash: the same recording is imported once, wherever it lives."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_services() -> tuple[WhisperTranscriber, VoiceNotesAgent, FastPath | None, GitHubVaultService]:
+    """Same services as the API server, without the background calendar mirror."""
+    vault = GitHubVaultService(
+        token=settings.github_token,
+        repo_owner=settings.github_repo_owner,
+        repo_name=settings.github_repo_name,
+        branch=settings.github_branch
+    )
+
+    calendar = None
+    if settings.google_calendar_credentials:
+        calendar = GoogleCalendarService(
+            credentials_json=settings.google_calendar_credentials,
+            calendar_id=settings.google_calendar_id,
+            timezone=settings.google_calendar_timezone,
+            max_workers=settings.google_calendar_max_workers,
+            request_timeout=settings.google_calendar_timeout_seconds
+        )
+        if settings.calendar_conflict_check:
+            calendar.free_busy = FreeBusyService(
+                calendar,
+                cache_seconds=settings.calendar_free_busy_cache_seconds,
+                work_start_hour=settings.calendar_work_start_hour,
+                work_end_hour=settings.calendar_work_end_hour
+            )
+
+    router = ModelRouter(
+        fast_model=settings.agent_fast_model,
+        strong_model=settings.agent_strong_model,
+        long_transcript_words=settings.agent_long_transcript_words,
+        complex_intents=settings.agent_complex_intents,
+        latency_budget_seconds=settings.agent_latency_budget_seconds,
+        timeout_seconds=settings.agent_llm_timeout_seconds,
+        max_tokens_cap=settings.agent_max_tokens_cap,
+        decision_log_path=settings.agent_routing_log_path,
+        latency_window_seconds=settings.agent_latency_window_seconds
+    )
+    agent = VoiceNotesAgent(
+        api_key=settings.openai_api_key,
+        vault_service=vault,
+        calendar_service=calendar,
+        router=router,
+        tool_result_tokens=settings.agent_tool_result_tokens,
+        run_result_tokens=settings.agent_run_result_tokens,
+        max_request_tokens=settings.agent_max_request_tokens,
+        max_request_cost_usd=settings.agent_max_request_cost_usd,
+        prompt_variant=settings.agent_prompt_variant,
+        timezone=settings.google_calendar_timezone
+    )
+    fast_path = FastPath(
+        vault=vault,
+        min_confidence=settings.fast_path_min_confidence,
+        timezone=settings.google_calendar_timezone
+    ) if settings.fast_path_enabled else None
+    transcriber = WhisperTranscriber(api_key=settings.openai_api_key)
+    return transcriber, agent, fast_path, vault
+
+
+async def run_import(args: argparse.Namespace) -> int:
+    directory = Path(args.directory).expanduser()
+    if not directory.is_dir():
+        print(f"❌ Not a directory: {directory}", file=sys.stderr)
+        return 2
+
+    checkpoint = Checkpoint(Path(args.checkpoint or directory / ".voice-import.jsonl").expanduser())
+    paths = scan(directory, recursive=not args.no_recursive)
+    keys = await asyncio.gather(*(asyncio.to_thread(file_key, path) for path in paths))
+
+    todo, seen = [], set()
+    skipped_done = skipped_failed = duplicates = 0
+    for path, key in zip(paths, keys):
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        stage = (checkpoint.get(key) or {}).get("stage")
+        if stage == DONE:
+            skipped_done += 1
+        elif stage == FAILED and not args.retry_failed:
+            skipped_failed += 1
+        else:
+            todo.append((path, key))
+
+    print(
+        f"📂 {len(paths)} audio files: {len(todo)} to process, {skipped_done} already done, "
+        f"{skipped_failed} failed earlier (--retry-failed), {duplicates} duplicates",
+        file=sys.stderr
+    )
+    if args.dry_run or not todo:
+        checkpoint.close()
+        return 0
+
+    transcriber, agent, fast_path, vault = build_services()
+    importer = BulkImporter(
+        transcriber, agent, fast_path, vault, checkpoint,
+        concurrency=args.concurrency,
+        commit_every=args.commit_every
+    )
+    progress = Progress(len(todo))
+    progress.start()
+    try:
+        await importer.run(todo, progress)
+    finally:
+        await progress.stop()
+        checkpoint.close()
+
+    print(f"✅ {progress.done} imported, ❌ {progress.failed} failed (checkpoint: {checkpoint.path})", file=sys.stderr)
+    return 1 if progress.failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="voice-notes-import",
+        description="Import a directory of voice memos through the transcription + agent pipeline"
+    )
+    parser.add_argument("directory", help="Directory with audio files (m4a, mp3, wav, webm)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Files processed at the same time (default 4)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default <directory>/.voice-import.jsonl)")
+    parser.add_argument("--commit-every", type=int, default=20, help="Notes per vault commit (default 20)")
+    parser.add_argument("--retry-failed", action="store_true", help="Process files that failed in earlier runs again")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be processed")
+    args = parser.parse_args(argv)
+
+    log_listener = configure_logging(settings.log_level, settings.log_format, settings.log_queue_size)
+    # Per-request HTTP logs would drown the progress line
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    try:
+        return asyncio.run(run_import(args))
+    finally:
+        log_listener.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ class Settings(BaseSettings):
 
     # OpenAI
     openai_api_key: str
+    openai_prewarm: bool = True  # импортировать openai и создать клиенты в фоне после старта, а не на первом запросе
 
     # GitHub (для Obsidian vault)
     github_token: str
@@ -19,10 +20,105 @@ class Settings(BaseSettings):
     google_calendar_credentials_json: Optional[str] = None
     google_calendar_id: str = "primary"
     google_calendar_timezone: str = "Europe/Berlin"  # CET timezone
+    google_calendar_max_workers: int = 4  # потоки для синхронного googleapiclient
+    google_calendar_timeout_seconds: float = 30.0
+    google_calendar_prewarm: bool = True  # создать клиент в фоне при старте, а не на первом вызове
+    calendar_mirror_enabled: bool = True  # локальное зеркало событий с инкрементальной синхронизацией
+    calendar_mirror_refresh_seconds: float = 300.0
+    calendar_conflict_check: bool = True  # free/busy проверка перед созданием события
+    calendar_free_busy_cache_seconds: float = 120.0  # кэш freeBusy, когда зеркало недоступно
+    calendar_work_start_hour: int = 9  # рабочие часы для предлагаемых свободных окон
+    calendar_work_end_hour: int = 20
+
+    # Agent model routing
+    agent_fast_model: str = "gpt-4o-mini"
+    agent_strong_model: str = "gpt-4o"
+    agent_long_transcript_words: int = 250
+    agent_complex_intents: int = 3
+    agent_latency_budget_seconds: float = 8.0
+    agent_llm_timeout_seconds: float = 45.0
+    agent_latency_window_seconds: float = 300.0  # за сколько секунд учитываются задержки моделей
+    agent_max_tokens_cap: int = 8192
+    agent_routing_log_path: Optional[str] = None  # JSONL журнал решений роутера
+    agent_prompt_variant: str = "full"  # full | compact (короткий system prompt без большинства примеров)
+
+    # Бюджеты токенов на результаты tools в контексте агента
+    agent_tool_result_tokens: int = 1000
+    agent_run_result_tokens: int = 6000
+
+    # Бюджеты одного запроса (0 — без лимита): при превышении агент больше не вызывает модель
+    agent_max_request_tokens: int = 60000
+    agent_max_request_cost_usd: float = 0.0
+
+    # Fast path: тривиальные заметки без LLM
+    fast_path_enabled: bool = True
+    fast_path_min_confidence: float = 0.85
+
+    # Record/replay HTTP кассеты (off | record | replay)
+    cassette_mode: str = "off"
+    cassette_path: str = "cassettes/session.json"
+    cassette_latency: str = "recorded"  # recorded | none | секунды
+
+    # Асинхронные задания: POST /api/voice?mode=async
+    job_queue_path: str = "data/jobs.sqlite3"
+    job_audio_dir: str = "data/audio"  # аудио ожидающих заданий
+    job_workers: int = 2  # одновременно обрабатываемых заданий
+    job_max_attempts: int = 3
+    job_drain_timeout_seconds: float = 60.0  # сколько ждать текущие задания при остановке
+    job_retention_hours: float = 24.0  # через сколько удалять завершённые задания
+
+    # Пакетная загрузка: POST /api/voice/batch
+    voice_batch_max_files: int = 20
+    voice_batch_transcribe_concurrency: int = 4  # одновременных запросов к Whisper
+    voice_batch_agent_concurrency: int = 2  # одновременных прогонов агента
+
+    # Admission control: лимит одновременных запросов /api/voice и очередь ожидания
+    admission_max_in_flight: int = 8
+    admission_max_queue: int = 16  # сверх очереди — сразу 429
+    admission_max_wait_seconds: float = 20.0  # дольше в очереди — 503
+    admission_transcribe_concurrency: int = 4  # одновременных запросов к Whisper (все режимы)
+    admission_agent_concurrency: int = 4  # одновременных прогонов агента (все режимы)
+
+    # Tracing: спаны запроса -> транскрипция -> агент -> tools -> HTTP
+    tracing_service_name: str = "voice-notes-service"
+    tracing_jsonl_path: Optional[str] = None  # JSONL файл спанов для офлайн анализа
+    tracing_otlp_endpoint: Optional[str] = None  # OTLP/HTTP коллектор, например http://localhost:4318
+    tracing_otlp_headers: Optional[str] = None  # "key=value,key2=value2" (авторизация коллектора)
+
+    # Профилирование живых запросов по требованию (выключено: без middleware и /debug endpoints)
+    profiling_enabled: bool = False
+    profiling_token: Optional[str] = None  # X-Debug-Token; без него профилирование не включается
+    profiling_interval_ms: float = 5.0  # период сэмплирования стеков
+    profiling_dir: str = "data/profiles"
+    profiling_max_requests: int = 20  # сколько следующих запросов можно взвести за раз
+
+    # Readiness проверка /api/health/deep: пробы OpenAI, GitHub, Calendar
+    health_probe_timeout_seconds: float = 2.0  # таймаут одной пробы
+    health_cache_ttl_seconds: float = 15.0  # результат проб переиспользуется, пока не старше TTL
+
+    # Circuit breakers OpenAI, GitHub, Google Calendar: быстрый отказ вместо ожидания таймаутов
+    circuit_breaker_enabled: bool = True
+    circuit_failure_rate: float = 0.5  # доля неудачных вызовов в окне, при которой breaker открывается
+    circuit_min_calls: int = 5  # минимум вызовов в окне для решения
+    circuit_window_seconds: float = 60.0  # скользящее окно исходов
+    circuit_open_seconds: float = 30.0  # сколько отклонять вызовы до пробного (half-open)
+    circuit_half_open_max_calls: int = 1  # одновременных пробных вызовов
+    # Журнал записей в vault, пока GitHub недоступен; повторяется в фоне
+    vault_journal_enabled: bool = True
+    vault_journal_path: str = "data/vault_journal.jsonl"
+    vault_journal_replay_seconds: float = 30.0
+    vault_journal_max_attempts: int = 5  # после стольких неудачных повторов запись отбрасывается
+
+    # Watchdog event loop: лаг (гистограмма, перцентили в /api/stats) и стеки блокировок в логе
+    loop_watchdog_enabled: bool = True
+    loop_watchdog_interval_ms: float = 50.0  # период heartbeat
+    loop_block_threshold_ms: float = 100.0  # блокировка дольше порога логируется со стеком
 
     # App settings
     app_env: str = "development"
     log_level: str = "INFO"
+    log_format: str = "json"  # json — строка JSON на запись (request_id, trace_id); text — для локальной разработки
+    log_queue_size: int = 10000  # очередь фонового потока записи логов; при переполнении записи отбрасываются
     port: int = 8000
 
     @property
@@ -33,7 +129,7 @@ class Settings(BaseSettings):
                 return json.loads(self.google_calendar_credentials_json)
             except json.JSONDecodeError as e:
                 import logging
-                logging.error(f"Failed to parse GOOGLE_CALENDAR_CREDENTIALS_JSON: {e}")
+                logging.error("Failed to parse GOOGLE_CALENDAR_CREDENTIALS_JSON: %s", e)
                 return None
         return None
 
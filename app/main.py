@@ -1,72 +1,318 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+import asyncio
+import atexit
 import logging
+import math
 import tempfile
-import os
+import time
+import uuid
 from pathlib import Path
 
+import httpx
+
 from app.config import settings
-from app.models import VoiceNoteResponse, HealthCheckResponse
-from app.services.transcriber import WhisperTranscriber
+from app.models import (
+    VoiceNoteResponse, VoiceBatchItem, VoiceBatchResponse, HealthCheckResponse, DeepHealthResponse, JobResponse, Usage
+)
+from app.services.transcriber import WhisperTranscriber, Transcription, AUDIO_EXTENSIONS
 from app.services.agent import VoiceNotesAgent
+from app.services.model_router import ModelRouter
+from app.services.fast_path import FastPath
 from app.services.github_vault import GitHubVaultService
 from app.services.google_calendar import GoogleCalendarService
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.log_level),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+from app.services.calendar_mirror import CalendarMirror
+from app.services.free_busy import FreeBusyService
+from app.services.cassette import Cassette, CassetteTransport, CassetteHttp
+from app.services.job_queue import JobQueue, JobWorkerPool
+from app.services.vault_batch import BufferedVault
+from app.services.admission import AdmissionController, AdmissionMiddleware
+from app.services.health import DependencyHealth
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.write_journal import WriteJournal
+from app.services.profiler import Profiler, ProfilingMiddleware
+from app.services.loop_watchdog import LoopWatchdog
+from app.services.log_pipeline import RequestIdMiddleware, configure_logging, reset_request_id, set_request_id
+from app.services.metrics import (
+    REGISTRY, IN_FLIGHT, PROMPT_CACHE_RATIO, REQUEST_COST, REQUEST_TOKENS, STAGE_SECONDS
 )
+from app.services.usage import whisper_cost
+from app.services.tracing import JsonlExporter, OtlpHttpExporter, current_trace_id, tracer
+
+# Configure logging: records go through a queue to a background writer thread
+# (JSON lines with request_id and trace_id unless LOG_FORMAT=text)
+log_listener = configure_logging(settings.log_level, settings.log_format, settings.log_queue_size)
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
+# Tracing: spans are always recorded (trace_id in responses), exported only if configured
+trace_exporters = []
+if settings.tracing_jsonl_path:
+    trace_exporters.append(JsonlExporter(settings.tracing_jsonl_path, settings.tracing_service_name))
+if settings.tracing_otlp_endpoint:
+    otlp_headers = dict(
+        item.split("=", 1) for item in (settings.tracing_otlp_headers or "").split(",") if "=" in item
+    )
+    trace_exporters.append(
+        OtlpHttpExporter(settings.tracing_otlp_endpoint, settings.tracing_service_name, headers=otlp_headers)
+    )
+tracer.configure(trace_exporters)
+
+# Event loop lag and blocking-call detector (started in lifespan)
+loop_watchdog = LoopWatchdog(
+    threshold_ms=settings.loop_block_threshold_ms,
+    interval_ms=settings.loop_watchdog_interval_ms
+) if settings.loop_watchdog_enabled else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks: loop watchdog, job workers, trace export, OpenAI/calendar warm-up, mirror sync, journal replay, cleanup."""
+    if loop_watchdog:
+        loop_watchdog.start()
+    tracer.start()
+    if settings.openai_prewarm:
+        # The openai import is the bulk of a cold start: done in a thread once the server answers
+        asyncio.create_task(asyncio.to_thread(warm_up_openai))
+    for audio_path in await asyncio.to_thread(job_queue.prune, timedelta(hours=settings.job_retention_hours)):
+        await asyncio.to_thread(Path(audio_path).unlink, missing_ok=True)
+    await job_pool.start()
+    if calendar_service and settings.google_calendar_prewarm:
+        asyncio.create_task(calendar_service.warm_up())
+    if calendar_mirror:
+        calendar_mirror.start()
+    if write_journal:
+        write_journal.start()
+    yield
+    # Stop taking new jobs and let in-flight ones finish
+    await job_pool.stop(timeout=settings.job_drain_timeout_seconds)
+    job_queue.close()
+    if calendar_mirror:
+        await calendar_mirror.stop()
+    if write_journal:
+        await write_journal.stop()
+    if calendar_service:
+        calendar_service.close()
+    if loop_watchdog:
+        await loop_watchdog.stop()
+    # Flush exported traces last: shutdown work above is traced too
+    await asyncio.to_thread(tracer.shutdown)
+
+
 app = FastAPI(
     title="Voice Notes Service",
     description="AI-powered voice notes processing with Obsidian integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Back-pressure: bounded concurrency and wait queue for the processing endpoints,
+# fast 429/503 with Retry-After before the upload is read
+admission = AdmissionController(
+    max_in_flight=settings.admission_max_in_flight,
+    max_queue=settings.admission_max_queue,
+    max_wait_seconds=settings.admission_max_wait_seconds,
+    stage_limits={
+        "transcribe": settings.admission_transcribe_concurrency,
+        "agent": settings.admission_agent_concurrency
+    }
+)
+app.add_middleware(AdmissionMiddleware, controller=admission, paths={"/api/voice", "/api/voice/batch"})
+
+# On-demand profiler: without PROFILING_ENABLED there is no middleware and no /debug routes.
+# Added after admission, so it wraps it and profiles include the admission queue wait
+profiler = None
+if settings.profiling_enabled:
+    if settings.profiling_token:
+        profiler = Profiler(
+            token=settings.profiling_token,
+            output_dir=settings.profiling_dir,
+            interval_ms=settings.profiling_interval_ms,
+            max_armed=settings.profiling_max_requests
+        )
+        app.add_middleware(ProfilingMiddleware, profiler=profiler, paths={"/api/voice", "/api/voice/batch"})
+        logger.warning("Profiling enabled: /debug/profile endpoints are active, output in %s", settings.profiling_dir)
+    else:
+        logger.error("PROFILING_ENABLED requires PROFILING_TOKEN - profiling stays disabled")
+
+# Outermost: every log record of a request (including admission rejections) carries its X-Request-ID
+app.add_middleware(RequestIdMiddleware)
+
+# Record/replay cassette for OpenAI, GitHub and Google Calendar HTTP calls (off by default)
+cassette = None
+if settings.cassette_mode != "off":
+    cassette = Cassette(
+        settings.cassette_path,
+        mode=settings.cassette_mode,
+        latency=settings.cassette_latency
+    )
+    logger.warning("Cassette %s mode: %s", settings.cassette_mode, settings.cassette_path)
+
+
+def openai_http_client() -> httpx.AsyncClient | None:
+    """HTTP client for OpenAI SDK clients (cassette transport if enabled)."""
+    if cassette is None:
+        return None
+    return httpx.AsyncClient(transport=CassetteTransport(cassette, "openai"), timeout=600)
+
+
+# Circuit breakers: while a dependency is down, calls fail at once instead of waiting out timeouts
+breakers = {
+    name: CircuitBreaker(
+        name,
+        failure_rate=settings.circuit_failure_rate,
+        min_calls=settings.circuit_min_calls,
+        window_seconds=settings.circuit_window_seconds,
+        open_seconds=settings.circuit_open_seconds,
+        half_open_max_calls=settings.circuit_half_open_max_calls
+    )
+    for name in ("openai", "github", "google_calendar")
+} if settings.circuit_breaker_enabled else {}
+
 # Initialize services
 vault_service = GitHubVaultService(
     token=settings.github_token,
     repo_owner=settings.github_repo_owner,
     repo_name=settings.github_repo_name,
-    branch=settings.github_branch
+    branch=settings.github_branch,
+    transport=CassetteTransport(cassette, "github") if cassette else None,
+    breaker=breakers.get("github")
 )
 
+# Vault writes rejected by the GitHub breaker are journaled and replayed in the background (lifespan)
+write_journal = WriteJournal(
+    settings.vault_journal_path,
+    vault_service,
+    interval_seconds=settings.vault_journal_replay_seconds,
+    max_attempts=settings.vault_journal_max_attempts
+) if settings.vault_journal_enabled else None
+
 # Initialize Google Calendar (опционально)
 calendar_service = None
 logger.info("Checking Google Calendar configuration...")
-logger.info(f"GOOGLE_CALENDAR_CREDENTIALS_JSON is {'set' if settings.google_calendar_credentials_json else 'not set'}")
+logger.info(
+    "GOOGLE_CALENDAR_CREDENTIALS_JSON is %s", "set" if settings.google_calendar_credentials_json else "not set"
+)
 
 if settings.google_calendar_credentials:
     try:
-        logger.info(f"Initializing Google Calendar with calendar_id: {settings.google_calendar_id}, timezone: {settings.google_calendar_timezone}")
+        logger.info(
+            "Initializing Google Calendar with calendar_id: %s, timezone: %s",
+            settings.google_calendar_id, settings.google_calendar_timezone
+        )
         calendar_service = GoogleCalendarService(
             credentials_json=settings.google_calendar_credentials,
             calendar_id=settings.google_calendar_id,
-            timezone=settings.google_calendar_timezone
+            timezone=settings.google_calendar_timezone,
+            http_wrapper=(lambda http: CassetteHttp(cassette, "google_calendar", http)) if cassette else None,
+            max_workers=settings.google_calendar_max_workers,
+            request_timeout=settings.google_calendar_timeout_seconds,
+            breaker=breakers.get("google_calendar")
         )
-        logger.info("✅ Google Calendar service initialized successfully")
+        logger.info("✅ Google Calendar service configured (API client is created lazily)")
     except Exception as e:
-        logger.error(f"❌ Failed to initialize Google Calendar: {e}", exc_info=True)
+        logger.error("❌ Failed to initialize Google Calendar: %s", e, exc_info=True)
         logger.warning("Calendar integration will be disabled")
 else:
     logger.info("Google Calendar credentials not provided - calendar integration disabled")
 
-transcriber = WhisperTranscriber(api_key=settings.openai_api_key)
+# Local mirror of upcoming events (synced in the background from lifespan)
+calendar_mirror = None
+if calendar_service and settings.calendar_mirror_enabled:
+    calendar_mirror = CalendarMirror(calendar_service, refresh_seconds=settings.calendar_mirror_refresh_seconds)
+    calendar_service.mirror = calendar_mirror
+
+# Free/busy conflict check before inserting events
+free_busy = None
+if calendar_service and settings.calendar_conflict_check:
+    free_busy = FreeBusyService(
+        calendar_service,
+        mirror=calendar_mirror,
+        cache_seconds=settings.calendar_free_busy_cache_seconds,
+        work_start_hour=settings.calendar_work_start_hour,
+        work_end_hour=settings.calendar_work_end_hour
+    )
+    calendar_service.free_busy = free_busy
+
+transcriber = WhisperTranscriber(
+    api_key=settings.openai_api_key, http_client=openai_http_client(), breaker=breakers.get("openai")
+)
+model_router = ModelRouter(
+    fast_model=settings.agent_fast_model,
+    strong_model=settings.agent_strong_model,
+    long_transcript_words=settings.agent_long_transcript_words,
+    complex_intents=settings.agent_complex_intents,
+    latency_budget_seconds=settings.agent_latency_budget_seconds,
+    timeout_seconds=settings.agent_llm_timeout_seconds,
+    max_tokens_cap=settings.agent_max_tokens_cap,
+    decision_log_path=settings.agent_routing_log_path,
+    latency_window_seconds=settings.agent_latency_window_seconds
+)
 agent = VoiceNotesAgent(
     api_key=settings.openai_api_key,
     vault_service=vault_service,
-    calendar_service=calendar_service
+    calendar_service=calendar_service,
+    router=model_router,
+    tool_result_tokens=settings.agent_tool_result_tokens,
+    run_result_tokens=settings.agent_run_result_tokens,
+    max_request_tokens=settings.agent_max_request_tokens,
+    max_request_cost_usd=settings.agent_max_request_cost_usd,
+    prompt_variant=settings.agent_prompt_variant,
+    timezone=settings.google_calendar_timezone,
+    http_client=openai_http_client(),
+    breaker=breakers.get("openai"),
+    journal=write_journal
+)
+fast_path = FastPath(
+    vault=vault_service,
+    min_confidence=settings.fast_path_min_confidence,
+    timezone=settings.google_calendar_timezone,
+    journal=write_journal
+) if settings.fast_path_enabled else None
+
+
+def warm_up_openai() -> None:
+    """Import openai and build the transcriber/agent clients (blocking: call via asyncio.to_thread)."""
+    started = time.perf_counter()
+    transcriber.client, agent.client
+    logger.info("OpenAI clients ready in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+async def probe_openai() -> str:
+    """GET /v1/models/{model}: checks the API key without spending tokens."""
+    model = await transcriber.client.with_options(max_retries=0).models.retrieve(settings.agent_fast_model)
+    return model.id
+
+
+async def probe_github() -> str:
+    """GET /rate_limit: checks the token and that the rate limit is not exhausted."""
+    core = await vault_service.rate_limit()
+    if core["remaining"] == 0:
+        raise Exception(f"rate limit exhausted until {core['reset']}")
+    return f"{core['remaining']}/{core['limit']} requests left"
+
+
+async def probe_calendar() -> None:
+    await calendar_service.ping()
+
+
+# Readiness probes: concurrent, per-probe timeout, cached for HEALTH_CACHE_TTL_SECONDS
+dependency_health = DependencyHealth(
+    ttl_seconds=settings.health_cache_ttl_seconds,
+    timeout_seconds=settings.health_probe_timeout_seconds
 )
+dependency_health.add("openai", probe_openai)
+dependency_health.add("github", probe_github)
+if calendar_service:
+    # Notes still work without the calendar: a failing probe only degrades readiness
+    dependency_health.add("google_calendar", probe_calendar, required=False)
 
 
 @app.get("/api/health", response_model=HealthCheckResponse)
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check: cheap, contacts no dependency (see /api/health/deep for readiness)."""
     try:
-        # Basic health check - services are initialized on startup
-        # Could add actual API pings here if needed
         services_status = {
             "openai": "configured",
             "github": "configured",
@@ -82,7 +328,7 @@ async def health_check():
             }
         )
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         return JSONResponse(
             status_code=503,
             content={
@@ -92,78 +338,409 @@ async def health_check():
         )
 
 
+@app.get("/api/health/deep", response_model=DeepHealthResponse)
+async def deep_health_check():
+    """
+    Readiness check: probes OpenAI, GitHub and Google Calendar concurrently.
+
+    Results are cached for HEALTH_CACHE_TTL_SECONDS and concurrent callers share
+    one probe run. Returns 503 when a required dependency (OpenAI, GitHub) fails;
+    a failing calendar only makes the status "degraded".
+    """
+    report = await dependency_health.check()
+    response = DeepHealthResponse(**report.as_dict())
+    if report.status == "unhealthy":
+        return JSONResponse(status_code=503, content=response.model_dump())
+    return response
+
+
+@app.get("/api/stats")
+async def stats():
+    """Runtime statistics: model routing, fast path, calendar, job queue, admission queue depth/wait, event loop lag, circuit breakers."""
+    return {
+        "router": model_router.stats(),
+        "fast_path": fast_path.stats() if fast_path else None,
+        "calendar_mirror": calendar_mirror.stats() if calendar_mirror else None,
+        "free_busy": free_busy.stats() if free_busy else None,
+        "jobs": job_pool.stats(),
+        "admission": admission.stats(),
+        "event_loop": loop_watchdog.stats() if loop_watchdog else None,
+        "circuit_breakers": {name: breaker.stats() for name, breaker in breakers.items()},
+        "vault_journal": write_journal.stats() if write_journal else None
+    }
+
+
+def validate_audio(audio: UploadFile | None) -> str:
+    """Check the uploaded file and return its extension."""
+    if not audio:
+        raise HTTPException(status_code=400, detail="No audio file provided")
+
+    file_ext = Path(audio.filename).suffix.lower()
+    if file_ext not in AUDIO_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format. Allowed: {', '.join(AUDIO_EXTENSIONS)}"
+        )
+    return file_ext
+
+
+async def transcribe(audio_path: str) -> Transcription:
+    logger.info("Starting transcription...")
+    async with admission.stage("transcribe"):
+        with STAGE_SECONDS.time(stage="transcription"):
+            transcription = await transcriber.transcribe_verbose(audio_path)
+    logger.info(
+        "Transcription completed: %d characters, %ss of audio",
+        len(transcription.text), transcription.duration_seconds
+    )
+    return transcription
+
+
+def save_temp_audio(content: bytes, suffix: str) -> str:
+    """Write uploaded audio to a temporary file (blocking: call via asyncio.to_thread)."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file.write(content)
+    return temp_file.name
+
+
+def request_usage(agent_result: dict, audio_seconds: float | None) -> Usage:
+    """Usage of one voice note: agent tokens plus Whisper audio, with metrics."""
+    usage = Usage(**agent_result.get("usage", {}), audio_seconds=audio_seconds)
+    if audio_seconds is not None:
+        usage.cost_usd = round(usage.cost_usd + whisper_cost(audio_seconds), 6)
+    if usage.llm_calls:
+        for kind in ("prompt", "completion", "cached"):
+            REQUEST_TOKENS.observe(getattr(usage, f"{kind}_tokens"), kind=kind)
+    if usage.cache_hit_ratio is not None:
+        PROMPT_CACHE_RATIO.observe(usage.cache_hit_ratio, variant=agent_result["prompt"]["variant"])
+    REQUEST_COST.observe(usage.cost_usd)
+    return usage
+
+
+async def run_agent(transcription: str, vault=None, audio_seconds: float | None = None) -> VoiceNoteResponse:
+    """
+    Execute fast path / AI agent actions for a transcription.
+
+    Args:
+        transcription: Transcribed text
+        vault: Vault for tools instead of vault_service (batch write buffer)
+        audio_seconds: Duration of the transcribed audio (for usage and cost)
+    """
+    # Trivial notes go through the deterministic fast path, the rest to the AI agent
+    agent_result = None
+    if fast_path:
+        with tracer.span("fast_path") as span, STAGE_SECONDS.time(stage="fast_path"):
+            agent_result = await fast_path.run(transcription, vault=vault)
+            span.set_attribute("handled", agent_result is not None)
+    if agent_result is None:
+        logger.info("Processing with AI agent...")
+        async with admission.stage("agent"):
+            agent_started = time.perf_counter()
+            with tracer.span("agent.run", **{"transcription.chars": len(transcription)}):
+                agent_result = await agent.process_transcription(transcription, vault=vault)
+            agent_seconds = time.perf_counter() - agent_started
+        STAGE_SECONDS.observe(agent_seconds, stage="agent")
+        if fast_path:
+            fast_path.record_llm_run(agent_seconds)
+        logger.info(
+            "Agent processing completed: %d actions (model: %s, reason: %s, tool result tokens: %s -> %s, "
+            "memo hits: %s, tokens: %s (%s cached), $%.4f, prompt: %s %s)",
+            len(agent_result["actions"]), agent_result["routing"]["model"], agent_result["routing"]["reason"],
+            agent_result["tool_results"]["raw_tokens"], agent_result["tool_results"]["sent_tokens"],
+            agent_result["memo"]["hits"], agent_result["usage"]["total_tokens"],
+            agent_result["usage"]["cached_tokens"], agent_result["usage"]["cost_usd"],
+            agent_result["prompt"]["variant"], agent_result["prompt"]["fingerprint"]
+        )
+
+    return VoiceNoteResponse(
+        success=True,
+        transcription=transcription,
+        actions=agent_result["actions"],
+        agent_summary=agent_result["summary"],
+        usage=request_usage(agent_result, audio_seconds),
+        trace_id=current_trace_id()
+    )
+
+
+async def run_pipeline(audio_path: str) -> VoiceNoteResponse:
+    """
+    Transcribe an audio file and execute fast path / AI agent actions.
+
+    Raises on failure; callers decide how to report it.
+    """
+    transcription = await transcribe(audio_path)
+    return await run_agent(transcription.text, audio_seconds=transcription.duration_seconds)
+
+
+async def process_job(job: dict) -> dict:
+    """Job worker handler: run the pipeline on the stored audio, then delete it."""
+    audio_path = Path(job["audio_path"])
+    # Logs of a background job carry the job id as request id
+    request_id = set_request_id(f"job-{job['id']}")
+    try:
+        with tracer.span("voice.job", filename=job["filename"], **{"job.id": job["id"], "job.attempt": job["attempts"]}), \
+                IN_FLIGHT.track(endpoint="job"), STAGE_SECONDS.time(stage="total"):
+            response = await run_pipeline(str(audio_path))
+    except (asyncio.CancelledError, CircuitOpenError):
+        # Shutdown or a dependency outage: keep the audio, the job is retried later
+        raise
+    except Exception:
+        await asyncio.to_thread(audio_path.unlink, missing_ok=True)
+        raise
+    finally:
+        reset_request_id(request_id)
+    await asyncio.to_thread(audio_path.unlink, missing_ok=True)
+    return response.model_dump()
+
+
+# Per-stage limits for POST /api/voice/batch (shared by concurrent batches)
+batch_transcribe_slots = asyncio.Semaphore(settings.voice_batch_transcribe_concurrency)
+batch_agent_slots = asyncio.Semaphore(settings.voice_batch_agent_concurrency)
+
+# Durable queue and worker pool for POST /api/voice?mode=async
+Path(settings.job_audio_dir).mkdir(parents=True, exist_ok=True)
+job_queue = JobQueue(settings.job_queue_path, max_attempts=settings.job_max_attempts)
+job_pool = JobWorkerPool(job_queue, process_job, workers=settings.job_workers)
+
+
+def job_response(job: dict) -> JobResponse:
+    return JobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        filename=job["filename"],
+        attempts=job["attempts"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+        result=job["result"],
+        error=job["error"]
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: stage, agent, tool, GitHub and Calendar latency histograms, counters, gauges."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def require_debug_token(request: Request) -> None:
+    if not profiler.authorized(request.headers.get("x-debug-token")):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+async def arm_profiler(request: Request, requests: int = Query(1, ge=1)):
+    """Profile the next N voice requests (capped by PROFILING_MAX_REQUESTS)."""
+    require_debug_token(request)
+    return {"armed": profiler.arm(requests)}
+
+
+async def list_profiles(request: Request):
+    """Saved profiles, newest first."""
+    require_debug_token(request)
+    return {"armed": profiler.armed, "profiles": await asyncio.to_thread(profiler.list_profiles)}
+
+
+async def get_profile(request: Request, profile_id: str, kind: str = Query("wall", pattern="^(wall|async|summary)$")):
+    """
+    Download a profile.
+
+    kind: "wall" — folded stacks of all threads (flamegraph.pl, speedscope);
+    "async" — folded coroutine stacks of the request task; "summary" — JSON
+    with event loop lag and the hottest event loop frames.
+    """
+    require_debug_token(request)
+    path = profiler.profile_path(profile_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json" if kind == "summary" else "text/plain")
+
+
+if profiler is not None:
+    app.add_api_route("/debug/profile", arm_profiler, methods=["POST"])
+    app.add_api_route("/debug/profiles", list_profiles, methods=["GET"])
+    app.add_api_route("/debug/profiles/{profile_id}", get_profile, methods=["GET"])
+
+
 @app.post("/api/voice", response_model=VoiceNoteResponse)
-async def process_voice_note(audio: UploadFile = File(...)):
+async def process_voice_note(
+    request: Request,
+    audio: UploadFile = File(...),
+    mode: str = Query("sync", pattern="^(sync|async)$")
+):
     """
     Process voice note: transcribe audio and execute AI agent actions.
 
     Args:
         audio: Audio file (m4a, mp3, wav, webm)
+        mode: "sync" — wait for the result; "async" — queue a job and return 202
+            with its id (poll GET /api/jobs/{id})
 
     Returns:
-        VoiceNoteResponse with transcription and executed actions
+        VoiceNoteResponse with transcription, executed actions and trace_id
+        (or JobResponse with status 202 in async mode)
     """
     temp_file_path = None
 
-    try:
-        # Validate file
-        if not audio:
-            raise HTTPException(status_code=400, detail="No audio file provided")
-
-        # Validate file extension
-        allowed_extensions = {'.m4a', '.mp3', '.wav', '.webm'}
-        file_ext = Path(audio.filename).suffix.lower()
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file format. Allowed: {', '.join(allowed_extensions)}"
-            )
+    # Root span of the request; an incoming W3C traceparent continues the caller's trace
+    with tracer.span(
+        "voice.process", traceparent=request.headers.get("traceparent"), filename=audio.filename, mode=mode
+    ) as span:
+        try:
+            file_ext = validate_audio(audio)
+            logger.info("Processing voice note: %s (%s)", audio.filename, mode)
+            with STAGE_SECONDS.time(stage="upload"):
+                content = await audio.read()
+            span.set_attribute("audio.bytes", len(content))
 
-        logger.info(f"Processing voice note: {audio.filename}")
+            if mode == "async":
+                # Durable copy of the audio: the job survives a restart
+                audio_path = Path(settings.job_audio_dir) / f"{uuid.uuid4().hex}{file_ext}"
+                await asyncio.to_thread(audio_path.write_bytes, content)
+                job = await job_pool.submit(str(audio_path), audio.filename)
+                span.set_attribute("job.id", job["id"])
+                logger.info("Queued job %s for %s", job["id"], audio.filename)
+                return JSONResponse(status_code=202, content=job_response(job).model_dump())
 
-        # 1. Save temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            temp_file_path = temp_file.name
-            content = await audio.read()
-            temp_file.write(content)
+            # 1. Save temporary file (off the event loop)
+            temp_file_path = await asyncio.to_thread(save_temp_audio, content, file_ext)
 
-        logger.info(f"Saved temporary file: {temp_file_path}")
+            logger.debug("Saved temporary file: %s", temp_file_path)
 
-        # 2. Transcribe with Whisper
-        logger.info("Starting transcription...")
-        transcription = await transcriber.transcribe(temp_file_path)
-        logger.info(f"Transcription completed: {len(transcription)} characters")
+            # 2. Transcribe and process
+            with IN_FLIGHT.track(endpoint="voice"), STAGE_SECONDS.time(stage="total"):
+                return await run_pipeline(temp_file_path)
 
-        # 3. Process with AI agent
-        logger.info("Processing with AI agent...")
-        agent_result = await agent.process_transcription(transcription)
-        logger.info(f"Agent processing completed: {len(agent_result['actions'])} actions")
-
-        # 4. Return results
-        return VoiceNoteResponse(
-            success=True,
-            transcription=transcription,
-            actions=agent_result["actions"],
-            agent_summary=agent_result["summary"]
-        )
+        except HTTPException:
+            raise
+        except CircuitOpenError as e:
+            # OpenAI is down: fail fast with a hint when to retry instead of waiting out timeouts
+            logger.warning("Voice processing rejected: %s", e)
+            span.set_error(str(e))
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+        except Exception as e:
+            logger.error("Voice processing failed: %s", e, exc_info=True)
+            span.set_error(f"{type(e).__name__}: {e}")
+            return VoiceNoteResponse(
+                success=False,
+                error="Internal server error",
+                details=str(e),
+                trace_id=span.trace_id
+            )
+        finally:
+            # Clean up temporary file
+            if temp_file_path:
+                try:
+                    await asyncio.to_thread(Path(temp_file_path).unlink, missing_ok=True)
+                    logger.debug("Cleaned up temporary file: %s", temp_file_path)
+                except Exception as e:
+                    logger.warning("Failed to delete temporary file: %s", e)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Voice processing failed: {e}", exc_info=True)
-        return VoiceNoteResponse(
-            success=False,
-            error="Internal server error",
-            details=str(e)
+
+@app.post("/api/voice/batch", response_model=VoiceBatchResponse)
+async def process_voice_batch(request: Request, audio: list[UploadFile] = File(...)):
+    """
+    Process several voice notes in one request.
+
+    Transcription and agent runs overlap across files, bounded per stage by
+    VOICE_BATCH_TRANSCRIBE_CONCURRENCY / VOICE_BATCH_AGENT_CONCURRENCY.
+    Vault writes of the whole batch are buffered and committed once.
+
+    Returns:
+        VoiceBatchResponse with one result per file, in upload order;
+        a failing file does not affect the others. All files share one trace.
+    """
+    if len(audio) > settings.voice_batch_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files: {len(audio)} (max {settings.voice_batch_max_files})"
         )
-    finally:
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
+    logger.info("Processing voice batch: %d files", len(audio))
+    with tracer.span("voice.batch", traceparent=request.headers.get("traceparent"), files=len(audio)) as span:
+        response = await run_batch(audio)
+        response.trace_id = span.trace_id
+        return response
+
+
+async def run_batch(audio: list[UploadFile]) -> VoiceBatchResponse:
+    """Process the files of a batch concurrently and commit their vault writes once."""
+    buffer = BufferedVault(vault_service)
+    temp_paths: list[str | None] = [None] * len(audio)
+
+    async def process_one(index: int, upload: UploadFile) -> VoiceNoteResponse:
+        with tracer.span("voice.batch_file", index=index, filename=upload.filename) as span:
             try:
-                os.unlink(temp_file_path)
-                logger.info(f"Cleaned up temporary file: {temp_file_path}")
+                file_ext = validate_audio(upload)
+                with STAGE_SECONDS.time(stage="upload"):
+                    content = await upload.read()
+                temp_paths[index] = await asyncio.to_thread(save_temp_audio, content, file_ext)
+
+                async with batch_transcribe_slots:
+                    transcription = await transcribe(temp_paths[index])
+                async with batch_agent_slots:
+                    return await run_agent(
+                        transcription.text, vault=buffer.view(index), audio_seconds=transcription.duration_seconds
+                    )
+            except HTTPException as e:
+                span.set_error(str(e.detail))
+                return VoiceNoteResponse(success=False, error="Invalid file", details=e.detail, trace_id=span.trace_id)
             except Exception as e:
-                logger.warning(f"Failed to delete temporary file: {e}")
+                logger.error("Batch file %s failed: %s", upload.filename, e, exc_info=True)
+                span.set_error(f"{type(e).__name__}: {e}")
+                return VoiceNoteResponse(
+                    success=False, error="Internal server error", details=str(e), trace_id=span.trace_id
+                )
+
+    try:
+        with IN_FLIGHT.track(endpoint="voice_batch"):
+            results = await asyncio.gather(*(process_one(i, upload) for i, upload in enumerate(audio)))
+    finally:
+        for temp_path in temp_paths:
+            if temp_path:
+                await asyncio.to_thread(Path(temp_path).unlink, missing_ok=True)
+
+    # One vault commit for the whole batch; if it fails, only files that wrote get the error
+    vault_files = buffer.stats()["files"]
+    writers = buffer.writers()
+    commit_sha = None
+    try:
+        with tracer.span("vault.batch_commit", files=vault_files):
+            commit_sha = await buffer.flush(f"Voice batch: {len(audio)} notes")
+    except Exception as e:
+        logger.error("Vault batch commit failed: %s", e, exc_info=True)
+        for index in writers:
+            results[index] = VoiceNoteResponse(
+                success=False,
+                transcription=results[index].transcription,
+                actions=results[index].actions,
+                usage=results[index].usage,
+                error="Vault commit failed",
+                details=str(e),
+                trace_id=results[index].trace_id
+            )
+
+    items = [
+        VoiceBatchItem(filename=upload.filename, **result.model_dump())
+        for upload, result in zip(audio, results)
+    ]
+    logger.info(
+        "Voice batch done: %d/%d succeeded, %d vault files in commit %s",
+        sum(item.success for item in items), len(items), vault_files, commit_sha
+    )
+    return VoiceBatchResponse(
+        success=all(item.success for item in items),
+        results=items,
+        vault_commit=commit_sha,
+        vault_files=vault_files if commit_sha else 0
+    )
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Status and result of an asynchronous voice note job."""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
 
 
 @app.get("/")
@@ -174,11 +751,17 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/api/health",
-            "voice": "/api/voice (POST)"
+            "readiness": "/api/health/deep",
+            "stats": "/api/stats",
+            "voice": "/api/voice (POST, ?mode=async for a background job)",
+            "voice_batch": "/api/voice/batch (POST, several audio files)",
+            "jobs": "/api/jobs/{job_id}",
+            "metrics": "/metrics"
         }
     }
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=settings.port)
+    # log_config=None: uvicorn loggers propagate to the queue-based root handler
+    uvicorn.run(app, host="0.0.0.0", port=settings.port, log_config=None)
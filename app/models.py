@@ -1,6 +1,21 @@
 from pydantic import BaseModel
 
 
+class Usage(BaseModel):
+    """Token, audio and cost accounting for one voice note."""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cache_hit_ratio: float | None = None
+    total_tokens: int = 0
+    llm_calls: int = 0
+    audio_seconds: float | None = None
+    cost_usd: float = 0.0
+    budget_exceeded: str | None = None
+    iterations: list[dict] = []
+
+
 class VoiceNoteResponse(BaseModel):
     """Response model for voice note processing."""
 
@@ -10,6 +25,8 @@ class VoiceNoteResponse(BaseModel):
     agent_summary: str | None = None
     error: str | None = None
     details: str | None = None
+    usage: Usage | None = None
+    trace_id: str | None = None
 
 
 class HealthCheckResponse(BaseModel):
@@ -19,3 +36,51 @@ class HealthCheckResponse(BaseModel):
     version: str = "1.0.0"
     services: dict[str, str] = {}
     vault: dict[str, str] | None = None
+
+
+class DependencyStatus(BaseModel):
+    """Readiness probe result for one dependency."""
+
+    status: str
+    latency_ms: float
+    detail: str | None = None
+    required: bool = True
+
+
+class DeepHealthResponse(BaseModel):
+    """Response model for the readiness check (/api/health/deep)."""
+
+    status: str
+    checked_at: str
+    age_seconds: float = 0.0
+    dependencies: dict[str, DependencyStatus] = {}
+
+
+class JobResponse(BaseModel):
+    """Response model for asynchronous voice note jobs."""
+
+    job_id: str
+    status: str
+    filename: str | None = None
+    attempts: int = 0
+    created_at: str | None = None
+    started_at: str | None = None
+    finished_at: str | None = None
+    result: VoiceNoteResponse | None = None
+    error: str | None = None
+
+
+class VoiceBatchItem(VoiceNoteResponse):
+    """Result for one file of a batch upload."""
+
+    filename: str | None = None
+
+
+class VoiceBatchResponse(BaseModel):
+    """Response model for batch voice note processing."""
+
+    success: bool
+    results: list[VoiceBatchItem] = []
+    vault_commit: str | None = None
+    vault_files: int = 0
+    trace_id: str | None = None
@@ -0,0 +1,221 @@
+"""
+Admission Control
+
+Ограничение нагрузки на конвейер обработки заметок.
+
+На входе (AdmissionMiddleware) — ограниченное число одновременно
+обрабатываемых запросов и ограниченная очередь ожидания. Если очередь
+полна, запрос сразу получает 429, если место не освободилось за
+max_wait_seconds — 503; в обоих случаях с Retry-After по текущей скорости
+обработки. Отказ происходит до чтения тела запроса, так что при всплеске
+загрузки аудио не копятся в памяти и на диске.
+
+Внутри конвейера отдельные стадии (транскрипция, агент) ограничены своими
+лимитами параллельности, чтобы не ловить 429 от OpenAI и GitHub. Очереди
+стадий ограничены сверху входным лимитом, фоновыми заданиями и пакетами.
+"""
+
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import math
+import time
+
+
+class Overloaded(Exception):
+    """Запрос не допущен: очередь полна (429) или ожидание слишком долгое (503)."""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Stage:
+    """
+    Лимит параллельности с очередью ожидания и статистикой.
+
+    Args:
+        name: Имя стадии (для статистики)
+        limit: Сколько операций выполняется одновременно
+        max_queue: Сколько может ждать (None — без ограничения)
+        max_wait_seconds: Сколько ждать слот (None — без ограничения)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int | None = None,
+        max_wait_seconds: float | None = None
+    ):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Последние времена ожидания слота и сглаженное время работы в слоте
+        self._waits: deque[float] = deque(maxlen=1000)
+        self._service_seconds: float | None = None
+
+    def retry_after(self) -> int:
+        """Оценка, через сколько секунд освободится место для нового запроса."""
+        service = self._service_seconds or 1.0
+        rounds = (self.waiting + 1) / self.limit
+        return max(1, min(120, math.ceil(service * rounds)))
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Занимает слот на время блока.
+
+        Raises:
+            Overloaded: очередь полна или слот не освободился за max_wait_seconds
+        """
+        if (
+            self.max_queue is not None
+            and self.in_flight >= self.limit
+            and self.waiting >= self.max_queue
+        ):
+            self.rejected += 1
+            raise Overloaded(429, self.retry_after(), f"{self.name}: queue is full")
+
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            # acquire() в этой же задаче: отмена, пришедшая одновременно со
+            # слотом, возвращает его в семафор (asyncio.wait_for в 3.11 мог
+            # проглотить такую отмену, и слот оставался занят навсегда)
+            async with asyncio.timeout(self.max_wait_seconds):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self.timed_out += 1
+            raise Overloaded(503, self.retry_after(), f"{self.name}: no capacity within {self.max_wait_seconds:.0f}s")
+        finally:
+            self.waiting -= 1
+
+        acquired = time.monotonic()
+        self._waits.append(acquired - started)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            held = time.monotonic() - acquired
+            self._service_seconds = (
+                held if self._service_seconds is None else 0.8 * self._service_seconds + 0.2 * held
+            )
+
+    def stats(self) -> dict:
+        waits = list(self._waits)
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_p50_ms": round(_percentile(waits, 0.5) * 1000, 1) if waits else None,
+            "wait_p95_ms": round(_percentile(waits, 0.95) * 1000, 1) if waits else None,
+            "wait_max_ms": round(max(waits) * 1000, 1) if waits else None,
+            "service_seconds": round(self._service_seconds, 3) if self._service_seconds is not None else None,
+        }
+
+
+class AdmissionController:
+    """
+    Входной лимит запросов и лимиты стадий конвейера.
+
+    Args:
+        max_in_flight: Сколько запросов обрабатывается одновременно
+        max_queue: Сколько запросов может ждать на входе
+        max_wait_seconds: Сколько запрос ждёт на входе до 503
+        stage_limits: Стадия -> лимит параллельности (transcribe, agent)
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queue: int = 16,
+        max_wait_seconds: float = 20.0,
+        stage_limits: dict[str, int] | None = None
+    ):
+        self.requests = Stage("requests", max_in_flight, max_queue=max_queue, max_wait_seconds=max_wait_seconds)
+        self.stages = {name: Stage(name, limit) for name, limit in (stage_limits or {}).items()}
+
+    def stage(self, name: str):
+        """Слот стадии; для неизвестной стадии — без ограничения."""
+        stage = self.stages.get(name)
+        return stage.slot() if stage is not None else _no_limit()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests.stats(),
+            **{name: stage.stats() for name, stage in self.stages.items()},
+        }
+
+
+@asynccontextmanager
+async def _no_limit():
+    yield
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware: пропускает запросы к путям paths через входной лимит.
+
+    Работает до FastAPI, поэтому отказ не читает тело (multipart с аудио).
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: set[str], methods: set[str] = frozenset({"POST"})):
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+        self.methods = methods
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        slot = self.controller.requests.slot()
+        try:
+            await slot.__aenter__()
+        except Overloaded as e:
+            await self._reject(send, e)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await slot.__aexit__(None, None, None)
+
+    @staticmethod
+    async def _reject(send, e: Overloaded) -> None:
+        body = json.dumps({"success": False, "error": "Service overloaded", "details": e.reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": e.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(e.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
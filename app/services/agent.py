@@ -8,11 +8,43 @@ AI Agent Service
 Инструкции в LEARNING.md
 """
 
-from openai import AsyncOpenAI
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import asyncio
+import hashlib
+import json
+import time
+
+import httpx
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, guard
 from app.services.github_vault import GitHubVaultService
+from app.services.model_router import ModelRouter, RouteDecision
+from app.services.result_governor import ResultGovernor
+from app.services.tool_memo import READ_ONLY_TOOLS, ToolMemo
+from app.services.usage import UsageMeter
+from app.services.write_journal import WriteJournal, unavailable_result
+from app.services.metrics import (
+    AGENT_ITERATION_SECONDS,
+    BUDGET_STOPS,
+    CACHE,
+    COST,
+    RETRIES,
+    TOKENS,
+    TOOL_SECONDS,
+    status_label,
+)
+from app.services.tracing import current_span, tracer
+from app.services.intents import (
+    APPEND_TRIGGERS,
+    CALENDAR_TRIGGERS,
+    IDEA_TRIGGERS,
+    READ_TRIGGERS,
+    TODO_TRIGGERS,
+    format_triggers,
+)
 
 
-AGENT_SYSTEM_PROMPT = """
+AGENT_SYSTEM_PROMPT = f"""
 Ты — персональный ассистент для обработки голосовых заметок.
 
 ТВОИ ЗАДАЧИ:
@@ -23,7 +55,7 @@ AGENT_SYSTEM_PROMPT = """
 ТИПЫ КОНТЕНТА:
 
 1. ВСТРЕЧИ И СОБЫТИЯ (CALENDAR):
-   Триггеры: "встреча", "звонок", "созвон", "запланировать", "записаться", "назначить встречу", "поставить напоминание"
+   Триггеры: {format_triggers(CALENDAR_TRIGGERS)}
    Действие: create_calendar_event()
    - Используй когда указано КОНКРЕТНОЕ ВРЕМЯ ("завтра в 15:00", "в пятницу в 10:00", "3 февраля в 14:00")
    - Определи длительность (по умолчанию 60 минут)
@@ -31,11 +63,15 @@ AGENT_SYSTEM_PROMPT = """
    - Формат даты start_date:
      * Относительные: "завтра в 15:00", "сегодня в 10:00", "послезавтра в 14:30"
      * Русские даты: "3 февраля в 12:00", "15 марта", "20 декабря в 18:30"
+     * Дни недели и время словами: "в пятницу в 10:00", "в следующий вторник", "в 3 часа дня", "через 2 часа"
      * ISO формат: "2026-01-20 10:00" (ОБЯЗАТЕЛЬНО указывай правильный год!)
    - ВАЖНО: НЕ указывай год в start_date если используешь русский формат ("3 февраля", а НЕ "3 февраля 2025")
+   - Если create_calendar_event сообщает, что время занято — в том же ответе создай событие в первом
+     предложенном свободном окне и упомяни перенос в итоговом сообщении (force=true — только если пользователь
+     явно просил поставить поверх другой встречи)
 
 2. ЗАДАЧИ (TODO):
-   Триггеры: "нужно", "надо", "не забыть", "купить", "сделать", "позвонить", "отправить", "написать", "проверить"
+   Триггеры: {format_triggers(TODO_TRIGGERS)}
    Действие: add_todo_task()
    - Используй когда НЕТ конкретного времени или это общая задача без встречи
    - Формулируй задачу с глагола в инфинитиве
@@ -43,7 +79,7 @@ AGENT_SYSTEM_PROMPT = """
    - Если есть дата/срок - укажи due_date
 
 2. ИДЕИ:
-   Триггеры: "идея", "можно", "интересно было бы", "подумать над", "хочу попробовать", "в следующий раз", "было бы круто"
+   Триггеры: {format_triggers(IDEA_TRIGGERS)}
    Действие: create_note(folder="Ideas")
    - Создай заголовок из сути идеи (2-5 слов)
    - Сохрани все детали и контекст
@@ -76,8 +112,8 @@ AGENT_SYSTEM_PROMPT = """
    - СРАЗУ вызови append_to_note() с найденным путём и новым контентом
    - Используй read_note() ТОЛЬКО если пользователь явно спрашивает "что в заметке?"
 
-   Триггеры для ДОПОЛНЕНИЯ: "добавь к заметке", "добавь в заметку", "дополни заметку"
-   Триггеры для ЧТЕНИЯ: "что в заметке про", "прочитай заметку", "покажи заметку"
+   Триггеры для ДОПОЛНЕНИЯ: {format_triggers(APPEND_TRIGGERS)}
+   Триггеры для ЧТЕНИЯ: {format_triggers(READ_TRIGGERS)}
 
 ПРИМЕРЫ:
 
@@ -171,6 +207,258 @@ AGENT_SYSTEM_PROMPT = """
 """
 
 
+# Сокращённый вариант (AGENT_PROMPT_VARIANT=compact): те же правила без большинства примеров.
+# Короче 1024 токенов с tools не становится, так что prompt caching провайдера работает и для него;
+# влияние на точность и задержку — benchmarks/bench_prompt.py
+AGENT_SYSTEM_PROMPT_COMPACT = f"""
+Ты — ассистент для голосовых заметок: определи по транскрипции нужные действия и выполни их через инструменты.
+Отвечай на русском. Доводи действия до конца, не обещай — делай.
+
+- КАЛЕНДАРЬ ({format_triggers(CALENDAR_TRIGGERS)}), есть конкретное время -> create_calendar_event.
+  start_date без года: "завтра в 15:00", "3 февраля в 12:00", "в пятницу в 10:00"; длительность по умолчанию 60 минут.
+  Если время занято — создай событие в первом предложенном свободном окне и упомяни перенос
+  (force=true — только если пользователь явно просил).
+- ЗАДАЧИ ({format_triggers(TODO_TRIGGERS)}), без точного времени -> add_todo_task.
+  Текст с глагола в инфинитиве, priority high/medium/low, due_date YYYY-MM-DD если есть срок.
+- ИДЕИ ({format_triggers(IDEA_TRIGGERS)}) -> create_note(folder="Ideas").
+- РАБОТА (проекты, встречи, технические детали) -> create_note(folder="Work"), action items отдельным списком.
+- ЛИЧНОЕ и всё остальное -> create_note(folder="Personal").
+- Несколько типов в одной заметке — несколько самодостаточных действий.
+- ДОПОЛНИТЬ ({format_triggers(APPEND_TRIGGERS)}): list_notes(search_query=...) без folder, затем сразу append_to_note.
+- ПРОЧИТАТЬ ({format_triggers(READ_TRIGGERS)}): list_notes, затем read_note.
+
+Заметки — Markdown с заголовками и списками, заголовок 2-5 слов. Убирай слова-паразиты и повторы,
+сохраняй даты, имена и цифры.
+
+Пример: "Не забыть позвонить маме в среду. Кстати идея для подарка - абонемент на йогу"
+-> add_todo_task(task="Позвонить маме", priority="high", due_date=<дата среды>)
++ create_note(title="Идея подарка для мамы", content="Абонемент на йогу.", folder="Ideas")
+"""
+
+SYSTEM_PROMPTS = {
+    "full": AGENT_SYSTEM_PROMPT,
+    "compact": AGENT_SYSTEM_PROMPT_COMPACT,
+}
+
+WEEKDAYS = ("понедельник", "вторник", "среда", "четверг", "пятница", "суббота", "воскресенье")
+
+
+def user_message(transcription: str, now: datetime) -> str:
+    """
+    Сообщение пользователя: строка "Сейчас: …" с датой, днём недели и зоной,
+    затем "Транскрипция:" и текст.
+
+    Всё, что меняется от запроса к запросу, идёт сюда, после system prompt и
+    tools: префикс запроса (system prompt + tools) остаётся побайтно
+    одинаковым и попадает в автоматический prompt cache провайдера. Дата
+    стоит в начале сообщения пользователя, то есть уже за границей
+    кэшируемого префикса.
+    """
+    return (
+        f"Сейчас: {now:%Y-%m-%d %H:%M}, {WEEKDAYS[now.weekday()]} ({now.tzinfo}).\n\n"
+        f"Транскрипция:\n{transcription}"
+    )
+
+
+# Определяем tools для function calling
+AGENT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "create_calendar_event",
+            "description": "Создаёт событие в Google Calendar. Используй для встреч, звонков, напоминаний с КОНКРЕТНЫМ временем.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {
+                        "type": "string",
+                        "description": "Название события"
+                    },
+                    "start_date": {
+                        "type": "string",
+                        "description": "Дата и время начала (например: 'завтра в 15:00', '2025-01-20 10:00', 'послезавтра в 14:30')"
+                    },
+                    "duration_minutes": {
+                        "type": "integer",
+                        "description": "Длительность в минутах (не указывай, если в start_date есть диапазон 'с 10 до 12'; по умолчанию 60)"
+                    },
+                    "description": {
+                        "type": "string",
+                        "description": "Описание события (опционально)"
+                    },
+                    "location": {
+                        "type": "string",
+                        "description": "Место проведения (опционально)"
+                    },
+                    "force": {
+                        "type": "boolean",
+                        "description": "Создать событие, даже если время занято (только если пользователь явно этого хочет)",
+                        "default": False
+                    }
+                },
+                "required": ["title", "start_date"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_calendar_events",
+            "description": "Возвращает список ближайших событий в календаре или все события на конкретный день. Используй когда пользователь спрашивает про календарь.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "max_results": {
+                        "type": "integer",
+                        "description": "Максимальное количество ближайших событий (по умолчанию 5)",
+                        "default": 5
+                    },
+                    "date": {
+                        "type": "string",
+                        "description": "День, события которого нужно показать (например: 'завтра', 'в четверг', '3 февраля')"
+                    }
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_note",
+            "description": "Создаёт новую заметку в Obsidian vault через GitHub API. Используй для сохранения идей, мыслей, рабочих и личных заметок.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {
+                        "type": "string",
+                        "description": "Заголовок заметки (без расширения .md)"
+                    },
+                    "content": {
+                        "type": "string",
+                        "description": "Содержимое заметки в Markdown формате"
+                    },
+                    "folder": {
+                        "type": "string",
+                        "description": "Папка для заметки: Ideas, Work, Personal, или Voice Notes",
+                        "enum": ["Ideas", "Work", "Personal", "Voice Notes"],
+                        "default": "Voice Notes"
+                    }
+                },
+                "required": ["title", "content"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "add_todo_task",
+            "description": "Добавляет новую задачу в файл TODO.md в Obsidian vault. Используй для всего что нужно сделать, купить, не забыть.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "task": {
+                        "type": "string",
+                        "description": "Текст задачи (начинай с глагола)"
+                    },
+                    "priority": {
+                        "type": "string",
+                        "description": "Приоритет: high, medium, low",
+                        "enum": ["high", "medium", "low"],
+                        "default": "medium"
+                    },
+                    "due_date": {
+                        "type": "string",
+                        "description": "Дата в формате YYYY-MM-DD или null",
+                        "pattern": "^\\d{4}-\\d{2}-\\d{2}$"
+                    }
+                },
+                "required": ["task"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "append_to_note",
+            "description": "Добавляет контент в конец существующей заметки. Используй когда пользователь явно говорит 'добавь к заметке X' или 'дополни'.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "note_path": {
+                        "type": "string",
+                        "description": "Путь к заметке относительно vault (например: Work/Project X.md)"
+                    },
+                    "content": {
+                        "type": "string",
+                        "description": "Контент для добавления в Markdown"
+                    }
+                },
+                "required": ["note_path", "content"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_notes",
+            "description": "Возвращает список заметок. Если folder не указан - ищет во всех папках (Ideas, Work, Personal, Voice Notes). Используй чтобы найти существующую заметку перед append_to_note или read_note.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "folder": {
+                        "type": "string",
+                        "description": "Папка для поиска (опционально): Ideas, Work, Personal, Voice Notes. Если не указано - поиск во всех папках.",
+                        "enum": ["Ideas", "Work", "Personal", "Voice Notes"]
+                    },
+                    "search_query": {
+                        "type": "string",
+                        "description": "Поиск по названию (опционально)"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Сколько заметок вернуть (по умолчанию 30)",
+                        "default": 30
+                    },
+                    "cursor": {
+                        "type": "integer",
+                        "description": "Позиция следующей страницы из предыдущего ответа (по умолчанию 0)",
+                        "default": 0
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_note",
+            "description": "Читает содержимое заметки из vault. Используй когда пользователь ссылается на существующую заметку или хочет узнать её содержимое.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "note_path": {
+                        "type": "string",
+                        "description": "Полный путь к заметке (папка/файл.md), например: Work/2026-01-20-Project X.md"
+                    },
+                    "section": {
+                        "type": "string",
+                        "description": "Заголовок раздела, если нужна только часть длинной заметки (опционально)"
+                    }
+                },
+                "required": ["note_path"]
+            }
+        }
+    }
+]
+
+
+def prompt_fingerprint(system_prompt: str, tools: list = AGENT_TOOLS) -> str:
+    """Хэш кэшируемого префикса (system prompt + tools): меняется — кэш провайдера холодный."""
+    prefix = system_prompt + json.dumps(tools, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:12]
+
+
 class VoiceNotesAgent:
     """
     AI Agent для обработки голосовых заметок.
@@ -178,220 +466,216 @@ class VoiceNotesAgent:
     Использует OpenAI API с function calling для выполнения действий.
     """
 
-    def __init__(self, api_key: str, vault_service: GitHubVaultService, calendar_service=None):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        vault_service: GitHubVaultService,
+        calendar_service=None,
+        router: ModelRouter | None = None,
+        tool_result_tokens: int = 1000,
+        run_result_tokens: int = 6000,
+        max_request_tokens: int = 0,
+        max_request_cost_usd: float = 0.0,
+        prompt_variant: str = "full",
+        timezone: str = "Europe/Berlin",
+        http_client: httpx.AsyncClient | None = None,
+        breaker: CircuitBreaker | None = None,
+        journal: WriteJournal | None = None
+    ):
+        self.api_key = api_key
+        self.http_client = http_client
+        self._client = None
+        # Circuit breaker OpenAI: при открытом запрос падает сразу, без попыток на запасной модели
+        self.breaker = breaker
+        # Журнал записей в vault на время недоступности GitHub
+        self.journal = journal
         self.vault = vault_service
         self.calendar = calendar_service
-        self.model = "gpt-4o-mini"
+        self.router = router or ModelRouter()
+        self.tool_result_tokens = tool_result_tokens
+        self.run_result_tokens = run_result_tokens
+        # Бюджеты одного запроса (0 — без лимита): превышение останавливает цикл агента
+        self.max_request_tokens = max_request_tokens
+        self.max_request_cost_usd = max_request_cost_usd
+        if prompt_variant not in SYSTEM_PROMPTS:
+            raise ValueError(f"Unknown prompt variant: {prompt_variant} (expected one of {', '.join(SYSTEM_PROMPTS)})")
+        self.prompt_variant = prompt_variant
+        self.system_prompt = SYSTEM_PROMPTS[prompt_variant]
+        self.prompt_fingerprint = prompt_fingerprint(self.system_prompt)
+        self.timezone = ZoneInfo(timezone)
+
+    @property
+    def client(self):
+        """AsyncOpenAI клиент; openai (~0.5 с импорта) загружается при первом обращении, а не при старте."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(api_key=self.api_key, http_client=self.http_client)
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+
+    async def _complete(
+        self,
+        decision: RouteDecision,
+        messages: list,
+        tools: list,
+        iteration: int = 1,
+        meter: UsageMeter | None = None
+    ):
+        """
+        Вызывает chat completion с моделью из решения роутера.
 
-    async def process_transcription(self, transcription: str) -> dict:
+        При таймауте или ошибке API повторяет запрос на запасной модели;
+        при открытом breaker OpenAI сразу бросает CircuitOpenError.
+        Каждая попытка — спан llm.chat_completion с моделью и токенами;
+        usage ответа записывается в meter.
+        """
+        from openai import APIError
+
+        meter = meter or UsageMeter()
+        models = [decision.model]
+        if decision.fallback_model:
+            models.append(decision.fallback_model)
+
+        last_error = None
+        for model in models:
+            if last_error is not None:
+                RETRIES.inc(operation="llm_fallback")
+            with tracer.span(
+                "llm.chat_completion", model=model, iteration=iteration,
+                max_tokens=decision.max_tokens, messages=len(messages)
+            ) as span:
+                started = time.perf_counter()
+                try:
+                    with guard(self.breaker):
+                        response = await self.client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            tools=tools,
+                            tool_choice="auto",
+                            max_tokens=decision.max_tokens,
+                            timeout=self.router.timeout_seconds
+                        )
+                except APIError as e:
+                    elapsed = time.perf_counter() - started
+                    self.router.record_call(decision, model, elapsed, ok=False, error=type(e).__name__)
+                    AGENT_ITERATION_SECONDS.observe(
+                        elapsed, model=model, status=status_label(getattr(e, "status_code", None))
+                    )
+                    span.set_error(f"{type(e).__name__}: {e}")
+                    last_error = e
+                    continue
+
+                elapsed = time.perf_counter() - started
+                self.router.record_call(decision, model, elapsed, ok=True)
+                AGENT_ITERATION_SECONDS.observe(elapsed, model=model, status="ok")
+                choice = response.choices[0]
+                span.set_attributes(
+                    finish_reason=choice.finish_reason,
+                    tool_calls=len(choice.message.tool_calls or [])
+                )
+                record = meter.record(iteration, model, response.usage)
+                if record is not None:
+                    TOKENS.inc(record.prompt_tokens, model=model, kind="prompt")
+                    TOKENS.inc(record.completion_tokens, model=model, kind="completion")
+                    TOKENS.inc(record.cached_tokens, model=model, kind="cached")
+                    if record.cost_usd is not None:
+                        COST.inc(record.cost_usd, model=model)
+                    span.set_attributes(**{
+                        "tokens.prompt": record.prompt_tokens,
+                        "tokens.completion": record.completion_tokens,
+                        "tokens.cached": record.cached_tokens,
+                        "cost_usd": record.cost_usd
+                    })
+                return response
+
+        raise last_error
+
+    async def process_transcription(self, transcription: str, vault=None) -> dict:
         """
         Обрабатывает транскрипцию через AI агента.
 
         Args:
             transcription: Текст транскрипции
+            vault: Vault для tools вместо vault_service (например, буфер пакетной обработки)
 
         Returns:
             dict с ключами:
                 - actions: list[dict] - выполненные действия
                 - summary: str - краткое описание что сделано
-        """
-        from app.tools.note_tools import create_note, append_to_note, list_notes, read_note
-        from app.tools.todo_tools import add_todo_task
-        from app.tools.calendar_tools import create_calendar_event, list_calendar_events
-        import json
 
-        # Подготовка сообщений для агента
+        Raises:
+            CircuitOpenError: OpenAI недоступен до первого tool call — заметку
+                можно повторить целиком. Если tools уже выполнены, прогон
+                завершается с ними и сообщением о недоступности: повтор
+                продублировал бы записи.
+        """
+        # Подготовка сообщений для агента: статичный префикс (system prompt, tools),
+        # дата и транскрипция — только в сообщении пользователя
         messages = [
-            {"role": "system", "content": AGENT_SYSTEM_PROMPT},
-            {"role": "user", "content": transcription}
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_message(transcription, datetime.now(self.timezone))}
         ]
 
-        # Определяем tools для function calling
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_calendar_event",
-                    "description": "Создаёт событие в Google Calendar. Используй для встреч, звонков, напоминаний с КОНКРЕТНЫМ временем.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "title": {
-                                "type": "string",
-                                "description": "Название события"
-                            },
-                            "start_date": {
-                                "type": "string",
-                                "description": "Дата и время начала (например: 'завтра в 15:00', '2025-01-20 10:00', 'послезавтра в 14:30')"
-                            },
-                            "duration_minutes": {
-                                "type": "integer",
-                                "description": "Длительность в минутах (по умолчанию 60)",
-                                "default": 60
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Описание события (опционально)"
-                            },
-                            "location": {
-                                "type": "string",
-                                "description": "Место проведения (опционально)"
-                            }
-                        },
-                        "required": ["title", "start_date"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_calendar_events",
-                    "description": "Возвращает список ближайших событий в календаре. Используй когда пользователь спрашивает про календарь.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "max_results": {
-                                "type": "integer",
-                                "description": "Максимальное количество событий (по умолчанию 5)",
-                                "default": 5
-                            }
-                        }
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_note",
-                    "description": "Создаёт новую заметку в Obsidian vault через GitHub API. Используй для сохранения идей, мыслей, рабочих и личных заметок.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "title": {
-                                "type": "string",
-                                "description": "Заголовок заметки (без расширения .md)"
-                            },
-                            "content": {
-                                "type": "string",
-                                "description": "Содержимое заметки в Markdown формате"
-                            },
-                            "folder": {
-                                "type": "string",
-                                "description": "Папка для заметки: Ideas, Work, Personal, или Voice Notes",
-                                "enum": ["Ideas", "Work", "Personal", "Voice Notes"],
-                                "default": "Voice Notes"
-                            }
-                        },
-                        "required": ["title", "content"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_todo_task",
-                    "description": "Добавляет новую задачу в файл TODO.md в Obsidian vault. Используй для всего что нужно сделать, купить, не забыть.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "task": {
-                                "type": "string",
-                                "description": "Текст задачи (начинай с глагола)"
-                            },
-                            "priority": {
-                                "type": "string",
-                                "description": "Приоритет: high, medium, low",
-                                "enum": ["high", "medium", "low"],
-                                "default": "medium"
-                            },
-                            "due_date": {
-                                "type": "string",
-                                "description": "Дата в формате YYYY-MM-DD или null",
-                                "pattern": "^\\d{4}-\\d{2}-\\d{2}$"
-                            }
-                        },
-                        "required": ["task"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "append_to_note",
-                    "description": "Добавляет контент в конец существующей заметки. Используй когда пользователь явно говорит 'добавь к заметке X' или 'дополни'.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "note_path": {
-                                "type": "string",
-                                "description": "Путь к заметке относительно vault (например: Work/Project X.md)"
-                            },
-                            "content": {
-                                "type": "string",
-                                "description": "Контент для добавления в Markdown"
-                            }
-                        },
-                        "required": ["note_path", "content"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_notes",
-                    "description": "Возвращает список заметок. Если folder не указан - ищет во всех папках (Ideas, Work, Personal, Voice Notes). Используй чтобы найти существующую заметку перед append_to_note или read_note.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "folder": {
-                                "type": "string",
-                                "description": "Папка для поиска (опционально): Ideas, Work, Personal, Voice Notes. Если не указано - поиск во всех папках.",
-                                "enum": ["Ideas", "Work", "Personal", "Voice Notes"]
-                            },
-                            "search_query": {
-                                "type": "string",
-                                "description": "Поиск по названию (опционально)"
-                            }
-                        },
-                        "required": []
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_note",
-                    "description": "Читает содержимое заметки из vault. Используй когда пользователь ссылается на существующую заметку или хочет узнать её содержимое.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "note_path": {
-                                "type": "string",
-                                "description": "Полный путь к заметке (папка/файл.md), например: Work/2026-01-20-Project X.md"
-                            }
-                        },
-                        "required": ["note_path"]
-                    }
-                }
-            }
-        ]
+        # Выбираем модель и лимит токенов под эту транскрипцию
+        decision = self.router.route(transcription)
+
+        # Бюджет токенов на результаты tools в этом прогоне
+        governor = ResultGovernor(
+            default_tool_tokens=self.tool_result_tokens,
+            per_run_tokens=self.run_result_tokens
+        )
+        # Мемоизация read-only tools в пределах прогона
+        memo = ToolMemo()
+        # Токены и стоимость по итерациям, бюджеты запроса
+        meter = UsageMeter(max_tokens=self.max_request_tokens, max_cost_usd=self.max_request_cost_usd)
+        # Результаты tools переотправляются на каждой следующей итерации:
+        # считаем, сколько токенов это стоило бы без ограничения и с ним
+        resent_raw_tokens = 0
+        resent_sent_tokens = 0
 
         # Обрабатываем запрос в цикле для поддержки multi-turn tool calling
         actions = []
         max_iterations = 10  # Защита от бесконечного цикла
         iteration = 0
+        budget_exceeded = None
+        unavailable = None
 
         while iteration < max_iterations:
+            # Бюджет запроса исчерпан: результаты уже выполненных tools остаются,
+            # новых вызовов модели не делаем
+            budget_exceeded = meter.exceeded()
+            if budget_exceeded:
+                BUDGET_STOPS.inc(budget=budget_exceeded)
+                summary = (
+                    f"Превышен бюджет запроса ({budget_exceeded}: "
+                    f"{meter.total_tokens} токенов, ${meter.cost_usd:.4f}). Обработка остановлена."
+                )
+                break
             iteration += 1
-
-            # Вызываем OpenAI API
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=tools,
-                tool_choice="auto"
-            )
+            resent_raw_tokens += governor.raw_tokens
+            resent_sent_tokens += governor.sent_tokens
+
+            # Вызываем OpenAI API (с fallback на запасную модель)
+            try:
+                response = await self._complete(decision, messages, AGENT_TOOLS, iteration, meter)
+            except CircuitOpenError as e:
+                if not actions:
+                    await asyncio.to_thread(self.router.log_decision, decision)
+                    raise
+                # Записи предыдущих итераций уже сделаны (или в журнале): завершаем с ними
+                unavailable = str(e)
+                summary = (
+                    f"❌ {e}. Выполнено действий: {len(actions)}, "
+                    "остальная часть заметки не обработана."
+                )
+                break
+            except Exception:
+                await asyncio.to_thread(self.router.log_decision, decision)
+                raise
 
             assistant_message = response.choices[0].message
 
@@ -404,82 +688,172 @@ class VoiceNotesAgent:
             # Добавляем ответ ассистента в историю
             messages.append(assistant_message)
 
+            # Несколько create_calendar_event за один шаг — одним batch запросом
+            batched = await self._create_events_batch(assistant_message.tool_calls)
+
             # Выполняем каждый tool call
             for tool_call in assistant_message.tool_calls:
                 function_name = tool_call.function.name
                 function_args = json.loads(tool_call.function.arguments)
 
-                # Вызываем соответствующую функцию
-                if function_name == "create_calendar_event":
-                    result = await create_calendar_event(
-                        title=function_args["title"],
-                        start_date=function_args["start_date"],
-                        duration_minutes=function_args.get("duration_minutes", 60),
-                        description=function_args.get("description"),
-                        location=function_args.get("location"),
-                        calendar=self.calendar
-                    )
-                elif function_name == "list_calendar_events":
-                    result = await list_calendar_events(
-                        max_results=function_args.get("max_results", 5),
-                        calendar=self.calendar
-                    )
-                elif function_name == "create_note":
-                    result = await create_note(
-                        title=function_args["title"],
-                        content=function_args["content"],
-                        folder=function_args.get("folder", "Voice Notes"),
-                        vault=self.vault
-                    )
-                elif function_name == "add_todo_task":
-                    result = await add_todo_task(
-                        task=function_args["task"],
-                        priority=function_args.get("priority", "medium"),
-                        due_date=function_args.get("due_date"),
-                        vault=self.vault
-                    )
-                elif function_name == "append_to_note":
-                    result = await append_to_note(
-                        note_path=function_args["note_path"],
-                        content=function_args["content"],
-                        vault=self.vault
-                    )
-                elif function_name == "list_notes":
-                    result = await list_notes(
-                        folder=function_args.get("folder"),
-                        search_query=function_args.get("search_query"),
-                        vault=self.vault
-                    )
-                elif function_name == "read_note":
-                    result = await read_note(
-                        note_path=function_args["note_path"],
-                        vault=self.vault
-                    )
-                else:
-                    result = f"Неизвестная функция: {function_name}"
-
-                # Сохраняем действие
-                actions.append({
+                # Повторный read-only вызов с теми же аргументами — из памяти
+                result = memo.get(function_name, function_args)
+                memo_hit = result is not None
+                if function_name in READ_ONLY_TOOLS:
+                    CACHE.inc(cache="tool_memo", result="hit" if memo_hit else "miss")
+                if tool_call.id in batched:
+                    result = batched[tool_call.id]
+                    memo.invalidate_for_write(function_name, function_args)
+                elif not memo_hit:
+                    with TOOL_SECONDS.time(tool=function_name) as labels:
+                        try:
+                            result = await self._execute_tool(function_name, function_args, vault)
+                        except CircuitOpenError as e:
+                            # Зависимость недоступна: ответ сразу, запись в vault — в журнал
+                            result = await unavailable_result(function_name, function_args, e, self.journal)
+                        if result.startswith("❌"):
+                            labels["status"] = "error"
+                    memo.put(function_name, function_args, result)
+                    memo.invalidate_for_write(function_name, function_args)
+
+                # Сохраняем действие (полный результат — для ответа API)
+                action = {
                     "function": function_name,
                     "arguments": function_args,
                     "result": result
-                })
+                }
+                if function_name in READ_ONLY_TOOLS:
+                    action["memo_hit"] = memo_hit
+                actions.append(action)
 
-                # Добавляем результат в историю сообщений
+                # Добавляем результат в историю сообщений (в пределах бюджета)
                 messages.append({
                     "role": "tool",
                     "tool_call_id": tool_call.id,
                     "name": function_name,
-                    "content": result
+                    "content": governor.govern(function_name, result)
                 })
 
             # Цикл продолжится и агент сможет вызвать ещё tool calls
 
         # Если вышли из цикла без break (достигнут max_iterations)
-        if iteration >= max_iterations:
+        if iteration >= max_iterations and not budget_exceeded and not unavailable:
             summary = "Превышено максимальное количество итераций. Обработка остановлена."
 
+        await asyncio.to_thread(self.router.log_decision, decision)
+
+        span = current_span()
+        if span is not None:
+            span.set_attributes(**{
+                "route.model": decision.model,
+                "route.reason": decision.reason,
+                "agent.iterations": iteration,
+                "agent.actions": len(actions),
+                "tokens.total": meter.total_tokens,
+                "cost_usd": meter.cost_usd,
+                "budget_exceeded": budget_exceeded,
+                "unavailable": unavailable
+            })
+
         return {
             "actions": actions,
-            "summary": summary
+            "summary": summary,
+            "routing": {
+                "model": decision.model,
+                "max_tokens": decision.max_tokens,
+                "reason": decision.reason,
+                "calls": decision.calls
+            },
+            "tool_results": {
+                **governor.stats(),
+                "resent_raw_tokens": resent_raw_tokens,
+                "resent_sent_tokens": resent_sent_tokens
+            },
+            "memo": memo.stats(),
+            "usage": {**meter.summary(), "budget_exceeded": budget_exceeded},
+            "prompt": {"variant": self.prompt_variant, "fingerprint": self.prompt_fingerprint}
         }
+
+    async def _create_events_batch(self, tool_calls) -> dict[str, str]:
+        """
+        Выполняет create_calendar_event из одного ответа модели одним batch запросом.
+
+        Returns:
+            Результаты по tool_call.id (пустой dict, если таких вызовов меньше двух)
+        """
+        calls = [tc for tc in tool_calls if tc.function.name == "create_calendar_event"]
+        if len(calls) < 2 or self.calendar is None:
+            return {}
+
+        from app.tools.calendar_tools import create_calendar_events
+
+        events = [json.loads(tc.function.arguments) for tc in calls]
+        with TOOL_SECONDS.time(tool="create_calendar_events"):
+            try:
+                results = await create_calendar_events(events=events, calendar=self.calendar)
+            except CircuitOpenError as e:
+                # Как при отдельных вызовах: "сервис недоступен" на каждый tool call
+                results = [
+                    await unavailable_result("create_calendar_event", args, e, self.journal) for args in events
+                ]
+        return {tc.id: result for tc, result in zip(calls, results)}
+
+    async def _execute_tool(self, function_name: str, function_args: dict, vault=None) -> str:
+        """Вызывает tool по имени с аргументами из tool call."""
+        vault = vault or self.vault
+        from app.tools.note_tools import create_note, append_to_note, list_notes, read_note
+        from app.tools.todo_tools import add_todo_task
+        from app.tools.calendar_tools import create_calendar_event, list_calendar_events
+
+        if function_name == "create_calendar_event":
+            return await create_calendar_event(
+                title=function_args["title"],
+                start_date=function_args["start_date"],
+                duration_minutes=function_args.get("duration_minutes"),
+                description=function_args.get("description"),
+                location=function_args.get("location"),
+                force=function_args.get("force", False),
+                calendar=self.calendar
+            )
+        elif function_name == "list_calendar_events":
+            return await list_calendar_events(
+                max_results=function_args.get("max_results", 5),
+                date=function_args.get("date"),
+                calendar=self.calendar
+            )
+        elif function_name == "create_note":
+            return await create_note(
+                title=function_args["title"],
+                content=function_args["content"],
+                folder=function_args.get("folder", "Voice Notes"),
+                vault=vault
+            )
+        elif function_name == "add_todo_task":
+            return await add_todo_task(
+                task=function_args["task"],
+                priority=function_args.get("priority", "medium"),
+                due_date=function_args.get("due_date"),
+                vault=vault
+            )
+        elif function_name == "append_to_note":
+            return await append_to_note(
+                note_path=function_args["note_path"],
+                content=function_args["content"],
+                vault=vault
+            )
+        elif function_name == "list_notes":
+            return await list_notes(
+                folder=function_args.get("folder"),
+                search_query=function_args.get("search_query"),
+                limit=function_args.get("limit", 30),
+                cursor=function_args.get("cursor", 0),
+                vault=vault
+            )
+        elif function_name == "read_note":
+            return await read_note(
+                note_path=function_args["note_path"],
+                section=function_args.get("section"),
+                vault=vault
+            )
+        else:
+            return f"Неизвестная функция: {function_name}"
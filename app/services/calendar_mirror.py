@@ -0,0 +1,257 @@
+"""
+Calendar Mirror
+
+Локальное зеркало ближайших событий Google Calendar.
+
+Первая синхронизация выгружает события начиная со вчерашнего дня, дальше
+зеркало обновляется инкрементально через syncToken (только изменения,
+включая удалённые события) в фоне и сразу после наших собственных вставок.
+Списки "ближайшие события" и "что у меня в четверг" отвечаются из памяти
+по отсортированному индексу начал событий (bisect), без запроса к Google.
+"""
+
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+import asyncio
+import logging
+import time
+
+from app.services.google_calendar import GoogleCalendarService, SyncTokenExpired
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MirrorEvent:
+    """Событие в зеркале."""
+    id: str
+    summary: str | None
+    start: datetime
+    end: datetime
+    start_raw: str
+    end_raw: str
+    busy: bool = True
+
+    def as_dict(self) -> dict:
+        # Тот же формат, что у GoogleCalendarService.list_upcoming_events
+        return {"id": self.id, "summary": self.summary, "start": self.start_raw, "end": self.end_raw}
+
+
+def _parse_time(value: dict, tz: ZoneInfo) -> tuple[datetime, str]:
+    """Время события API: dateTime или date (событие на весь день — полночь в зоне календаря)."""
+    if "dateTime" in value:
+        raw = value["dateTime"]
+        parsed = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=tz)
+        return parsed, raw
+    raw = value["date"]
+    return datetime.combine(date.fromisoformat(raw), dt_time(0, 0), tzinfo=tz), raw
+
+
+class CalendarMirror:
+    """
+    Зеркало событий календаря с индексом по времени начала.
+
+    Args:
+        calendar: GoogleCalendarService
+        refresh_seconds: Интервал фоновой инкрементальной синхронизации
+        retain_days: Сколько дней хранить уже закончившиеся события
+        max_staleness_seconds: После какого возраста последней синхронизации
+            зеркало не используется для ответов (по умолчанию 3 интервала)
+    """
+
+    def __init__(
+        self,
+        calendar: GoogleCalendarService,
+        refresh_seconds: float = 300.0,
+        retain_days: int = 1,
+        max_staleness_seconds: float | None = None
+    ):
+        self.calendar = calendar
+        self.refresh_seconds = refresh_seconds
+        self.retain = timedelta(days=retain_days)
+        self.max_staleness_seconds = max_staleness_seconds or refresh_seconds * 3
+        self.tz = ZoneInfo(calendar.timezone)
+
+        self._events: dict[str, MirrorEvent] = {}
+        # Отсортированный индекс (start, id) и максимальная длительность события:
+        # событие пересекает [a, b) только если его начало в [a - max_duration, b)
+        self._starts: list[tuple[datetime, str]] = []
+        self._max_duration = timedelta(0)
+        # Растёт при каждом изменении — по нему FreeBusyService перестраивает дерево интервалов
+        self.version = 0
+
+        self._sync_token: str | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.synced_at: float | None = None
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.sync_errors = 0
+        self.queries = 0
+
+    # ------------------------------------------------------------------
+    # Синхронизация
+    # ------------------------------------------------------------------
+
+    async def refresh(self) -> bool:
+        """
+        Синхронизирует зеркало с Google (инкрементально, если есть syncToken).
+
+        Returns:
+            True, если синхронизация прошла успешно
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                if self._sync_token is None:
+                    await self._full_sync()
+                else:
+                    try:
+                        await self._incremental_sync()
+                    except SyncTokenExpired:
+                        logger.info("Calendar sync token expired, running full sync")
+                        await self._full_sync()
+            except Exception as e:
+                self.sync_errors += 1
+                logger.error("Calendar mirror sync failed: %s", e, exc_info=True)
+                return False
+
+            self._prune()
+            self.synced_at = time.monotonic()
+            logger.debug(
+                "Calendar mirror synced in %.0f ms (%d events)",
+                (time.perf_counter() - started) * 1000, len(self._events)
+            )
+            return True
+
+    async def _full_sync(self) -> None:
+        time_min = datetime.now(self.tz) - self.retain
+        items, sync_token = await self.calendar.list_changes(time_min=time_min)
+        self._events.clear()
+        self._starts.clear()
+        self._max_duration = timedelta(0)
+        self.version += 1
+        for item in items:
+            self.upsert(item)
+        self._sync_token = sync_token
+        self.full_syncs += 1
+
+    async def _incremental_sync(self) -> None:
+        items, sync_token = await self.calendar.list_changes(sync_token=self._sync_token)
+        for item in items:
+            self.upsert(item)
+        # Без nextSyncToken следующая синхронизация будет полной
+        self._sync_token = sync_token
+        self.incremental_syncs += 1
+
+    async def run(self) -> None:
+        """Фоновый цикл синхронизации."""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        """Запускает фоновую синхронизацию (вызывается из lifespan)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую синхронизацию."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_fresh(self) -> bool:
+        """Можно ли отвечать из зеркала."""
+        return self.synced_at is not None and time.monotonic() - self.synced_at <= self.max_staleness_seconds
+
+    # ------------------------------------------------------------------
+    # Индекс
+    # ------------------------------------------------------------------
+
+    def upsert(self, item: dict) -> None:
+        """Добавляет, обновляет или удаляет (status == "cancelled") событие из ответа API."""
+        event_id = item.get("id")
+        if not event_id:
+            return
+        self.version += 1
+        self._remove(event_id)
+        if item.get("status") == "cancelled" or "start" not in item:
+            return
+
+        start, start_raw = _parse_time(item["start"], self.tz)
+        end, end_raw = _parse_time(item["end"], self.tz)
+        # "Свободно" (transparent) не занимает время — как и в freeBusy API
+        busy = item.get("transparency") != "transparent"
+        event = MirrorEvent(event_id, item.get("summary"), start, end, start_raw, end_raw, busy)
+        self._events[event_id] = event
+        insort(self._starts, (start, event_id))
+        self._max_duration = max(self._max_duration, end - start)
+
+    def _remove(self, event_id: str) -> None:
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        self.version += 1
+        i = bisect_left(self._starts, (event.start, event_id))
+        if i < len(self._starts) and self._starts[i] == (event.start, event_id):
+            del self._starts[i]
+
+    def _prune(self) -> None:
+        """Удаляет события, закончившиеся раньше окна хранения."""
+        cutoff = datetime.now(self.tz) - self.retain
+        for event_id in [e.id for e in self._events.values() if e.end < cutoff]:
+            self._remove(event_id)
+        self._max_duration = max((e.end - e.start for e in self._events.values()), default=timedelta(0))
+
+    def _overlapping(self, start: datetime, end: datetime | None):
+        i = bisect_left(self._starts, (start - self._max_duration,))
+        for event_start, event_id in self._starts[i:]:
+            if end is not None and event_start >= end:
+                break
+            event = self._events[event_id]
+            if event.end > start:
+                yield event
+
+    # ------------------------------------------------------------------
+    # Запросы
+    # ------------------------------------------------------------------
+
+    def upcoming(self, max_results: int = 10, now: datetime | None = None) -> list[dict]:
+        """Ближайшие события, которые ещё не закончились (как timeMin=now у API)."""
+        self.queries += 1
+        now = now or datetime.now(self.tz)
+        result = []
+        for event in self._overlapping(now, None):
+            result.append(event.as_dict())
+            if len(result) >= max_results:
+                break
+        return result
+
+    def between(self, start: datetime, end: datetime) -> list[dict]:
+        """События, пересекающиеся с интервалом [start, end), в порядке начала."""
+        self.queries += 1
+        return [event.as_dict() for event in self._overlapping(start, end)]
+
+    def busy_events(self) -> list[MirrorEvent]:
+        """Все события, занимающие время."""
+        return [event for event in self._events.values() if event.busy]
+
+    def stats(self) -> dict:
+        return {
+            "events": len(self._events),
+            "fresh": self.is_fresh(),
+            "age_seconds": round(time.monotonic() - self.synced_at, 1) if self.synced_at is not None else None,
+            "full_syncs": self.full_syncs,
+            "incremental_syncs": self.incremental_syncs,
+            "sync_errors": self.sync_errors,
+            "queries": self.queries,
+        }
@@ -0,0 +1,329 @@
+"""
+Cassette Record/Replay
+
+Запись и воспроизведение HTTP взаимодействий на уровне транспорта:
+- httpx (OpenAI клиент, GitHubVaultService) — через CassetteTransport
+- httplib2 (googleapiclient для Google Calendar) — через CassetteHttp
+
+В режиме record реальные ответы сохраняются в JSON файл кассеты вместе
+с задержкой. В режиме replay ответы отдаются из кассеты в том же порядке,
+без сети, с записанной или заданной (симулированной) задержкой.
+
+Запросы сопоставляются по хэшу нормализованного тела: JSON без порядка
+ключей, с замаскированными датами и строкой "Сейчас: …" промпта,
+multipart без boundary. Изменение самого запроса (промпт, tools, параметры
+Whisper) делает кассету устаревшей: такие запросы считаются в
+Cassette.stale, и кассету нужно перезаписать (режим record).
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+
+import httpx
+
+
+# Заголовки, которые нельзя переносить в воспроизведённый ответ:
+# тело хранится уже раскодированным
+_DROP_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CassetteMissError(Exception):
+    """В кассете нет записи для запроса."""
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+# Переменные части тела: текущее время в сообщении агента, даты и время (ISO)
+_VOLATILE_RE = re.compile(
+    r"Сейчас: [^\n]*"
+    r"|\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:\d{2})?)?"
+)
+
+
+def _mask(value):
+    if isinstance(value, str):
+        return _VOLATILE_RE.sub("…", value)
+    if isinstance(value, list):
+        return [_mask(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _mask(item) for key, item in value.items()}
+    return value
+
+
+def _normalize_body(body: bytes) -> bytes:
+    """Тело запроса без частей, которые меняются от прогона к прогону."""
+    if body.startswith(b"--"):
+        # multipart (Whisper): boundary случайный
+        boundary = body.split(b"\r\n", 1)[0][2:]
+        return body.replace(boundary, b"boundary") if boundary else body
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    return json.dumps(_mask(data), sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+
+def _body_hash(body: bytes | None) -> str:
+    return hashlib.sha256(_normalize_body(body or b"")).hexdigest()[:16]
+
+
+def _encode_body(body: bytes) -> dict:
+    try:
+        return {"text": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(entry: dict) -> bytes:
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    return entry.get("text", "").encode("utf-8")
+
+
+@dataclass
+class CassetteEvent:
+    """Одно взаимодействие в текущем прогоне (записанное или воспроизведённое)."""
+    service: str
+    method: str
+    url: str
+    status: int
+    seconds: float
+    body: bytes = field(repr=False, default=b"")
+
+    def json(self) -> dict | None:
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+class Cassette:
+    """
+    Файл кассеты с HTTP взаимодействиями.
+
+    Args:
+        path: Путь к JSON файлу кассеты
+        mode: "record" или "replay"
+        latency: "recorded" — записанная задержка, "none" — без задержки,
+            либо число секунд — фиксированная симулированная задержка
+    """
+
+    def __init__(self, path: str | Path, mode: str = "replay", latency: str | float = "recorded"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.interactions: list[dict] = []
+        self.meta: dict = {}
+        self._used: set[int] = set()
+        # Воспроизведённые запросы, тело которых не совпало с записанным
+        self.stale = 0
+        self.events: list[CassetteEvent] = []
+
+        if mode == "replay":
+            if not self.path.exists():
+                raise FileNotFoundError(f"Cassette not found: {self.path}")
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.interactions = data["interactions"]
+            self.meta = data.get("meta", {})
+
+    def delay_for(self, entry: dict) -> float:
+        """Задержка воспроизведения для записи."""
+        if self.latency == "recorded":
+            return entry.get("seconds", 0.0)
+        if self.latency == "none":
+            return 0.0
+        return float(self.latency)
+
+    def match(self, service: str, method: str, url: str, body: bytes | None) -> dict:
+        """
+        Находит следующую неиспользованную запись для запроса.
+
+        Сначала ищет точное совпадение (метод, URL, хэш нормализованного
+        тела), затем — по методу и URL, затем — следующую запись того же
+        сервиса и метода (URL с датой: имена заметок, timeMin календаря).
+        Совпадение не по телу считается в stale: запрос изменился после
+        записи кассеты.
+        """
+        url = _normalize_url(url)
+        digest = _body_hash(body)
+        with self._lock:
+            same_url = same_method = None
+            for i, entry in enumerate(self.interactions):
+                if i in self._used or entry["service"] != service or entry["method"] != method:
+                    continue
+                if entry["url"] == url:
+                    if entry["body_hash"] == digest:
+                        same_url = i
+                        break
+                    if same_url is None:
+                        same_url = i
+                elif same_method is None:
+                    same_method = i
+            chosen = same_url if same_url is not None else same_method
+            if chosen is None:
+                raise CassetteMissError(f"No recorded {service} response for {method} {url}")
+            self._used.add(chosen)
+            if self.interactions[chosen]["body_hash"] != digest:
+                self.stale += 1
+            return self.interactions[chosen]
+
+    def record(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        request_body: bytes | None,
+        status: int,
+        headers: dict,
+        body: bytes,
+        seconds: float
+    ) -> None:
+        """Добавляет взаимодействие и сразу сохраняет кассету на диск."""
+        entry = {
+            "service": service,
+            "method": method,
+            "url": _normalize_url(url),
+            "body_hash": _body_hash(request_body),
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _DROP_RESPONSE_HEADERS},
+            "body": _encode_body(body),
+            "seconds": round(seconds, 4),
+        }
+        with self._lock:
+            self.interactions.append(entry)
+            self._save()
+
+    def save(self) -> None:
+        """Сохраняет кассету (метаданные и взаимодействия) на диск."""
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps({"meta": self.meta, "interactions": self.interactions}, ensure_ascii=False, indent=1),
+            encoding="utf-8"
+        )
+
+    def log_event(self, event: CassetteEvent) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def stats(self) -> dict:
+        """Количество запросов и суммарное время по сервисам в текущем прогоне."""
+        summary: dict[str, dict] = {}
+        for event in self.events:
+            item = summary.setdefault(event.service, {"requests": 0, "seconds": 0.0})
+            item["requests"] += 1
+            item["seconds"] = round(item["seconds"] + event.seconds, 4)
+        return summary
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    httpx транспорт с записью/воспроизведением через Cassette.
+
+    Используется как AsyncOpenAI(http_client=httpx.AsyncClient(transport=...))
+    и GitHubVaultService(transport=...).
+    """
+
+    def __init__(self, cassette: Cassette, service: str, inner: httpx.AsyncBaseTransport | None = None):
+        self.cassette = cassette
+        self.service = service
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request_body = await request.aread()
+
+        if self.cassette.mode == "replay":
+            entry = self.cassette.match(self.service, request.method, str(request.url), request_body)
+            delay = self.cassette.delay_for(entry)
+            if delay:
+                await asyncio.sleep(delay)
+            body = _decode_body(entry["body"])
+            self.cassette.log_event(
+                CassetteEvent(self.service, request.method, str(request.url), entry["status"], delay, body)
+            )
+            return httpx.Response(entry["status"], headers=entry["headers"], content=body, request=request)
+
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        seconds = time.perf_counter() - started
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_RESPONSE_HEADERS}
+        self.cassette.record(
+            self.service, request.method, str(request.url), request_body,
+            response.status_code, headers, body, seconds
+        )
+        self.cassette.log_event(
+            CassetteEvent(self.service, request.method, str(request.url), response.status_code, seconds, body)
+        )
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        # Транспорт общий для многих короткоживущих клиентов (GitHubVaultService
+        # открывает клиент на каждый запрос) — не закрываем его вместе с клиентом
+        pass
+
+
+class CassetteHttp:
+    """
+    httplib2.Http-совместимая обёртка для googleapiclient.
+
+    В режиме record делегирует запрос inner (обычно AuthorizedHttp),
+    в режиме replay inner не нужен.
+    """
+
+    def __init__(self, cassette: Cassette, service: str = "google_calendar", inner=None):
+        self.cassette = cassette
+        self.service = service
+        self.inner = inner
+        self.timeout = getattr(inner, "timeout", None)
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+
+        request_body = body.encode("utf-8") if isinstance(body, str) else body
+
+        if self.cassette.mode == "replay":
+            entry = self.cassette.match(self.service, method, uri, request_body)
+            delay = self.cassette.delay_for(entry)
+            if delay:
+                time.sleep(delay)
+            content = _decode_body(entry["body"])
+            self.cassette.log_event(CassetteEvent(self.service, method, uri, entry["status"], delay, content))
+            return httplib2.Response({"status": str(entry["status"]), **entry["headers"]}), content
+
+        started = time.perf_counter()
+        response, content = self.inner.request(
+            uri, method=method, body=body, headers=headers,
+            redirections=redirections, connection_type=connection_type
+        )
+        seconds = time.perf_counter() - started
+
+        # httplib2 уже распаковал тело; служебные ключи ("status", "-content-encoding") не сохраняем
+        response_headers = {
+            k: v for k, v in response.items()
+            if k != "status" and not k.startswith("-") and k.lower() not in _DROP_RESPONSE_HEADERS
+        }
+        self.cassette.record(
+            self.service, method, uri, request_body, response.status, response_headers, content, seconds
+        )
+        self.cassette.log_event(CassetteEvent(self.service, method, uri, response.status, seconds, content))
+        return response, content
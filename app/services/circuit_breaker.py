@@ -0,0 +1,229 @@
+"""
+Circuit Breaker
+
+Быстрый отказ для деградировавших зависимостей: OpenAI, GitHub, Google Calendar.
+
+Пока breaker закрыт (closed), он считает исходы вызовов в скользящем окне
+window_seconds. Когда в окне не меньше min_calls вызовов и доля неудачных
+достигает failure_rate, breaker открывается (open): следующие open_seconds
+вызовы отклоняются сразу (CircuitOpenError) — без запроса в сеть и без
+ожидания таймаутов. Потом breaker полуоткрыт (half_open) и пропускает
+half_open_max_calls пробных вызовов: успех закрывает его, неудача снова
+открывает на open_seconds.
+
+Неудача — сбой самой зависимости: сеть, таймаут, 5xx, 429. Ответы 4xx
+(404 "файла нет", 409 конфликт, 400) — обычная работа и считаются успехом.
+"""
+
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+import logging
+import threading
+import time
+
+from app.services.metrics import CIRCUIT_REJECTED, CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Значение гейджа voice_circuit_state
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён без обращения к зависимости: её breaker открыт."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        self.dependency = dependency
+        self.retry_after = retry_after
+        super().__init__(
+            f"Сервис {dependency} временно недоступен (circuit breaker открыт, повтор через {retry_after:.0f} с)"
+        )
+
+
+def is_outage_status(status: int) -> bool:
+    """HTTP статус, который говорит о сбое зависимости, а не об ошибке запроса."""
+    return status >= 500 or status == 429
+
+
+def is_outage(error: BaseException) -> bool:
+    """
+    Исключение — сбой зависимости?
+
+    Ошибки с HTTP статусом (openai.APIStatusError.status_code,
+    googleapiclient HttpError.resp.status) — по статусу; без статуса
+    (сеть, таймаут) — сбой.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "resp", None), "status", None)
+    if status is None:
+        return True
+    return is_outage_status(int(status))
+
+
+class CircuitBreaker:
+    """
+    Breaker одной зависимости (потокобезопасный).
+
+    Args:
+        name: Имя зависимости (метка метрик, текст CircuitOpenError)
+        failure_rate: Доля неудачных вызовов в окне, при которой breaker открывается
+        min_calls: Минимум вызовов в окне для решения (единичный сбой не открывает)
+        window_seconds: Длина скользящего окна исходов
+        open_seconds: Сколько секунд отклонять вызовы до пробных
+        half_open_max_calls: Сколько пробных вызовов пропускать одновременно
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_seconds: float = 60.0,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self.opened_total = 0
+        self.rejected_total = 0
+        CIRCUIT_STATE.set(_STATE_VALUES[CLOSED], dependency=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        # open -> half_open по истечении open_seconds (под self._lock)
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._trials = 0
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            log = logger.warning if state == OPEN else logger.info
+            log("Circuit breaker %s: %s -> %s", self.name, self._state, state)
+        self._state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], dependency=self.name)
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self.opened_total += 1
+        self._transition(OPEN)
+
+    def before_call(self) -> None:
+        """Пропускает вызов или сразу бросает CircuitOpenError."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._trials < self.half_open_max_calls:
+                self._trials += 1
+                return
+            self.rejected_total += 1
+            # half_open: пробный вызов уже идёт, ответ будет скоро
+            retry_after = self.open_seconds - (now - self._opened_at) if state == OPEN else 1.0
+        CIRCUIT_REJECTED.inc(dependency=self.name)
+        raise CircuitOpenError(self.name, max(retry_after, 1.0))
+
+    def record(self, ok: bool) -> None:
+        """Исход пропущенного вызова."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                self._trials = max(self._trials - 1, 0)
+                if ok:
+                    self._transition(CLOSED)
+                else:
+                    self._open(now)
+                return
+            if state == OPEN:
+                # Вызов начался до открытия: на решение уже не влияет
+                return
+            self._outcomes.append((now, ok))
+            if not ok:
+                self._failures += 1
+            self._trim(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                self._open(now)
+
+    def _release(self) -> None:
+        """Вызов отменён без исхода: освобождает место пробного вызова."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trials = max(self._trials - 1, 0)
+
+    @contextmanager
+    def guard(self, is_failure: Callable[[BaseException], bool] = is_outage):
+        """
+        Вызов под breaker: before_call(), затем исход блока.
+
+        Исключение из блока — неудача, если is_failure(e). Неудачу без
+        исключения (например, ответ 503) отмечают в outcome:
+            with breaker.guard() as outcome:
+                response = ...
+                outcome["ok"] = not is_outage_status(response.status_code)
+        """
+        self.before_call()
+        outcome = {"ok": True}
+        try:
+            yield outcome
+        except Exception as e:
+            self.record(not is_failure(e))
+            raise
+        except BaseException:
+            # Отмена (CancelledError): ни успех, ни сбой
+            self._release()
+            raise
+        else:
+            self.record(outcome["ok"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._trim(now)
+            calls = len(self._outcomes)
+            return {
+                "state": state,
+                "calls_in_window": calls,
+                "failure_rate": round(self._failures / calls, 3) if calls else None,
+                "retry_after_seconds": round(self.open_seconds - (now - self._opened_at), 1) if state == OPEN else None,
+                "opened_total": self.opened_total,
+                "rejected_total": self.rejected_total,
+            }
+
+
+def guard(breaker: CircuitBreaker | None, is_failure: Callable[[BaseException], bool] = is_outage):
+    """breaker.guard(), или пустой контекст, если breaker не задан (breakers выключены)."""
+    if breaker is None:
+        return nullcontext({"ok": True})
+    return breaker.guard(is_failure)
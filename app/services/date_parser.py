@@ -0,0 +1,621 @@
+"""
+Russian Date Parser
+
+Разбор русских выражений даты и времени: "завтра в 15:00", "в следующий
+вторник", "в 3 часа дня", "в половине седьмого", "с 10 до 12",
+"с 3 по 5 февраля", "через 2 недели", "2026-01-20 10:00".
+
+Текст разбивается на токены одним скомпилированным регулярным выражением,
+слова ищутся в словарях грамматики (собираются один раз при импорте).
+Выражение собирается из компонентов — день, время, часть дня, диапазон —
+каждый может идти после предлога. Результат — ParsedDate с оценкой
+уверенности; если выражения нет, возвращается None, а не "завтра".
+
+find_dates() проходит по всему тексту за один проход, поэтому им можно
+заранее просканировать целую транскрипцию.
+"""
+
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple
+import re
+
+# Время события, если указан только день
+DEFAULT_HOUR = 10
+
+_TOKEN_RE = re.compile(
+    r"(?P<iso>\d{4}-\d{2}-\d{2})"
+    r"|(?P<dmy>\d{1,2}\.\d{1,2}(?:\.\d{4}|\.\d{2})?)(?!\d)"
+    r"|(?P<clock>\d{1,2}:\d{2})"
+    r"|(?P<num>\d+)"
+    r"|(?P<word>[а-яa-z]+)"
+    r"|(?P<dash>[-–—])"
+)
+
+
+def _forms(groups) -> dict[str, int]:
+    """{форма слова: значение} из последовательности (значение, формы)."""
+    return {form: value for value, forms in groups for form in forms.split()}
+
+
+MONTHS = _forms([
+    (1, "января январь январе"), (2, "февраля февраль феврале"), (3, "марта март марте"),
+    (4, "апреля апрель апреле"), (5, "мая май мае"), (6, "июня июнь июне"),
+    (7, "июля июль июле"), (8, "августа август августе"), (9, "сентября сентябрь сентябре"),
+    (10, "октября октябрь октябре"), (11, "ноября ноябрь ноябре"), (12, "декабря декабрь декабре"),
+])
+WEEKDAYS = _forms([
+    (0, "понедельник понедельника понедельнику"),
+    (1, "вторник вторника вторнику"),
+    (2, "среда среду среды среде"),
+    (3, "четверг четверга четвергу"),
+    (4, "пятница пятницу пятницы пятнице"),
+    (5, "суббота субботу субботы субботе"),
+    (6, "воскресенье воскресенья воскресенью"),
+])
+RELATIVE_DAYS = {"сегодня": 0, "завтра": 1, "послезавтра": 2}
+NUMBER_WORDS = _forms([
+    (1, "один одну одна"), (2, "два две пару"), (3, "три"), (4, "четыре"), (5, "пять"),
+    (6, "шесть"), (7, "семь"), (8, "восемь"), (9, "девять"), (10, "десять"),
+    (11, "одиннадцать"), (12, "двенадцать"),
+])
+# "в половине третьего" = 2:30
+ORDINALS_GENITIVE = _forms([
+    (1, "первого"), (2, "второго"), (3, "третьего"), (4, "четвертого"), (5, "пятого"),
+    (6, "шестого"), (7, "седьмого"), (8, "восьмого"), (9, "девятого"), (10, "десятого"),
+    (11, "одиннадцатого"), (12, "двенадцатого"),
+])
+# "в полтретьего" — слитно
+HALF_PAST = {"пол" + form: value for form, value in ORDINALS_GENITIVE.items()}
+UNITS = {
+    **dict.fromkeys(("минуту", "минуты", "минут"), "minutes"),
+    **dict.fromkeys(("час", "часа", "часов"), "hours"),
+    **dict.fromkeys(("день", "дня", "дней"), "days"),
+    **dict.fromkeys(("неделю", "недели", "недель"), "weeks"),
+    **dict.fromkeys(("месяц", "месяца", "месяцев"), "months"),
+}
+HOUR_WORDS = frozenset({"час", "часа", "часов"})
+MINUTE_WORDS = frozenset({"минуту", "минуты", "минут"})
+NEXT_WORDS = frozenset({"следующий", "следующую", "следующее", "следующей", "следующего", "будущий", "будущую"})
+THIS_WORDS = frozenset({"этот", "эту", "это", "этой", "этого", "ближайший", "ближайшую", "ближайшее"})
+# "утром" — отдельное слово, "утра" — после часа ("в 8 утра")
+PARTS_OF_DAY = {"утром": "morning", "днем": "day", "вечером": "evening", "ночью": "night"}
+PARTS_AFTER_HOUR = {"утра": "morning", "дня": "day", "вечера": "evening", "ночи": "night"}
+PART_DEFAULT_HOUR = {"morning": 9, "day": 13, "evening": 19, "night": 23}
+PREPOSITIONS = frozenset({"в", "во", "на", "до", "к", "ко", "с", "со", "около", "по"})
+# После этих предлогов голое число — это час ("в 10", "к 5")
+TIME_PREPOSITIONS = frozenset({"в", "во", "к", "ко", "до", "с", "со", "около"})
+RANGE_SEPARATORS = frozenset({"до", "по", "-", "–", "—"})
+
+
+# Слова, с которых может начинаться выражение: остальные слова find_dates пропускает сразу
+START_WORDS = frozenset(
+    PREPOSITIONS | RELATIVE_DAYS.keys() | WEEKDAYS.keys() | NEXT_WORDS | THIS_WORDS
+    | PARTS_OF_DAY.keys() | NUMBER_WORDS.keys() | HALF_PAST.keys() | {"через", "полдень", "полночь", "половине", "пол"}
+)
+# Токены вне выражения, похожие на дату или время: parse_date возвращает их в leftover
+_DATE_LIKE_KINDS = frozenset({"iso", "dmy", "clock", "num"})
+_DATE_LIKE_WORDS = frozenset(
+    MONTHS.keys() | WEEKDAYS.keys() | RELATIVE_DAYS.keys() | ORDINALS_GENITIVE.keys() | HALF_PAST.keys()
+    | PARTS_OF_DAY.keys() | PARTS_AFTER_HOUR.keys() | HOUR_WORDS | MINUTE_WORDS
+    | {"полдень", "полночь", "половине", "полчаса"}
+)
+
+
+class _Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class ParsedDate:
+    """
+    Распознанное выражение даты/времени.
+
+    Attributes:
+        start: Начало (с временной зоной now)
+        end: Конец диапазона (исключительно) или None
+        has_date: День указан явно (иначе — ближайший подходящий)
+        has_time: Указано конкретное время (иначе — DEFAULT_HOUR или часть дня)
+        confidence: Уверенность разбора, 0..1
+        text: Найденный фрагмент исходного текста (вместе с предлогом)
+        span: Позиции фрагмента в исходном тексте
+        leftover: Похожие на дату/время токены вне фрагмента (только parse_date)
+    """
+    start: datetime
+    end: datetime | None
+    has_date: bool
+    has_time: bool
+    confidence: float
+    text: str
+    span: tuple[int, int]
+    leftover: tuple[str, ...] = ()
+
+    @property
+    def is_range(self) -> bool:
+        return self.end is not None
+
+
+class _Draft:
+    """Компоненты выражения до привязки к текущей дате."""
+    __slots__ = (
+        "day", "weekday", "day_conf", "hour", "minute", "time_conf", "part",
+        "end_day", "end_weekday", "end_hour", "end_minute", "offset", "found"
+    )
+
+    def __init__(self):
+        self.day: date | None = None
+        self.weekday: tuple[int, str] | None = None  # (день недели, "plain" | "this" | "next")
+        self.day_conf = 1.0
+        self.hour: int | None = None
+        self.minute = 0
+        self.time_conf = 1.0
+        self.part: str | None = None
+        self.end_day: date | None = None
+        self.end_weekday: int | None = None
+        self.end_hour: int | None = None
+        self.end_minute = 0
+        self.offset: timedelta | None = None
+        self.found = False
+
+    @property
+    def has_day(self) -> bool:
+        return self.day is not None or self.weekday is not None
+
+
+def _apply_part(hour: int, part: str | None) -> int:
+    """Час с учётом части дня: "3 часа дня" = 15, "12 ночи" = 0."""
+    if part in ("day", "evening") and hour < 12:
+        return hour + 12
+    if part == "night" and hour == 12:
+        return 0
+    if part == "morning" and hour == 12:
+        return 0
+    return hour
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    for last in (31, 30, 29, 28):
+        try:
+            return date(year, month, min(day.day, last))
+        except ValueError:
+            continue
+    raise ValueError("invalid date")
+
+
+class _Parser:
+    """Разбор одного текста относительно now."""
+
+    def __init__(self, text: str, now: datetime, for_day: bool = False):
+        self.text = text
+        self.now = now
+        self.for_day = for_day
+        self.today = now.date()
+        normalized = text.lower().replace("ё", "е")
+        self.tokens = [
+            _Token(m.lastgroup, m.group(), m.start(), m.end())
+            for m in _TOKEN_RE.finditer(normalized)
+        ]
+
+    # ------------------------------------------------------------------
+    # Выражение
+    # ------------------------------------------------------------------
+
+    def expression(self, i: int) -> tuple[int, _Draft] | None:
+        """Самое длинное выражение, начинающееся с токена i."""
+        draft = _Draft()
+        while i < len(self.tokens):
+            step = self._component(i, draft)
+            if step is None:
+                break
+            i = step
+            draft.found = True
+        return (i, draft) if draft.found else None
+
+    def _component(self, i: int, draft: _Draft) -> int | None:
+        word = self.tokens[i].text
+        if word in PREPOSITIONS:
+            if word in ("с", "со") and i + 1 < len(self.tokens):
+                step = self._range(i + 1, draft)
+                if step is not None:
+                    return step
+            if i + 1 < len(self.tokens):
+                return self._core(i + 1, draft, word)
+            return None
+        return self._core(i, draft, None)
+
+    def _core(self, i: int, draft: _Draft, prep: str | None) -> int | None:
+        if draft.offset is not None:
+            return None
+        if not draft.has_day:
+            step = self._day(i, draft, prep)
+            if step is not None:
+                return step
+            step = self._week(i, draft, prep)
+            if step is not None:
+                return step
+        if draft.hour is None:
+            step = self._clock(i, draft, prep, bare=prep in TIME_PREPOSITIONS)
+            if step is not None:
+                return self._time_range_tail(step, draft)
+            if draft.part is None and prep is None and self.tokens[i].text in PARTS_OF_DAY:
+                draft.part = PARTS_OF_DAY[self.tokens[i].text]
+                return i + 1
+        if not draft.has_day and draft.hour is None and prep is None and self.tokens[i].text == "через":
+            return self._through(i + 1, draft)
+        return None
+
+    # ------------------------------------------------------------------
+    # День
+    # ------------------------------------------------------------------
+
+    def _day(self, i: int, draft: _Draft, prep: str | None, end: bool = False) -> int | None:
+        """Явный день: ISO, 20.01, "3 февраля", "завтра", "в пятницу", "в следующий вторник"."""
+        tokens = self.tokens
+        token = tokens[i]
+        found = None  # (день | (weekday, mode), уверенность, следующий токен)
+
+        if token.kind == "iso":
+            try:
+                found = (date.fromisoformat(token.text), 1.0, i + 1)
+            except ValueError:
+                return None
+        elif token.kind == "dmy":
+            parts = [int(p) for p in token.text.split(".")]
+            # "3.5" без предлога и года — скорее номер версии, чем дата
+            if len(parts) == 2 and prep is None:
+                return None
+            year = parts[2] if len(parts) == 3 else None
+            if year is not None and year < 100:
+                year += 2000
+            day = self._calendar_day(parts[0], parts[1], year)
+            if day is None:
+                return None
+            found = (day, 0.95, i + 1)
+        elif token.kind == "word":
+            if token.text in RELATIVE_DAYS:
+                found = (self.today + timedelta(days=RELATIVE_DAYS[token.text]), 1.0, i + 1)
+            elif token.text in WEEKDAYS:
+                found = ((WEEKDAYS[token.text], "plain"), 0.95, i + 1)
+            elif (token.text in NEXT_WORDS or token.text in THIS_WORDS) and i + 1 < len(tokens) \
+                    and tokens[i + 1].text in WEEKDAYS:
+                mode = "next" if token.text in NEXT_WORDS else "this"
+                found = ((WEEKDAYS[tokens[i + 1].text], mode), 0.95, i + 2)
+        elif token.kind == "num" and i + 1 < len(tokens) and tokens[i + 1].text in MONTHS:
+            step = i + 2
+            year = None
+            if step < len(tokens) and tokens[step].kind == "num" and len(tokens[step].text) == 4:
+                year = int(tokens[step].text)
+                step += 1
+                if step < len(tokens) and tokens[step].text in ("года", "год", "г"):
+                    step += 1
+            day = self._calendar_day(int(token.text), MONTHS[tokens[i + 1].text], year)
+            if day is None:
+                return None
+            found = (day, 1.0, step)
+
+        if found is None:
+            return None
+        value, confidence, step = found
+        if end:
+            if isinstance(value, tuple):
+                draft.end_weekday = value[0]
+            else:
+                draft.end_day = value
+            return step
+        if isinstance(value, tuple):
+            draft.weekday = value
+        else:
+            draft.day = value
+        draft.day_conf = confidence
+        return step
+
+    def _calendar_day(self, day: int, month: int, year: int | None) -> date | None:
+        """Дата без года — ближайшая в будущем (прошедшая в этом году переносится на следующий)."""
+        try:
+            if year is not None:
+                return date(year, month, day)
+            result = date(self.today.year, month, day)
+            if result < self.today:
+                result = date(self.today.year + 1, month, day)
+            return result
+        except ValueError:
+            return None
+
+    def _week(self, i: int, draft: _Draft, prep: str | None) -> int | None:
+        """"на следующей неделе" (понедельник), "в выходные" (суббота) — приблизительные дни."""
+        tokens = self.tokens
+        if prep == "на" and tokens[i].text in NEXT_WORDS and i + 1 < len(tokens) and tokens[i + 1].text == "неделе":
+            draft.day = self.today + timedelta(days=7 - self.today.weekday())
+            draft.day_conf = 0.6
+            return i + 2
+        if prep in ("в", "на") and tokens[i].text in ("выходные", "выходных"):
+            draft.weekday = (5, "plain")
+            draft.day_conf = 0.7
+            return i + 1
+        return None
+
+    # ------------------------------------------------------------------
+    # Время
+    # ------------------------------------------------------------------
+
+    def _clock(self, i: int, draft: _Draft, prep: str | None, bare: bool, end: bool = False) -> int | None:
+        """
+        Время: "15:00", "в 15.30", "в 10", "в 3 часа дня", "в восемь вечера", "в полдень",
+        "в половине седьмого", "в полтретьего". Голое число — только после предлога времени
+        или с частью дня ("8 утра"), чтобы "купить 2 хлеба" не стало временем.
+        """
+        tokens = self.tokens
+        token = tokens[i]
+        minute = 0
+        step = i + 1
+        confidence = 1.0
+
+        if token.kind == "clock":
+            hour, minute = (int(p) for p in token.text.split(":"))
+        elif token.kind == "dmy":
+            # "в 15.30": дата не подошла (_day пробуется раньше), после предлога времени — часы и минуты
+            hours, _, minutes = token.text.partition(".")
+            if not bare or "." in minutes or len(minutes) != 2:
+                return None
+            hour, minute = int(hours), int(minutes)
+            confidence = 0.9
+        elif token.text == "полдень":
+            hour = 12
+        elif token.text == "полночь":
+            hour = 0
+        elif token.text in ("половине", "пол") and step < len(tokens) and tokens[step].text in ORDINALS_GENITIVE:
+            hour, minute = ORDINALS_GENITIVE[tokens[step].text] - 1, 30
+            step += 1
+            confidence = 0.9
+        elif token.text in HALF_PAST:
+            hour, minute = HALF_PAST[token.text] - 1, 30
+            confidence = 0.9
+        elif token.kind == "num" or token.text in NUMBER_WORDS:
+            hour = int(token.text) if token.kind == "num" else NUMBER_WORDS[token.text]
+            if hour > 24 or (token.kind == "num" and len(token.text) > 2):
+                return None
+            has_hour_word = step < len(tokens) and tokens[step].text in HOUR_WORDS
+            if has_hour_word:
+                step += 1
+                if step + 1 < len(tokens) and tokens[step].kind == "num" and tokens[step + 1].text in MINUTE_WORDS:
+                    minute = int(tokens[step].text)
+                    step += 2
+            has_part = step < len(tokens) and tokens[step].text in PARTS_AFTER_HOUR
+            if not (bare or has_part):
+                return None
+            confidence = 0.95 if has_part else 0.9 if has_hour_word else 0.8
+        else:
+            return None
+
+        part = None
+        if step < len(tokens) and tokens[step].text in PARTS_AFTER_HOUR:
+            part = PARTS_AFTER_HOUR[tokens[step].text]
+            step += 1
+        if part is not None:
+            hour = _apply_part(hour, part)
+        elif token.kind not in ("clock", "dmy") and 1 <= hour <= 7 and token.text not in ("полдень", "полночь"):
+            # "в 3" без части дня — скорее 15:00, чем 3 ночи
+            hour += 12
+            confidence = min(confidence, 0.7)
+
+        if hour == 24:
+            hour = 0
+        if not (0 <= hour <= 23 and 0 <= minute <= 59):
+            return None
+
+        if end:
+            draft.end_hour, draft.end_minute = hour, minute
+        else:
+            draft.hour, draft.minute, draft.time_conf = hour, minute, confidence
+            if part is not None:
+                draft.part = part
+        return step
+
+    def _time_range_tail(self, i: int, draft: _Draft) -> int:
+        """"10:00-11:30", "в 10 до 12" — конец диапазона после времени."""
+        tokens = self.tokens
+        if i + 1 < len(tokens) and tokens[i].text in RANGE_SEPARATORS and tokens[i].text != "по":
+            step = self._clock(i + 1, draft, None, bare=True, end=True)
+            if step is not None:
+                return step
+        return i
+
+    def _range(self, i: int, draft: _Draft) -> int | None:
+        """После "с": "с 10 до 12", "с понедельника по среду", "с 3 по 5 февраля"."""
+        tokens = self.tokens
+        # "с 3 по 5 февраля": у первого дня месяц берётся из второго
+        if tokens[i].kind == "num" and i + 2 < len(tokens) and tokens[i + 1].text in ("по", "до"):
+            step = self._day(i + 2, draft, None, end=True)
+            draft.end_weekday = None
+            if step is not None and draft.end_day is not None:
+                first = int(tokens[i].text)
+                try:
+                    draft.day = draft.end_day.replace(day=first)
+                except ValueError:
+                    draft.end_day = None
+                    return None
+                if draft.day > draft.end_day:
+                    draft.end_day = None
+                    return None
+                return step
+
+        if not draft.has_day:
+            step = self._day(i, draft, "с")
+            if step is not None:
+                if step + 1 < len(tokens) and tokens[step].text in RANGE_SEPARATORS:
+                    end_step = self._day(step + 1, draft, None, end=True)
+                    if end_step is not None:
+                        return end_step
+                return step
+
+        if draft.hour is None:
+            step = self._clock(i, draft, "с", bare=True)
+            if step is not None:
+                return self._time_range_tail(step, draft)
+        return None
+
+    def _through(self, i: int, draft: _Draft) -> int | None:
+        """"через 2 часа", "через неделю", "через пару дней", "через полчаса"."""
+        tokens = self.tokens
+        if i >= len(tokens):
+            return None
+        if tokens[i].text == "полчаса":
+            draft.offset = timedelta(minutes=30)
+            return i + 1
+
+        amount, step = 1, i
+        if tokens[i].kind == "num":
+            amount, step = int(tokens[i].text), i + 1
+        elif tokens[i].text in NUMBER_WORDS:
+            amount, step = NUMBER_WORDS[tokens[i].text], i + 1
+        if step >= len(tokens) or tokens[step].text not in UNITS:
+            return None
+
+        unit = UNITS[tokens[step].text]
+        if unit == "minutes":
+            draft.offset = timedelta(minutes=amount)
+        elif unit == "hours":
+            draft.offset = timedelta(hours=amount)
+        elif unit == "days":
+            draft.day = self.today + timedelta(days=amount)
+        elif unit == "weeks":
+            draft.day = self.today + timedelta(weeks=amount)
+        else:
+            draft.day = _add_months(self.today, amount)
+        return step + 1
+
+    # ------------------------------------------------------------------
+    # Привязка к текущему времени
+    # ------------------------------------------------------------------
+
+    def resolve(self, first: int, last: int, draft: _Draft) -> ParsedDate:
+        """Собирает ParsedDate из компонентов токенов [first, last)."""
+        tz = self.now.tzinfo
+        span = (self.tokens[first].start, self.tokens[last - 1].end)
+        text = self.text[span[0]:span[1]]
+
+        if draft.offset is not None:
+            start = (self.now + draft.offset).replace(second=0, microsecond=0)
+            return ParsedDate(start, None, True, True, 0.95, text, span)
+
+        confidence = 1.0
+        has_time = draft.hour is not None
+        if has_time:
+            hour, minute = draft.hour, draft.minute
+            confidence *= draft.time_conf
+        elif draft.part is not None:
+            hour, minute = PART_DEFAULT_HOUR[draft.part], 0
+            confidence *= 0.7
+        else:
+            hour, minute = DEFAULT_HOUR, 0
+
+        day = draft.day
+        if draft.weekday is not None:
+            weekday, mode = draft.weekday
+            if mode == "next":
+                day = self.today + timedelta(days=7 - self.today.weekday() + weekday)
+            else:
+                delta = (weekday - self.today.weekday()) % 7
+                # Сегодняшний день недели с уже прошедшим временем (указанным или
+                # DEFAULT_HOUR / часом части дня) — следующая неделя. Для дня
+                # ("что у меня в среду") время не важно: сегодня — это сегодня
+                if delta == 0 and mode == "plain" and not self.for_day and time(hour, minute) <= self.now.time():
+                    delta = 7
+                day = self.today + timedelta(days=delta)
+
+        has_date = day is not None
+        if has_date:
+            confidence *= draft.day_conf
+        else:
+            # Только время: сегодня, если ещё не прошло, иначе завтра
+            day = self.today
+            if not self.for_day and time(hour, minute) <= self.now.time():
+                day += timedelta(days=1)
+            confidence *= 0.85
+
+        start = datetime.combine(day, time(hour, minute), tzinfo=tz)
+        end = None
+        if draft.end_hour is not None:
+            end = datetime.combine(day, time(draft.end_hour, draft.end_minute), tzinfo=tz)
+            if end <= start:
+                end += timedelta(days=1)
+        elif draft.end_day is not None or draft.end_weekday is not None:
+            end_day = draft.end_day
+            if end_day is None:
+                end_day = day + timedelta(days=(draft.end_weekday - day.weekday()) % 7)
+            if end_day >= day:
+                # Диапазон дней без времени — целые дни
+                if not has_time:
+                    start = datetime.combine(day, time(0, 0), tzinfo=tz)
+                end = datetime.combine(end_day + timedelta(days=1), time(0, 0), tzinfo=tz)
+
+        return ParsedDate(start, end, has_date, has_time, round(confidence, 3), text, span)
+
+
+def find_dates(text: str, now: datetime) -> list[ParsedDate]:
+    """
+    Все выражения даты/времени в тексте (например, во всей транскрипции).
+
+    Args:
+        text: Текст
+        now: Текущий момент (с временной зоной) — точка отсчёта относительных дат
+
+    Returns:
+        Список ParsedDate в порядке появления
+    """
+    parser = _Parser(text, now)
+    results = []
+    i = 0
+    tokens = parser.tokens
+    while i < len(tokens):
+        if tokens[i].kind == "word" and tokens[i].text not in START_WORDS:
+            i += 1
+            continue
+        match = parser.expression(i)
+        if match is None:
+            i += 1
+            continue
+        end, draft = match
+        results.append(parser.resolve(i, end, draft))
+        i = end
+    return results
+
+
+def parse_date(text: str, now: datetime, for_day: bool = False) -> ParsedDate | None:
+    """
+    Первое выражение даты/времени в тексте.
+
+    Если вне выражения остались токены, похожие на дату или время ("завтра
+    в 15ч30" — "30"), они возвращаются в leftover, а уверенность снижается
+    вдвое: разбор, скорее всего, неполный.
+
+    Args:
+        text: Строка с датой ("в пятницу в 10", "3 февраля", "через 2 часа")
+        now: Текущий момент (с временной зоной)
+        for_day: Нужен день, а не начало события: сегодняшний день недели
+            не переносится на следующую неделю, если его час уже прошёл
+
+    Returns:
+        ParsedDate или None, если дата не распознана
+    """
+    parser = _Parser(text, now, for_day)
+    for i, token in enumerate(parser.tokens):
+        if token.kind == "word" and token.text not in START_WORDS:
+            continue
+        match = parser.expression(i)
+        if match is not None:
+            parsed = parser.resolve(i, match[0], match[1])
+            leftover = tuple(
+                t.text for j, t in enumerate(parser.tokens)
+                if not i <= j < match[0] and (t.kind in _DATE_LIKE_KINDS or t.text in _DATE_LIKE_WORDS)
+            )
+            if leftover:
+                parsed = replace(parsed, confidence=round(parsed.confidence / 2, 3), leftover=leftover)
+            return parsed
+    return None
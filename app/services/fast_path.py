@@ -0,0 +1,249 @@
+"""
+Fast Path
+
+Детерминированная обработка тривиальных заметок без LLM.
+
+Короткие однострочные задачи ("надо позвонить в банк") и явные идеи
+("идея: ...") распознаются локально по триггерам из AGENT_SYSTEM_PROMPT,
+дата срока извлекается грамматикой date_parser. Если уверенность
+ниже порога — заметка уходит в обычный process_transcription.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time
+import logging
+import re
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.date_parser import find_dates
+from app.services.github_vault import GitHubVaultService
+from app.services.intents import detect_intents, split_segments
+from app.services.write_journal import WriteJournal, unavailable_result
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FastPathDecision:
+    """Результат локальной классификации заметки."""
+    function: str | None
+    arguments: dict = field(default_factory=dict)
+    confidence: float = 0.0
+    reason: str = ""
+
+
+# Конкретное время — это уже событие календаря, а не задача
+_TIME_RE = re.compile(r"\d{1,2}:\d{2}|(?<!\w)в\s+\d{1,2}(?:\s+час)?(?!\w)|\d+\s*(?:час|мин)", re.IGNORECASE)
+_FILLERS_RE = re.compile(r"(?<!\w)(?:эээ|ээ|ну|типа|вот|короче|как бы)(?!\w)[,\s]*", re.IGNORECASE)
+_TODO_PREFIX_RE = re.compile(r"^(?:мне\s+)?(?:надо|нужно|не\s+забыть|не\s+забудь)\s+", re.IGNORECASE)
+_IDEA_PREFIX_RE = re.compile(r"^(?:у\s+меня\s+)?идея\s*[:\-—,]?\s*", re.IGNORECASE)
+_INFINITIVE_RE = re.compile(r"^\w+(?:ть|ти|чь)(?:ся|сь)?$", re.IGNORECASE)
+_HIGH_PRIORITY_RE = re.compile(r"(?<!\w)(?:срочно|важно|обязательно)(?!\w)\s*", re.IGNORECASE)
+_LOW_PRIORITY_RE = re.compile(r"(?<!\w)когда-нибудь(?!\w)\s*", re.IGNORECASE)
+
+
+def extract_due_date(text: str, today: date) -> tuple[date | None, str]:
+    """
+    Извлекает дату срока из текста задачи.
+
+    Args:
+        text: Текст задачи
+        today: Текущая дата
+
+    Returns:
+        (дата или None, текст без найденного выражения даты)
+    """
+    for parsed in find_dates(text, datetime.combine(today, dt_time(0, 0))):
+        # Только время без дня срок не задаёт
+        if not parsed.has_date:
+            continue
+        start, end = parsed.span
+        stripped = (text[:start] + text[end:]).strip(" ,.")
+        return parsed.start.date(), re.sub(r"\s{2,}", " ", stripped)
+    return None, text
+
+
+def _capitalize(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+class FastPath:
+    """
+    Локальный классификатор и исполнитель тривиальных заметок.
+
+    Ведёт статистику: попадания, промахи по причинам и оценку
+    сэкономленного времени относительно среднего прогона LLM агента.
+    """
+
+    def __init__(
+        self,
+        vault: GitHubVaultService,
+        min_confidence: float = 0.85,
+        max_words: int = 12,
+        timezone: str = "Europe/Berlin",
+        journal: WriteJournal | None = None
+    ):
+        self.vault = vault
+        # Журнал записей в vault на время недоступности GitHub
+        self.journal = journal
+        self.min_confidence = min_confidence
+        self.max_words = max_words
+        self.timezone = timezone
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses: dict[str, int] = {}
+        self._fast_seconds = 0.0
+        self._llm_runs = 0
+        self._llm_seconds = 0.0
+
+    def classify(self, transcription: str, today: date | None = None) -> FastPathDecision:
+        """
+        Классифицирует заметку без LLM.
+
+        Args:
+            transcription: Текст транскрипции
+            today: Текущая дата (для тестов; по умолчанию — сегодня в timezone)
+
+        Returns:
+            FastPathDecision; function=None если заметку должен обработать агент
+        """
+        today = today or datetime.now(ZoneInfo(self.timezone)).date()
+        text = _FILLERS_RE.sub("", transcription).strip(" .!\n")
+
+        if not text:
+            return FastPathDecision(None, reason="empty")
+        if "?" in text:
+            return FastPathDecision(None, reason="question")
+        if len(text.split()) > self.max_words:
+            return FastPathDecision(None, reason="too_long")
+        if _TIME_RE.search(text):
+            return FastPathDecision(None, reason="has_time")
+
+        # Явная идея ("идея: ...") важнее глаголов внутри неё ("можно сделать")
+        if _IDEA_PREFIX_RE.match(text):
+            return self._classify_idea(text)
+
+        if len(split_segments(text)) > 1:
+            return FastPathDecision(None, reason="multi_segment")
+
+        intents = detect_intents(text)
+        if len(intents) != 1:
+            return FastPathDecision(None, reason="no_intent" if not intents else "multi_intent")
+        if intents[0] == "todo":
+            return self._classify_todo(text, today)
+        return FastPathDecision(None, reason=f"intent_{intents[0]}")
+
+    def _classify_todo(self, text: str, today: date) -> FastPathDecision:
+        priority = "medium"
+        if _HIGH_PRIORITY_RE.search(text):
+            priority = "high"
+            text = _HIGH_PRIORITY_RE.sub("", text)
+        elif _LOW_PRIORITY_RE.search(text):
+            priority = "low"
+            text = _LOW_PRIORITY_RE.sub("", text)
+
+        due, text = extract_due_date(text, today)
+        task = _TODO_PREFIX_RE.sub("", text.strip()).strip(" ,.")
+        if not task:
+            return FastPathDecision(None, reason="empty_task")
+
+        # Задача должна начинаться с глагола в инфинитиве ("позвонить в банк")
+        confidence = 0.95 if _INFINITIVE_RE.match(task.split()[0]) else 0.6
+
+        arguments = {"task": _capitalize(task), "priority": priority}
+        if due:
+            arguments["due_date"] = due.isoformat()
+        return FastPathDecision("add_todo_task", arguments, confidence, reason="todo")
+
+    def _classify_idea(self, text: str) -> FastPathDecision:
+        body = _IDEA_PREFIX_RE.sub("", text).strip(" ,.")
+        words = body.split()
+        if len(words) < 2:
+            return FastPathDecision(None, reason="empty_idea")
+
+        # Заголовок — первые слова идеи (2-5 слов, как в system prompt)
+        title = _capitalize(" ".join(words[:5]))
+        arguments = {"title": title, "content": _capitalize(body) + ".", "folder": "Ideas"}
+        return FastPathDecision("create_note", arguments, 0.9, reason="idea")
+
+    async def run(self, transcription: str, vault=None) -> dict | None:
+        """
+        Выполняет заметку напрямую, если классификатор уверен.
+
+        Args:
+            transcription: Текст транскрипции
+            vault: Vault вместо основного (например, буфер пакетной обработки)
+
+        Returns:
+            dict в формате результата VoiceNotesAgent.process_transcription
+            или None, если заметку нужно отдать агенту
+        """
+        from app.tools.note_tools import create_note
+        from app.tools.todo_tools import add_todo_task
+
+        started = time.perf_counter()
+        decision = self.classify(transcription)
+
+        if decision.function is None or decision.confidence < self.min_confidence:
+            reason = decision.reason if decision.function is None else "low_confidence"
+            with self._lock:
+                self._misses[reason] = self._misses.get(reason, 0) + 1
+            return None
+
+        vault = vault or self.vault
+        try:
+            if decision.function == "add_todo_task":
+                result = await add_todo_task(**decision.arguments, vault=vault)
+            else:
+                result = await create_note(**decision.arguments, vault=vault)
+        except CircuitOpenError as e:
+            result = await unavailable_result(decision.function, decision.arguments, e, self.journal)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._hits += 1
+            self._fast_seconds += elapsed
+
+        logger.info("Fast path: %s (%s, %.0f ms)", decision.function, decision.reason, elapsed * 1000)
+
+        return {
+            "actions": [{
+                "function": decision.function,
+                "arguments": decision.arguments,
+                "result": result
+            }],
+            "summary": result,
+            "fast_path": {
+                "reason": decision.reason,
+                "confidence": decision.confidence,
+                "seconds": round(elapsed, 3)
+            }
+        }
+
+    def record_llm_run(self, seconds: float) -> None:
+        """Учитывает длительность прогона агента (для оценки сэкономленного времени)."""
+        with self._lock:
+            self._llm_runs += 1
+            self._llm_seconds += seconds
+
+    def stats(self) -> dict:
+        """Hit rate и оценка сэкономленного времени."""
+        with self._lock:
+            misses = sum(self._misses.values())
+            total = self._hits + misses
+            avg_llm = self._llm_seconds / self._llm_runs if self._llm_runs else None
+            saved = (
+                round(self._hits * avg_llm - self._fast_seconds, 3)
+                if avg_llm is not None else None
+            )
+            return {
+                "hits": self._hits,
+                "misses": misses,
+                "hit_rate": round(self._hits / total, 3) if total else None,
+                "miss_reasons": dict(self._misses),
+                "avg_llm_run_seconds": round(avg_llm, 3) if avg_llm is not None else None,
+                "estimated_seconds_saved": saved
+            }
@@ -0,0 +1,245 @@
+"""
+Free/Busy Service
+
+Проверка конфликтов перед созданием события и подбор свободных окон.
+
+Занятые интервалы берутся из локального зеркала календаря (CalendarMirror),
+а если оно выключено или устарело — из запроса freeBusy к Google,
+закэшированного на несколько минут. Поиск пересечений идёт по дереву
+интервалов: O(log n + k) на запрос даже для года событий.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import logging
+import math
+import time
+
+from app.services.google_calendar import GoogleCalendarService
+from app.services.metrics import CACHE, CONFLICTS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BusyInterval:
+    """Занятый интервал (summary есть только у событий из зеркала)."""
+    start: datetime
+    end: datetime
+    summary: str | None = None
+
+
+class IntervalTree:
+    """
+    Статическое дерево интервалов.
+
+    Интервалы отсортированы по началу; над ними неявное сбалансированное
+    дерево (как segment tree), где в каждом узле хранится максимальный конец
+    интервалов поддерева. Запрос [start, end) отбрасывает интервалы с началом
+    >= end бинарным поиском и спускается только в поддеревья, где есть
+    интервал, заканчивающийся позже start.
+    """
+
+    def __init__(self, intervals: list[BusyInterval]):
+        self._items = sorted(intervals, key=lambda i: (i.start, i.end))
+        self._starts = [i.start for i in self._items]
+        self._size = 1
+        while self._size < len(self._items):
+            self._size *= 2
+        self._max_end = [-math.inf] * (2 * self._size)
+        for i, item in enumerate(self._items):
+            self._max_end[self._size + i] = item.end.timestamp()
+        for node in range(self._size - 1, 0, -1):
+            self._max_end[node] = max(self._max_end[2 * node], self._max_end[2 * node + 1])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[BusyInterval]:
+        """Интервалы, пересекающиеся с [start, end), в порядке начала."""
+        limit = bisect_left(self._starts, end)  # у [0, limit) начало раньше end
+        if limit == 0:
+            return []
+        after = start.timestamp()
+        result = []
+        # Обход слева направо: (узел, левая граница покрываемого диапазона, ширина)
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, lo, width = stack.pop()
+            if lo >= limit or self._max_end[node] <= after:
+                continue
+            if width == 1:
+                result.append(self._items[lo])
+                continue
+            half = width // 2
+            stack.append((2 * node + 1, lo + half, half))
+            stack.append((2 * node, lo, half))
+        return result
+
+
+@dataclass
+class FreeBusyResult:
+    """Результат проверки интервала."""
+    conflicts: list[BusyInterval] = field(default_factory=list)
+    free_slots: list[tuple[datetime, datetime]] = field(default_factory=list)
+    source: str = "mirror"
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.conflicts)
+
+
+class FreeBusyService:
+    """
+    Конфликты и свободные окна для нового события.
+
+    Args:
+        calendar: GoogleCalendarService
+        mirror: CalendarMirror (опционально; без него — только запрос freeBusy)
+        cache_seconds: Сколько жить закэшированному ответу freeBusy
+        horizon_days: На сколько дней вперёд искать свободные окна
+        work_start_hour: Начало рабочего дня для предлагаемых окон
+        work_end_hour: Конец рабочего дня для предлагаемых окон
+        slot_step_minutes: Шаг выравнивания начала предлагаемых окон
+        max_suggestions: Сколько свободных окон предлагать
+    """
+
+    def __init__(
+        self,
+        calendar: GoogleCalendarService,
+        mirror=None,
+        cache_seconds: float = 120.0,
+        horizon_days: int = 7,
+        work_start_hour: int = 9,
+        work_end_hour: int = 20,
+        slot_step_minutes: int = 30,
+        max_suggestions: int = 3
+    ):
+        self.calendar = calendar
+        self.mirror = mirror
+        self.cache_seconds = cache_seconds
+        self.horizon_days = horizon_days
+        self.work_start_hour = work_start_hour
+        self.work_end_hour = work_end_hour
+        self.slot_step = timedelta(minutes=slot_step_minutes)
+        self.max_suggestions = max_suggestions
+        self.tz = ZoneInfo(calendar.timezone)
+
+        self._mirror_tree: IntervalTree | None = None
+        self._mirror_version = -1
+        # День начала окна -> (время запроса, дерево по ответу freeBusy, конец окна)
+        self._api_cache: dict = {}
+        self.checks = 0
+        self.conflicts_found = 0
+        self.api_queries = 0
+
+    def invalidate(self) -> None:
+        """Сбрасывает кэш freeBusy (после создания события)."""
+        self._api_cache.clear()
+
+    async def check(self, start: datetime, end: datetime) -> FreeBusyResult:
+        """
+        Проверяет интервал [start, end) на пересечения с занятым временем.
+
+        Returns:
+            FreeBusyResult с конфликтами и — если они есть — свободными окнами той же длительности
+        """
+        tree, source = await self._tree(start, end)
+        return self._check(tree, source, start, end)
+
+    async def check_many(self, intervals: list[tuple[datetime, datetime]]) -> list[FreeBusyResult]:
+        """
+        Проверяет несколько интервалов (события одного batch запроса).
+
+        Занятость берётся один раз — на окно от самого раннего начала до
+        самого позднего конца, — и все интервалы проверяются по одному дереву.
+
+        Returns:
+            FreeBusyResult для каждого интервала в том же порядке
+        """
+        if not intervals:
+            return []
+        tree, source = await self._tree(min(s for s, _ in intervals), max(e for _, e in intervals))
+        return [self._check(tree, source, start, end) for start, end in intervals]
+
+    def _check(self, tree: IntervalTree, source: str, start: datetime, end: datetime) -> FreeBusyResult:
+        self.checks += 1
+        result = FreeBusyResult(conflicts=tree.overlapping(start, end), source=source)
+        if result.conflicts:
+            self.conflicts_found += 1
+            CONFLICTS.inc(kind="calendar_busy")
+            result.free_slots = self._suggest(tree, start, end - start)
+        return result
+
+    async def _tree(self, start: datetime, end: datetime) -> tuple[IntervalTree, str]:
+        if self.mirror is not None and self.mirror.is_fresh():
+            # Перестраиваем дерево только если зеркало изменилось
+            if self._mirror_tree is None or self._mirror_version != self.mirror.version:
+                self._mirror_tree = IntervalTree([
+                    BusyInterval(e.start, e.end, e.summary) for e in self.mirror.busy_events()
+                ])
+                self._mirror_version = self.mirror.version
+            CACHE.inc(cache="free_busy", result="mirror")
+            return self._mirror_tree, "mirror"
+
+        day = start.astimezone(self.tz).date()
+        window_start = datetime.combine(day, datetime.min.time(), tzinfo=self.tz)
+        # Окно покрывает и проверяемые интервалы, и горизонт поиска свободных окон
+        last_day = end.astimezone(self.tz).date() + timedelta(days=1)
+        window_end = max(
+            window_start + timedelta(days=self.horizon_days + 1),
+            datetime.combine(last_day, datetime.min.time(), tzinfo=self.tz)
+        )
+        cached = self._api_cache.get(day)
+        if cached and time.monotonic() - cached[0] < self.cache_seconds and cached[2] >= window_end:
+            CACHE.inc(cache="free_busy", result="hit")
+            return cached[1], "freebusy_cache"
+        CACHE.inc(cache="free_busy", result="miss")
+
+        busy = await self.calendar.query_free_busy(window_start, window_end)
+        self.api_queries += 1
+        tree = IntervalTree([BusyInterval(s, e) for s, e in busy])
+        self._api_cache[day] = (time.monotonic(), tree, window_end)
+        return tree, "freebusy"
+
+    def _suggest(self, tree: IntervalTree, start: datetime, duration: timedelta) -> list[tuple[datetime, datetime]]:
+        """Первые свободные окна нужной длительности в рабочие часы начиная с start."""
+        slots = []
+        local_start = start.astimezone(self.tz)
+        for offset in range(self.horizon_days + 1):
+            day = local_start.date() + timedelta(days=offset)
+            day_start = datetime.combine(day, datetime.min.time(), tzinfo=self.tz)
+            window_start = day_start + timedelta(hours=self.work_start_hour)
+            window_end = day_start + timedelta(hours=self.work_end_hour)
+            if offset == 0:
+                window_start = max(window_start, self._align(local_start))
+
+            cursor = window_start
+            for busy in tree.overlapping(window_start, window_end):
+                if busy.start - cursor >= duration:
+                    slots.append((cursor, cursor + duration))
+                    if len(slots) >= self.max_suggestions:
+                        return slots
+                cursor = max(cursor, self._align(busy.end))
+            if window_end - cursor >= duration:
+                slots.append((cursor, cursor + duration))
+                if len(slots) >= self.max_suggestions:
+                    return slots
+        return slots
+
+    def _align(self, moment: datetime) -> datetime:
+        """Округляет время вверх до шага окон."""
+        moment = moment.astimezone(self.tz)
+        day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        steps = math.ceil((moment - day_start) / self.slot_step)
+        return day_start + steps * self.slot_step
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "conflicts": self.conflicts_found,
+            "api_queries": self.api_queries,
+            "tree_size": len(self._mirror_tree) if self._mirror_tree is not None else None,
+        }
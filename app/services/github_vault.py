@@ -7,8 +7,13 @@ GitHub Vault Service
 
 import httpx
 import base64
+import time
 from dataclasses import dataclass
 
+from app.services.circuit_breaker import CircuitBreaker, is_outage_status
+from app.services.metrics import CONFLICTS, GITHUB_SECONDS, RETRIES, status_label
+from app.services.tracing import tracer
+
 
 @dataclass
 class FileInfo:
@@ -18,6 +23,66 @@ class FileInfo:
     content: str | None = None
 
 
+class _MeteredTransport(httpx.AsyncBaseTransport):
+    """Транспорт, записывающий длительность и спан каждого запроса к GitHub по операции и статусу."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, base_path: str):
+        self.inner = inner
+        self.base_path = base_path
+
+    def _operation(self, request: httpx.Request) -> str:
+        # /repos/o/r/contents/... -> get_contents, /repos/o/r/git/refs/... -> patch_git_refs
+        path = request.url.path
+        if path.startswith(self.base_path):
+            path = path[len(self.base_path):]
+        parts = path.strip("/").split("/")
+        kind = f"git_{parts[1]}" if parts[0] == "git" and len(parts) > 1 else parts[0]
+        return f"{request.method.lower()}_{kind}"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        operation = self._operation(request)
+        started = time.perf_counter()
+        status = None
+        with tracer.span(
+            f"github.{operation}", **{"http.method": request.method, "http.path": request.url.path}
+        ) as span:
+            try:
+                response = await self.inner.handle_async_request(request)
+                status = response.status_code
+                span.set_attribute("http.status_code", status)
+                # 404 на чтении — обычный ответ "файла нет", не ошибка
+                if status >= 400 and status != 404:
+                    span.set_error(f"HTTP {status}")
+                return response
+            finally:
+                GITHUB_SECONDS.observe(
+                    time.perf_counter() - started, operation=operation, status=status_label(status)
+                )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class _CircuitTransport(httpx.AsyncBaseTransport):
+    """
+    Транспорт под circuit breaker: при открытом breaker запрос к GitHub не уходит
+    (CircuitOpenError сразу); сеть, таймауты, 5xx и 429 считаются сбоями.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, breaker: CircuitBreaker):
+        self.inner = inner
+        self.breaker = breaker
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with self.breaker.guard() as outcome:
+            response = await self.inner.handle_async_request(request)
+            outcome["ok"] = not is_outage_status(response.status_code)
+            return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
 class GitHubVaultService:
     """
     Сервис для работы с Obsidian vault через GitHub API.
@@ -30,7 +95,9 @@ class GitHubVaultService:
         token: str,
         repo_owner: str,
         repo_name: str,
-        branch: str = "main"
+        branch: str = "main",
+        transport: httpx.AsyncBaseTransport | None = None,
+        breaker: CircuitBreaker | None = None
     ):
         self.token = token
         self.repo_owner = repo_owner
@@ -42,19 +109,45 @@ class GitHubVaultService:
             "Accept": "application/vnd.github.v3+json",
             "X-GitHub-Api-Version": "2022-11-28"
         }
+        # Транспорт httpx (например, CassetteTransport для записи/воспроизведения)
+        self.transport = transport
+        # Circuit breaker GitHub API (None — без быстрого отказа)
+        self.breaker = breaker
+
+    def _client(self) -> httpx.AsyncClient:
+        transport = _MeteredTransport(
+            self.transport or httpx.AsyncHTTPTransport(),
+            f"/repos/{self.repo_owner}/{self.repo_name}"
+        )
+        if self.breaker is not None:
+            # Снаружи метрик: отклонённый запрос не попадает в github.* спаны и гистограмму
+            transport = _CircuitTransport(transport, self.breaker)
+        return httpx.AsyncClient(transport=transport)
+
+    async def rate_limit(self) -> dict:
+        """
+        Лимит запросов GitHub API: limit, remaining, reset (GET /rate_limit лимит не расходует).
+
+        Заодно проверяет токен: просроченный или отозванный даёт 401.
+        """
+        async with self._client() as client:
+            response = await client.get("https://api.github.com/rate_limit", headers=self.headers)
+            response.raise_for_status()
+            return response.json()["resources"]["core"]
 
-    async def get_file(self, path: str) -> FileInfo | None:
+    async def get_file(self, path: str, ref: str | None = None) -> FileInfo | None:
         """
         Получает содержимое файла из репозитория.
 
         Args:
             path: Путь к файлу относительно корня vault
+            ref: Коммит или ветка (по умолчанию — ветка vault)
 
         Returns:
             FileInfo с содержимым и SHA, или None если файл не найден
         """
-        async with httpx.AsyncClient() as client:
-            url = f"{self.base_url}/contents/{path}?ref={self.branch}"
+        async with self._client() as client:
+            url = f"{self.base_url}/contents/{path}?ref={ref or self.branch}"
             response = await client.get(url, headers=self.headers)
 
             # Если файл не найден - возвращаем None
@@ -102,7 +195,7 @@ class GitHubVaultService:
             "branch": self.branch
         }
 
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/contents/{path}"
             response = await client.put(url, headers=self.headers, json=body)
 
@@ -146,7 +239,7 @@ class GitHubVaultService:
             "branch": self.branch
         }
 
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/contents/{path}"
             response = await client.put(url, headers=self.headers, json=body)
 
@@ -168,7 +261,7 @@ class GitHubVaultService:
         Returns:
             Список ИМЁН файлов (без пути к папке)
         """
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/contents/{folder_path}?ref={self.branch}"
             response = await client.get(url, headers=self.headers)
 
@@ -198,3 +291,85 @@ class GitHubVaultService:
             return await self.update_file(path, content, existing.sha, commit_message)
         else:
             return await self.create_file(path, content, commit_message)
+
+    async def commit_files(
+        self,
+        files: dict[str, str],
+        commit_message: str,
+        base_shas: dict[str, str | None] | None = None,
+        max_attempts: int = 3
+    ) -> str:
+        """
+        Записывает несколько файлов одним коммитом через Git Data API.
+
+        Contents API делает по коммиту на каждый файл; здесь дерево с новыми
+        файлами создаётся поверх текущего коммита ветки и ветка переводится
+        на новый коммит (без force).
+
+        Args:
+            files: Путь -> новое содержимое
+            commit_message: Сообщение коммита
+            base_shas: Путь -> SHA версии файла, на которой основано изменение
+                (None — файла не было). Перед каждой попыткой (и первой тоже)
+                сверяются с файлами родительского коммита: если файл изменили
+                после чтения, коммит не создаётся.
+            max_attempts: Сколько раз пробовать при гонке с другим коммитом
+
+        Returns:
+            SHA созданного коммита
+
+        Raises:
+            Exception: Если записываемые файлы изменились в ветке (конфликт)
+        """
+        tree = [
+            {"path": path, "mode": "100644", "type": "blob", "content": content}
+            for path, content in files.items()
+        ]
+
+        async with self._client() as client:
+            for attempt in range(1, max_attempts + 1):
+                # Текущий коммит ветки и его дерево
+                response = await client.get(f"{self.base_url}/git/ref/heads/{self.branch}", headers=self.headers)
+                response.raise_for_status()
+                parent_sha = response.json()["object"]["sha"]
+
+                response = await client.get(f"{self.base_url}/git/commits/{parent_sha}", headers=self.headers)
+                response.raise_for_status()
+                base_tree = response.json()["tree"]["sha"]
+
+                # Ветка могла уйти вперёд после того, как мы прочитали файлы (в том
+                # числе до первой попытки): дерево поверх base_tree затёрло бы чужую запись
+                if base_shas:
+                    for path, sha in base_shas.items():
+                        current = await self.get_file(path, ref=parent_sha)
+                        if (current.sha if current else None) != sha:
+                            CONFLICTS.inc(kind="vault_commit")
+                            raise Exception(f"Конфликт: {path} изменён в ветке {self.branch}")
+
+                response = await client.post(
+                    f"{self.base_url}/git/trees",
+                    headers=self.headers,
+                    json={"base_tree": base_tree, "tree": tree}
+                )
+                response.raise_for_status()
+                tree_sha = response.json()["sha"]
+
+                response = await client.post(
+                    f"{self.base_url}/git/commits",
+                    headers=self.headers,
+                    json={"message": commit_message, "tree": tree_sha, "parents": [parent_sha]}
+                )
+                response.raise_for_status()
+                commit_sha = response.json()["sha"]
+
+                # 422 — не fast-forward: кто-то закоммитил между чтением ref и обновлением
+                response = await client.patch(
+                    f"{self.base_url}/git/refs/heads/{self.branch}",
+                    headers=self.headers,
+                    json={"sha": commit_sha, "force": False}
+                )
+                if response.status_code == 422 and attempt < max_attempts:
+                    RETRIES.inc(operation="vault_commit")
+                    continue
+                response.raise_for_status()
+                return commit_sha
@@ -3,17 +3,55 @@ Google Calendar Service
 
 Сервис для работы с Google Calendar API.
 Использует Service Account для серверной авторизации.
+
+googleapiclient синхронный: каждый .execute() выполняется в ограниченном
+пуле потоков, чтобы не блокировать event loop uvicorn. httplib2 не
+потокобезопасен, поэтому у каждого потока пула свой HTTP клиент.
+
+Клиент создаётся лениво — при первом обращении или в фоновом прогреве.
+google-auth / googleapiclient импортируются только тогда же, а discovery
+документ берётся из поставляемого с googleapiclient файла и кэшируется
+в процессе, поэтому холодный старт приложения за них не платит.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+import asyncio
+import json
 import logging
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import threading
+import time
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, guard
+from app.services.metrics import CACHE, CALENDAR_SECONDS, status_label
+from app.services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# Максимум вызовов в одном batch запросе Calendar API
+BATCH_LIMIT = 50
+
+
+@lru_cache(maxsize=1)
+def calendar_discovery_document() -> dict:
+    """
+    Discovery документ Calendar API v3 из пакета googleapiclient.
+
+    Читается и парсится один раз на процесс; сетевой запрос к
+    discovery сервису не нужен.
+    """
+    import googleapiclient
+
+    path = Path(googleapiclient.__file__).parent / "discovery_cache" / "documents" / "calendar.v3.json"
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class SyncTokenExpired(Exception):
+    """syncToken больше не действителен (HTTP 410) — нужна полная синхронизация."""
+
 
 class GoogleCalendarService:
     """
@@ -22,28 +60,152 @@ class GoogleCalendarService:
     Использует Service Account credentials для авторизации.
     """
 
-    def __init__(self, credentials_json: dict, calendar_id: str = "primary", timezone: str = "Europe/Berlin"):
+    def __init__(
+        self,
+        credentials_json: dict | None,
+        calendar_id: str = "primary",
+        timezone: str = "Europe/Berlin",
+        http_wrapper: Callable | None = None,
+        max_workers: int = 4,
+        request_timeout: float = 30.0,
+        breaker: CircuitBreaker | None = None
+    ):
         """
-        Инициализация сервиса.
+        Инициализация сервиса (без обращения к Google и без тяжёлых импортов).
 
         Args:
             credentials_json: Service Account credentials в формате dict
+                (может быть None только вместе с http_wrapper — режим воспроизведения)
             calendar_id: ID календаря (default: "primary")
             timezone: Временная зона для событий (default: "Europe/Berlin")
+            http_wrapper: Обёртка над авторизованным httplib2 клиентом
+                (например, CassetteHttp для записи/воспроизведения)
+            max_workers: Размер пула потоков для вызовов Google API
+            request_timeout: Таймаут HTTP запроса к Google API (секунды)
+            breaker: Circuit breaker Calendar API (None — без быстрого отказа)
         """
         self.calendar_id = calendar_id
         self.timezone = timezone
+        self.request_timeout = request_timeout
+        self.breaker = breaker
+        self._credentials_json = credentials_json
+        self._http_wrapper = http_wrapper
+        self._thread_local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gcal")
+        self._init_lock = threading.Lock()
+        self._credentials = None
+        self._service = None
+        self.init_seconds: float | None = None
+        # Локальное зеркало событий (CalendarMirror) и проверка занятости (FreeBusyService), если включены
+        self.mirror = None
+        self.free_busy = None
+
+    @property
+    def service(self):
+        """Клиент Calendar API (создаётся при первом обращении)."""
+        if self._service is None:
+            self._initialize()
+        return self._service
+
+    def _initialize(self) -> None:
+        """Создаёт credentials и клиент Calendar API (один раз, потокобезопасно)."""
+        with self._init_lock:
+            if self._service is not None:
+                return
+            started = time.perf_counter()
 
-        # Создаём credentials из JSON
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_json,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
+            from googleapiclient.discovery import build_from_document
+
+            # Создаём credentials из JSON (общие для всех потоков: токен обновляется один раз)
+            if self._credentials_json is not None:
+                from google.oauth2 import service_account
+
+                self._credentials = service_account.Credentials.from_service_account_info(
+                    self._credentials_json,
+                    scopes=["https://www.googleapis.com/auth/calendar"]
+                )
+
+            # Создаём клиент Calendar API из закэшированного discovery документа
+            self._service = build_from_document(calendar_discovery_document(), http=self._new_http())
+
+            self.init_seconds = time.perf_counter() - started
+            logger.info("Google Calendar client initialized in %.0f ms", self.init_seconds * 1000)
+
+    async def warm_up(self) -> None:
+        """Создаёт клиент в фоне (в пуле потоков), чтобы первый вызов не платил за инициализацию."""
+        if self._service is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._initialize)
+        except Exception as e:
+            logger.error("Google Calendar warm-up failed: %s", e, exc_info=True)
+
+    def _new_http(self):
+        """Новый авторизованный httplib2 клиент (с обёрткой, если задана)."""
+        http = None
+        if self._credentials is not None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+
+            http = AuthorizedHttp(self._credentials, http=httplib2.Http(timeout=self.request_timeout))
+        if self._http_wrapper:
+            http = self._http_wrapper(http)
+        return http
+
+    def _thread_http(self):
+        """HTTP клиент текущего потока пула."""
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            http = self._new_http()
+            self._thread_local.http = http
+        return http
+
+    async def _get_service(self):
+        """Клиент Calendar API; первая инициализация выполняется в пуле потоков."""
+        if self._service is None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self._initialize)
+        return self._service
+
+    async def _execute(self, request, operation: str):
+        """
+        Выполняет googleapiclient запрос в пуле потоков (operation — метка для метрик и имя спана).
+
+        При открытом breaker сразу бросает CircuitOpenError: запрос не занимает
+        поток пула и не ждёт request_timeout.
+        """
+        loop = asyncio.get_running_loop()
+        with guard(self.breaker), tracer.span(f"calendar.{operation}"), \
+                CALENDAR_SECONDS.time(operation=operation) as labels:
+            try:
+                return await loop.run_in_executor(
+                    self._executor, lambda: request.execute(http=self._thread_http())
+                )
+            except Exception as e:
+                # HttpError: статус ответа; остальное (сеть, таймаут) — error
+                resp = getattr(e, "resp", None)
+                labels["status"] = status_label(getattr(resp, "status", None) and int(resp.status))
+                raise
 
-        # Создаём клиент Calendar API
-        self.service = build("calendar", "v3", credentials=credentials)
+    async def ping(self) -> None:
+        """Самый лёгкий запрос к Calendar API (id календаря): доступ, credentials и сеть."""
+        service = await self._get_service()
+        await self._execute(service.calendars().get(calendarId=self.calendar_id, fields="id"), "ping")
 
-    def create_event(
+    def _mirror_fresh(self) -> bool:
+        """Можно ли ответить из зеркала (попадание/промах считается в метриках)."""
+        if self.mirror is None:
+            return False
+        fresh = self.mirror.is_fresh()
+        CACHE.inc(cache="calendar_mirror", result="hit" if fresh else "stale")
+        return fresh
+
+    def close(self) -> None:
+        """Останавливает пул потоков."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def create_event(
         self,
         summary: str,
         start_datetime: datetime,
@@ -67,61 +229,161 @@ class GoogleCalendarService:
         Raises:
             Exception: Если создание события не удалось
         """
-        try:
-            # Если end_datetime не указан, берём +1 час от начала
-            if end_datetime is None:
-                end_datetime = start_datetime + timedelta(hours=1)
+        from googleapiclient.errors import HttpError
 
+        try:
             # Формируем событие
-            event = {
-                "summary": summary,
-                "start": {
-                    "dateTime": start_datetime.isoformat(),
-                    "timeZone": self.timezone,
-                },
-                "end": {
-                    "dateTime": end_datetime.isoformat(),
-                    "timeZone": self.timezone,
-                },
-            }
-
-            # Добавляем опциональные поля
-            if description:
-                event["description"] = description
-            if location:
-                event["location"] = location
+            event = self._event_body(summary, start_datetime, end_datetime, description, location)
 
             # Создаём событие
-            result = self.service.events().insert(
+            service = await self._get_service()
+            result = await self._execute(service.events().insert(
                 calendarId=self.calendar_id,
                 body=event
-            ).execute()
+            ), "insert")
 
             event_id = result.get("id")
             html_link = result.get("htmlLink")
             logger.info(
-                f"✅ Calendar event created successfully: '{summary}' at {start_datetime.isoformat()}\n"
-                f"   Calendar ID: {self.calendar_id}\n"
-                f"   Event ID: {event_id}\n"
-                f"   Link: {html_link}"
+                "✅ Calendar event created: '%s' at %s", summary, start_datetime,
+                extra={"calendar_id": self.calendar_id, "event_id": event_id, "event_link": html_link}
             )
 
-            return {
-                "id": event_id,
-                "summary": result.get("summary"),
-                "start": result["start"].get("dateTime"),
-                "end": result["end"].get("dateTime"),
-                "htmlLink": html_link
-            }
+            if self.mirror is not None:
+                self.mirror.upsert(result)
+            if self.free_busy is not None:
+                self.free_busy.invalidate()
+
+            return self._event_info(result)
 
         except HttpError as e:
-            logger.error(f"Google Calendar API error: {e}", exc_info=True)
+            logger.error("Google Calendar API error: %s", e, exc_info=True)
             raise Exception(f"Ошибка создания события: {e}")
         except Exception as e:
-            logger.error(f"Error creating calendar event: {e}", exc_info=True)
+            logger.error("Error creating calendar event: %s", e, exc_info=True)
             raise
 
-    def list_upcoming_events(self, max_results: int = 10) -> list[dict]:
+    async def create_events(self, events: list[dict]) -> list[dict | Exception]:
+        """
+        Создаёт несколько событий одним HTTP запросом (Calendar batch endpoint).
+
+        Args:
+            events: Список dict с ключами create_event: summary, start_datetime,
+                end_datetime, description, location
+
+        Returns:
+            Список того же размера и порядка: dict с информацией о событии
+            или Exception для события, которое создать не удалось
+
+        Raises:
+            CircuitOpenError: breaker открыт до того, как создано хоть одно событие
+        """
+        from googleapiclient.errors import HttpError
+
+        if not events:
+            return []
+
+        service = await self._get_service()
+        results: list[dict | Exception | None] = [None] * len(events)
+        created_raw: list[dict] = []
+
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            if exception is not None:
+                if isinstance(exception, HttpError):
+                    exception = Exception(f"Ошибка создания события: {exception}")
+                results[index] = exception
+            else:
+                created_raw.append(response)
+                results[index] = self._event_info(response)
+
+        # Calendar API принимает не больше 50 вызовов в одном batch запросе
+        for chunk_start in range(0, len(events), BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=on_response)
+            for index in range(chunk_start, min(chunk_start + BATCH_LIMIT, len(events))):
+                spec = events[index]
+                body = self._event_body(
+                    spec["summary"],
+                    spec["start_datetime"],
+                    spec.get("end_datetime"),
+                    spec.get("description"),
+                    spec.get("location")
+                )
+                batch.add(
+                    service.events().insert(calendarId=self.calendar_id, body=body),
+                    request_id=str(index)
+                )
+            try:
+                await self._execute(batch, "batch_insert")
+            except CircuitOpenError as e:
+                # Breaker открыт: если ничего не создано — отказ целиком (агент
+                # ответит "сервис недоступен"), иначе — ошибка для оставшихся событий
+                if not created_raw:
+                    raise
+                for index in range(chunk_start, len(events)):
+                    results[index] = e
+                break
+            except Exception as e:
+                # Упал весь batch запрос — ошибка для каждого ещё не отвеченного события
+                logger.error("Google Calendar batch request failed: %s", e, exc_info=True)
+                for index in range(chunk_start, min(chunk_start + BATCH_LIMIT, len(events))):
+                    if results[index] is None:
+                        results[index] = Exception(f"Ошибка создания события: {e}")
+
+        if self.mirror is not None:
+            for raw in created_raw:
+                self.mirror.upsert(raw)
+        if self.free_busy is not None and created_raw:
+            self.free_busy.invalidate()
+
+        created = sum(1 for r in results if isinstance(r, dict))
+        logger.info("✅ Calendar batch: %d/%d events created", created, len(events))
+        return results
+
+    def _event_body(
+        self,
+        summary: str,
+        start_datetime: datetime,
+        end_datetime: Optional[datetime] = None,
+        description: Optional[str] = None,
+        location: Optional[str] = None
+    ) -> dict:
+        """Тело события для events().insert."""
+        # Если end_datetime не указан, берём +1 час от начала
+        if end_datetime is None:
+            end_datetime = start_datetime + timedelta(hours=1)
+
+        event = {
+            "summary": summary,
+            "start": {
+                "dateTime": start_datetime.isoformat(),
+                "timeZone": self.timezone,
+            },
+            "end": {
+                "dateTime": end_datetime.isoformat(),
+                "timeZone": self.timezone,
+            },
+        }
+
+        # Добавляем опциональные поля
+        if description:
+            event["description"] = description
+        if location:
+            event["location"] = location
+        return event
+
+    @staticmethod
+    def _event_info(result: dict) -> dict:
+        """Краткая информация о созданном событии из ответа API."""
+        return {
+            "id": result.get("id"),
+            "summary": result.get("summary"),
+            "start": result["start"].get("dateTime"),
+            "end": result["end"].get("dateTime"),
+            "htmlLink": result.get("htmlLink")
+        }
+
+    async def list_upcoming_events(self, max_results: int = 10) -> list[dict]:
         """
         Получает список ближайших событий.
 
@@ -131,16 +393,23 @@ class GoogleCalendarService:
         Returns:
             Список событий
         """
+        from googleapiclient.errors import HttpError
+
+        # Свежее локальное зеркало отвечает без запроса к Google
+        if self._mirror_fresh():
+            return self.mirror.upcoming(max_results)
+
         try:
             now = datetime.utcnow().isoformat() + "Z"  # 'Z' indicates UTC time
 
-            events_result = self.service.events().list(
+            service = await self._get_service()
+            events_result = await self._execute(service.events().list(
                 calendarId=self.calendar_id,
                 timeMin=now,
                 maxResults=max_results,
                 singleEvents=True,
                 orderBy="startTime"
-            ).execute()
+            ), "list")
 
             events = events_result.get("items", [])
 
@@ -155,8 +424,131 @@ class GoogleCalendarService:
             ]
 
         except HttpError as e:
-            logger.error(f"Google Calendar API error: {e}", exc_info=True)
+            logger.error("Google Calendar API error: %s", e, exc_info=True)
+            raise Exception(f"Ошибка получения событий: {e}")
+        except Exception as e:
+            logger.error("Error listing events: %s", e, exc_info=True)
+            raise
+
+    async def list_events_between(self, start: datetime, end: datetime) -> list[dict]:
+        """
+        Получает события, пересекающиеся с интервалом [start, end).
+
+        Args:
+            start: Начало интервала (с временной зоной)
+            end: Конец интервала (с временной зоной)
+
+        Returns:
+            Список событий в порядке начала
+        """
+        from googleapiclient.errors import HttpError
+
+        if self._mirror_fresh():
+            return self.mirror.between(start, end)
+
+        try:
+            service = await self._get_service()
+            events_result = await self._execute(service.events().list(
+                calendarId=self.calendar_id,
+                timeMin=start.isoformat(),
+                timeMax=end.isoformat(),
+                singleEvents=True,
+                orderBy="startTime"
+            ), "list")
+
+            return [
+                {
+                    "id": event.get("id"),
+                    "summary": event.get("summary"),
+                    "start": event["start"].get("dateTime", event["start"].get("date")),
+                    "end": event["end"].get("dateTime", event["end"].get("date")),
+                }
+                for event in events_result.get("items", [])
+            ]
+
+        except HttpError as e:
+            logger.error("Google Calendar API error: %s", e, exc_info=True)
             raise Exception(f"Ошибка получения событий: {e}")
         except Exception as e:
-            logger.error(f"Error listing events: {e}", exc_info=True)
+            logger.error("Error listing events: %s", e, exc_info=True)
             raise
+
+    async def query_free_busy(self, time_min: datetime, time_max: datetime) -> list[tuple[datetime, datetime]]:
+        """
+        Занятые интервалы календаря (freeBusy API).
+
+        Args:
+            time_min: Начало окна (с временной зоной)
+            time_max: Конец окна (с временной зоной)
+
+        Returns:
+            Список (начало, конец) занятых интервалов
+        """
+        from googleapiclient.errors import HttpError
+
+        try:
+            service = await self._get_service()
+            result = await self._execute(service.freebusy().query(body={
+                "timeMin": time_min.isoformat(),
+                "timeMax": time_max.isoformat(),
+                "timeZone": self.timezone,
+                "items": [{"id": self.calendar_id}],
+            }), "freebusy")
+
+            busy = result.get("calendars", {}).get(self.calendar_id, {}).get("busy", [])
+            return [
+                (
+                    datetime.fromisoformat(item["start"].replace("Z", "+00:00")),
+                    datetime.fromisoformat(item["end"].replace("Z", "+00:00"))
+                )
+                for item in busy
+            ]
+
+        except HttpError as e:
+            logger.error("Google Calendar API error: %s", e, exc_info=True)
+            raise Exception(f"Ошибка проверки занятости: {e}")
+
+    async def list_changes(
+        self,
+        sync_token: str | None = None,
+        time_min: datetime | None = None
+    ) -> tuple[list[dict], str | None]:
+        """
+        Все страницы events().list для синхронизации зеркала.
+
+        Без sync_token — полная выгрузка (начиная с time_min), с sync_token —
+        только изменения с прошлой синхронизации, включая удалённые события
+        (status == "cancelled").
+
+        Args:
+            sync_token: nextSyncToken прошлой синхронизации
+            time_min: Нижняя граница для полной выгрузки
+
+        Returns:
+            (сырые события API, nextSyncToken)
+
+        Raises:
+            SyncTokenExpired: Если Google отверг sync_token (HTTP 410)
+        """
+        from googleapiclient.errors import HttpError
+
+        service = await self._get_service()
+        params = {"calendarId": self.calendar_id, "singleEvents": True, "maxResults": 2500}
+        if sync_token:
+            params["syncToken"] = sync_token
+        elif time_min is not None:
+            params["timeMin"] = time_min.isoformat()
+
+        items: list[dict] = []
+        page_token = None
+        while True:
+            try:
+                page = await self._execute(service.events().list(pageToken=page_token, **params), "sync")
+            except HttpError as e:
+                if e.resp.status == 410:
+                    raise SyncTokenExpired(str(e))
+                raise
+            items.extend(page.get("items", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return items, page.get("nextSyncToken")
@@ -0,0 +1,129 @@
+"""
+Health
+
+Readiness проверка зависимостей: OpenAI, GitHub, Google Calendar.
+
+Пробы выполняются параллельно, каждая со своим таймаутом, и меряют
+латентность. Результат кэшируется на ttl секунд, а одновременные запросы
+во время проверки ждут одну и ту же проверку (single-flight): сколько бы
+балансировщиков и мониторингов ни опрашивали /api/health/deep, зависимости
+получают не больше одной серии проб за ttl.
+
+Обязательные зависимости (без них заметку не обработать) при ошибке дают
+статус "unhealthy", необязательные (календарь) — "degraded".
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+import asyncio
+import logging
+import time
+
+from app.services.metrics import DEPENDENCY_UP, HEALTH_PROBE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Проба: корутина без аргументов; возвращает необязательную деталь ("4990/5000 requests left")
+Probe = Callable[[], Awaitable[str | None]]
+
+
+@dataclass
+class ProbeResult:
+    """Результат пробы одной зависимости."""
+    status: str  # ok | error | timeout
+    latency_ms: float
+    detail: str | None = None
+    required: bool = True
+
+    def as_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "latency_ms": round(self.latency_ms, 1),
+            "detail": self.detail,
+            "required": self.required,
+        }
+
+
+@dataclass
+class HealthReport:
+    """Результат серии проб."""
+    status: str  # healthy | degraded | unhealthy
+    checked_at: str
+    checked: float
+    dependencies: dict[str, ProbeResult] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "checked_at": self.checked_at,
+            "age_seconds": round(time.monotonic() - self.checked, 1),
+            "dependencies": {name: result.as_dict() for name, result in self.dependencies.items()},
+        }
+
+
+class DependencyHealth:
+    """
+    Кэшированные параллельные пробы зависимостей.
+
+    Args:
+        ttl_seconds: Сколько секунд отдавать последний результат без новых проб
+        timeout_seconds: Таймаут одной пробы
+    """
+
+    def __init__(self, ttl_seconds: float = 15.0, timeout_seconds: float = 2.0):
+        self.ttl = ttl_seconds
+        self.timeout = timeout_seconds
+        self._probes: dict[str, tuple[Probe, bool]] = {}
+        self._report: HealthReport | None = None
+        self._running: asyncio.Task | None = None
+
+    def add(self, name: str, probe: Probe, required: bool = True) -> None:
+        self._probes[name] = (probe, required)
+
+    async def check(self) -> HealthReport:
+        """Последний результат, если он свежее ttl, иначе новая серия проб (одна на всех ожидающих)."""
+        if self._report is not None and time.monotonic() - self._report.checked < self.ttl:
+            return self._report
+        if self._running is None or self._running.done():
+            self._running = asyncio.create_task(self._run(), name="health-probes")
+        # shield: отмена одного запроса (клиент отключился) не отменяет пробы остальным
+        return await asyncio.shield(self._running)
+
+    async def _run(self) -> HealthReport:
+        names = list(self._probes)
+        results = await asyncio.gather(*(self._probe(name, *self._probes[name]) for name in names))
+        dependencies = dict(zip(names, results))
+
+        if any(r.status != "ok" for r in dependencies.values() if r.required):
+            status = "unhealthy"
+        elif any(r.status != "ok" for r in dependencies.values()):
+            status = "degraded"
+        else:
+            status = "healthy"
+        if status != "healthy":
+            failed = ", ".join(f"{n}: {r.status} ({r.detail})" for n, r in dependencies.items() if r.status != "ok")
+            logger.warning("Deep health check %s: %s", status, failed)
+
+        self._report = HealthReport(
+            status=status,
+            checked_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            checked=time.monotonic(),
+            dependencies=dependencies
+        )
+        return self._report
+
+    async def _probe(self, name: str, probe: Probe, required: bool) -> ProbeResult:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(probe(), self.timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            status, detail = "timeout", f"no answer within {self.timeout:g}s"
+        except Exception as e:
+            message = str(e).splitlines()[0] if str(e) else ""
+            status, detail = "error", f"{type(e).__name__}: {message}"[:300]
+        elapsed = time.perf_counter() - started
+        HEALTH_PROBE_SECONDS.observe(elapsed, dependency=name, status=status)
+        DEPENDENCY_UP.set(1 if status == "ok" else 0, dependency=name)
+        return ProbeResult(status=status, latency_ms=elapsed * 1000, detail=detail, required=required)
@@ -0,0 +1,99 @@
+"""
+Intent Detection
+
+Списки триггеров типов контента (те же, что в AGENT_SYSTEM_PROMPT)
+и быстрая локальная оценка количества намерений в транскрипции.
+"""
+
+import re
+
+
+CALENDAR_TRIGGERS = (
+    "встреча", "звонок", "созвон", "запланировать", "записаться",
+    "назначить встречу", "поставить напоминание",
+)
+TODO_TRIGGERS = (
+    "нужно", "надо", "не забыть", "купить", "сделать", "позвонить",
+    "отправить", "написать", "проверить",
+)
+IDEA_TRIGGERS = (
+    "идея", "можно", "интересно было бы", "подумать над", "хочу попробовать",
+    "в следующий раз", "было бы круто",
+)
+APPEND_TRIGGERS = ("добавь к заметке", "добавь в заметку", "дополни заметку")
+READ_TRIGGERS = ("что в заметке про", "прочитай заметку", "покажи заметку")
+
+INTENT_TRIGGERS = {
+    "calendar": CALENDAR_TRIGGERS,
+    "todo": TODO_TRIGGERS,
+    "idea": IDEA_TRIGGERS,
+    "append": APPEND_TRIGGERS,
+    "read": READ_TRIGGERS,
+}
+
+
+def format_triggers(triggers: tuple[str, ...]) -> str:
+    """Форматирует список триггеров для system prompt: "a", "b", "c"."""
+    return ", ".join(f'"{trigger}"' for trigger in triggers)
+
+
+def _compile(triggers: tuple[str, ...]) -> re.Pattern:
+    # Длинные фразы первыми, чтобы "назначить встречу" не съедалось "встреча"
+    alternatives = "|".join(re.escape(t) for t in sorted(triggers, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+
+
+_INTENT_PATTERNS = {name: _compile(triggers) for name, triggers in INTENT_TRIGGERS.items()}
+
+# Границы смысловых фрагментов: знаки препинания и связки "и ещё", "а также", "кстати"
+_SEGMENT_SPLIT = re.compile(r"[.!?;,\n]+|\s+(?:и ещё|а также|кстати|потом)\s+", re.IGNORECASE)
+
+# Фрагменты короче этого числа слов ("эээ", "идея", "знаешь") приклеиваются к следующему
+_MIN_SEGMENT_WORDS = 3
+
+
+def split_segments(text: str) -> list[str]:
+    """Разбивает транскрипцию на смысловые фрагменты."""
+    segments = []
+    pending = ""
+    for part in _SEGMENT_SPLIT.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}".strip()
+        if len(pending.split()) >= _MIN_SEGMENT_WORDS:
+            segments.append(pending)
+            pending = ""
+    if pending:
+        if segments:
+            segments[-1] = f"{segments[-1]} {pending}"
+        else:
+            segments.append(pending)
+    return segments
+
+
+def detect_intents(text: str) -> list[str]:
+    """
+    Определяет намерения во фрагментах транскрипции.
+
+    Args:
+        text: Текст транскрипции
+
+    Returns:
+        Список типов намерений (calendar, todo, idea, append, read),
+        по одному на каждый фрагмент, где сработал хотя бы один триггер
+    """
+    intents = []
+    for segment in split_segments(text):
+        for name, pattern in _INTENT_PATTERNS.items():
+            if pattern.search(segment):
+                intents.append(name)
+                break
+    return intents
+
+
+def count_intents(text: str) -> int:
+    """Количество намерений в транскрипции (минимум 1 для непустого текста)."""
+    if not text.strip():
+        return 0
+    return max(1, len(detect_intents(text)))
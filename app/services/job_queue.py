@@ -0,0 +1,314 @@
+"""
+Job Queue
+
+Асинхронная обработка голосовых заметок: POST /api/voice?mode=async
+сохраняет аудио на диск, ставит задание в очередь и сразу отвечает
+202 с id задания, а результат забирается через GET /api/jobs/{id}.
+
+Очередь хранится в SQLite, поэтому переживает перезапуск: задания,
+которые выполнялись в момент остановки, при старте возвращаются в очередь.
+Обрабатывает их ограниченный пул asyncio воркеров; при остановке пул
+перестаёт брать новые задания и дожидается текущих.
+
+Задание, отклонённое открытым circuit breaker (CircuitOpenError), не
+считается неудачным: оно возвращается в очередь и берётся снова не раньше,
+чем через retry_after секунд. Повтор запускает конвейер заново, поэтому
+handler бросает CircuitOpenError только до первых записей (транскрипция,
+первый вызов модели); после выполненных tools агент завершает прогон сам.
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+
+from app.services.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    audio_path TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    result TEXT,
+    error TEXT,
+    run_after TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Статусы задания
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobQueue:
+    """
+    Очередь заданий в SQLite.
+
+    Методы синхронные и короткие; из async кода их вызывают через
+    asyncio.to_thread (это делает JobWorkerPool).
+
+    Args:
+        path: Путь к файлу базы
+        max_attempts: Сколько раз задание может начинаться (прерванные перезапуском считаются)
+    """
+
+    def __init__(self, path: str | Path, max_attempts: int = 3):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        with self._lock:
+            self._db.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if "run_after" not in columns:
+                # База, созданная до отложенного повтора
+                self._db.execute("ALTER TABLE jobs ADD COLUMN run_after TEXT")
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Соединение открывается заново после close() (повторный запуск lifespan)
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        return self._connection
+
+    def enqueue(self, audio_path: str, filename: str | None = None) -> dict:
+        """Добавляет задание и возвращает его."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, filename, audio_path, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, filename, audio_path, _now())
+            )
+        return self.get(job_id)
+
+    def claim(self) -> dict | None:
+        """Атомарно берёт самое старое готовое задание из очереди (queued -> running)."""
+        now = _now()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, run_after = NULL "
+                "WHERE id = (SELECT id FROM jobs WHERE status = ? AND (run_after IS NULL OR run_after <= ?) "
+                "ORDER BY created_at LIMIT 1) "
+                "RETURNING *",
+                (RUNNING, now, QUEUED, now)
+            ).fetchone()
+        return self._row(row)
+
+    def defer(self, job_id: str, error: str, delay_seconds: float) -> None:
+        """
+        Возвращает задание в очередь не раньше чем через delay_seconds.
+
+        Попытка не засчитывается: задание не выполнялось, а было отклонено
+        (зависимость недоступна).
+        """
+        run_after = (datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)).isoformat()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, attempts = MAX(attempts - 1, 0), "
+                "run_after = ?, error = ? WHERE id = ?",
+                (QUEUED, run_after, error, job_id)
+            )
+
+    def complete(self, job_id: str, result: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = NULL WHERE id = ?",
+                (DONE, _now(), json.dumps(result, ensure_ascii=False), job_id)
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                (FAILED, _now(), error, job_id)
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def recover(self) -> int:
+        """
+        Возвращает в очередь задания, прерванные остановкой процесса.
+
+        Задания, исчерпавшие max_attempts, помечаются failed — чтобы
+        аудио, на котором процесс падает, не перезапускало его бесконечно.
+
+        Returns:
+            Сколько заданий возвращено в очередь
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, _now(), "Interrupted too many times", RUNNING, self.max_attempts)
+            )
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (QUEUED, RUNNING)
+            )
+        return cursor.rowcount
+
+    def prune(self, older_than: timedelta) -> list[str]:
+        """
+        Удаляет завершённые задания старше older_than.
+
+        Returns:
+            Пути аудио удалённых заданий (если файлы ещё остались)
+        """
+        cutoff = (datetime.now(timezone.utc) - older_than).isoformat()
+        with self._lock:
+            rows = self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ? RETURNING audio_path",
+                (DONE, FAILED, cutoff)
+            ).fetchall()
+        return [row["audio_path"] for row in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def _row(row: sqlite3.Row | None) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+
+class JobWorkerPool:
+    """
+    Пул asyncio воркеров, выполняющих задания из JobQueue.
+
+    Args:
+        queue: JobQueue
+        handler: async функция (job) -> dict с результатом; исключение = задание failed,
+            CircuitOpenError — задание откладывается на retry_after
+        workers: Количество одновременно выполняемых заданий
+        poll_seconds: Как часто проверять очередь без уведомления о новом задании
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[dict], Awaitable[dict]],
+        workers: int = 2,
+        poll_seconds: float = 5.0
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+        self._in_flight: set[str] = set()
+        self.completed = 0
+        self.failed = 0
+        self.deferred = 0
+
+    async def submit(self, audio_path: str, filename: str | None = None) -> dict:
+        """Ставит задание в очередь и будит воркеров."""
+        job = await asyncio.to_thread(self.queue.enqueue, audio_path, filename)
+        self._wakeup.set()
+        return job
+
+    async def start(self) -> None:
+        """Возвращает прерванные задания в очередь и запускает воркеров."""
+        recovered = await asyncio.to_thread(self.queue.recover)
+        if recovered:
+            logger.info("Recovered %d interrupted jobs", recovered)
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+
+    async def stop(self, timeout: float = 60.0) -> None:
+        """
+        Останавливает пул: новые задания не берутся, текущие дорабатывают
+        до timeout. Не успевшие остаются running и вернутся в очередь при старте.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if not self._tasks:
+            return
+        if self._in_flight:
+            logger.info("Draining %d in-flight jobs (timeout %.0fs)", len(self._in_flight), timeout)
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning("%d jobs did not finish before shutdown and will be retried", len(pending))
+        self._tasks = []
+
+    async def _worker(self, number: int) -> None:
+        while not self._stopping:
+            # Сбрасываем до claim: submit между claim и ожиданием не потеряется
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._in_flight.add(job["id"])
+            try:
+                logger.info("Job %s started by worker %d (%s)", job["id"], number, job["filename"])
+                result = await self.handler(job)
+                await asyncio.to_thread(self.queue.complete, job["id"], result)
+                self.completed += 1
+                logger.info("Job %s done", job["id"])
+            except asyncio.CancelledError:
+                raise
+            except CircuitOpenError as e:
+                logger.warning("Job %s deferred for %.0fs: %s", job["id"], e.retry_after, e)
+                await asyncio.to_thread(self.queue.defer, job["id"], str(e), e.retry_after)
+                self.deferred += 1
+            except Exception as e:
+                logger.error("Job %s failed: %s", job["id"], e, exc_info=True)
+                await asyncio.to_thread(self.queue.fail, job["id"], str(e))
+                self.failed += 1
+            finally:
+                self._in_flight.discard(job["id"])
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": len(self._in_flight),
+            "completed": self.completed,
+            "failed": self.failed,
+            "deferred": self.deferred,
+            "queue": self.queue.counts(),
+        }
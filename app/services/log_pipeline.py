@@ -0,0 +1,167 @@
+"""
+Log Pipeline
+
+Неблокирующее логирование: запись лога в event loop — только постановка
+записи в очередь, форматирование (JSON или текст) и запись в stderr делает
+фоновый поток QueueListener.
+
+- Каждая запись несёт request_id (заголовок X-Request-ID или новый id, см.
+  RequestIdMiddleware; у задач очереди — id задачи) и trace_id текущего спана.
+- Сообщения — %-форматирование с аргументами (logger.info("... %s", x)):
+  если уровень выключен, строка не собирается вовсе.
+- Очередь ограничена: при переполнении запись отбрасывается
+  (voice_log_records_dropped_total), а не останавливает loop.
+"""
+
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import json
+import logging
+import queue
+import sys
+import uuid
+
+from app.services.metrics import LOG_DROPPED
+from app.services.tracing import current_trace_id
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+# Атрибуты LogRecord; всё остальное пришло через extra= и попадает в JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "trace_id", "taskName"
+}
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+def set_request_id(request_id: str | None):
+    """Задаёт request id текущего контекста; возвращает токен для reset_request_id."""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token) -> None:
+    _request_id.reset(token)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class ContextFilter(logging.Filter):
+    """Дописывает в запись request_id и trace_id (в потоке, который логирует)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get() or "-"
+        record.trace_id = current_trace_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": None if getattr(record, "request_id", "-") == "-" else record.request_id,
+            "trace_id": getattr(record, "trace_id", None),
+        }
+        data.update(
+            (key, value) for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_")
+        )
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack"] = self.formatStack(record.stack_info)
+        return json.dumps({k: v for k, v in data.items() if v is not None}, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Стандартный prepare() форматирует сообщение и traceback до постановки
+    в очередь; здесь в вызывающем потоке подставляются только аргументы
+    (они могут измениться после вызова), остальное делает QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", queue_size: int = 10000,
+                      stream=None) -> QueueListener:
+    """
+    Направляет корневой логгер через очередь в фоновый поток записи.
+
+    Args:
+        level: Уровень корневого логгера
+        fmt: "json" — запись одной строкой JSON; "text" — человекочитаемый формат
+        queue_size: Ёмкость очереди (при переполнении записи отбрасываются)
+        stream: Куда писать (по умолчанию stderr)
+
+    Returns:
+        Запущенный QueueListener (stop() дописывает очередь)
+    """
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level.upper()))
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware: request id для логов запроса.
+
+    Берёт X-Request-ID клиента (если он разумной длины) или создаёт новый
+    и возвращает его в заголовке ответа X-Request-ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else new_request_id()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
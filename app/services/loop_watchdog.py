@@ -0,0 +1,176 @@
+"""
+Loop Watchdog
+
+Постоянный контроль лага event loop и детектор блокирующих вызовов.
+
+Синхронный код в async пути (файловый ввод-вывод, .execute() googleapiclient,
+тяжёлый парсинг) останавливает весь loop: все запросы ждут, пока он не
+закончится. Watchdog состоит из двух частей:
+
+- heartbeat — задача на loop, каждые interval_ms засыпает через asyncio.sleep
+  и меряет, насколько позже запланированного проснулась (лаг). Лаг идёт в
+  гистограмму voice_event_loop_lag_seconds и в перцентили /api/stats;
+- поток-сторож — если heartbeat не отмечался дольше interval_ms + threshold_ms,
+  loop занят прямо сейчас: сторож снимает стек потока event loop
+  (sys._current_frames()) и пишет в лог задачу и корутину, которая его держит.
+
+Когда loop освобождается, блокировка получает длительность и попадает в
+voice_event_loop_blocks_total и в список последних блокировок.
+"""
+
+from collections import deque
+from datetime import datetime, timezone
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.services.metrics import LOOP_BLOCKS, LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+
+def _loop_stack(frame) -> list[str]:
+    """
+    Стек потока event loop без обвязки asyncio.
+
+    Всё до Handle._run (run_forever, _run_once, select) одинаково для любой
+    блокировки; интересна выполняющаяся корутина и код, который она вызвала.
+    """
+    frames = traceback.extract_stack(frame)
+    for index in range(len(frames) - 1, -1, -1):
+        if frames[index].name == "_run" and frames[index].filename.endswith("events.py"):
+            frames = frames[index + 1:]
+            break
+    return traceback.format_list(frames)
+
+
+class LoopWatchdog:
+    """
+    Лаг event loop и детектор блокировок.
+
+    Args:
+        threshold_ms: Блокировка дольше этого порога логируется со стеком
+        interval_ms: Период heartbeat (и разрешение измерения лага)
+        history: Сколько последних измерений лага хранить для перцентилей
+        max_blocks: Сколько последних блокировок хранить для /api/stats
+    """
+
+    def __init__(self, threshold_ms: float = 100.0, interval_ms: float = 50.0,
+                 history: int = 4096, max_blocks: int = 20):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.lags: deque[float] = deque(maxlen=history)
+        self.blocks: deque[dict] = deque(maxlen=max_blocks)
+        self.blocks_total = 0
+        self._beat = time.monotonic()
+        self._stall: dict | None = None
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Запускает heartbeat и поток-сторож (вызывать из event loop)."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.to_thread(self._thread.join, 1.0)
+        self._task = None
+        self._thread = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            with self._lock:
+                self._beat = time.monotonic()
+                self.lags.append(lag)
+                stall, self._stall = self._stall, None
+            LOOP_LAG.observe(lag)
+            if stall is not None:
+                self._finish_block(stall, lag)
+            elif lag > self.threshold:
+                # Блокировка короче периода сторожа: длительность есть, стека нет
+                self._finish_block({
+                    "at": datetime.now(timezone.utc).isoformat(), "task": None, "stack": []
+                }, lag)
+
+    def _finish_block(self, block: dict, lag: float) -> None:
+        block["duration_ms"] = round(lag * 1000, 1)
+        self.blocks.append(block)
+        self.blocks_total += 1
+        LOOP_BLOCKS.inc()
+        where = block["stack"][-1].strip().splitlines()[0] if block["stack"] else "unknown frame"
+        logger.warning(
+            "Event loop was blocked for %.0f ms (task %s, %s)",
+            block["duration_ms"], block["task"] or "unknown", where
+        )
+
+    def _watch(self) -> None:
+        # Опрос в несколько раз чаще порога, чтобы застать блокировку в процессе
+        poll = max(0.005, min(self.interval, self.threshold) / 4)
+        while not self._stopped.wait(poll):
+            with self._lock:
+                stalled_for = time.monotonic() - self._beat - self.interval
+                if stalled_for <= self.threshold or self._stall is not None:
+                    continue
+                stall = self._stall = self._capture(stalled_for)
+            logger.warning(
+                "Event loop blocked for more than %.0f ms in task %s:\n%s",
+                stalled_for * 1000, stall["task"] or "unknown", "".join(stall["stack"])
+            )
+
+    def _capture(self, stalled_for: float) -> dict:
+        """Стек потока event loop и задача, которая сейчас выполняется."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        task = asyncio.current_task(self._loop)
+        block = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "task": task.get_name() if task is not None else None,
+            "stack": _loop_stack(frame) if frame is not None else [],
+            "detected_after_ms": round(stalled_for * 1000, 1),
+        }
+        del frame
+        return block
+
+    def stats(self) -> dict:
+        """Перцентили лага и последние блокировки."""
+        lags = sorted(self.lags)
+
+        def pct(q):
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 2) if lags else None
+
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "interval_ms": round(self.interval * 1000, 1),
+            "lag_ms": {"p50": pct(0.5), "p90": pct(0.9), "p99": pct(0.99), "max": pct(1.0), "samples": len(lags)},
+            "blocks_total": self.blocks_total,
+            "recent_blocks": [
+                {key: block.get(key) for key in ("at", "duration_ms", "task")}
+                | {"frame": block["stack"][-1].strip().splitlines()[0] if block["stack"] else None}
+                for block in list(self.blocks)[-5:]
+            ],
+        }
@@ -0,0 +1,284 @@
+"""
+Metrics
+
+Метрики в формате Prometheus (text exposition 0.0.4) для GET /metrics.
+
+Небольшая собственная реализация Counter / Gauge / Histogram без внешней
+зависимости. Запись — словарь по кортежу меток и сложение под
+threading.Lock (вызовы Calendar идут из пула потоков), единицы микросекунд
+на наблюдение (benchmarks/bench_metrics.py).
+
+Кардинальность ограничена: у каждой метрики не больше max_series наборов
+меток, всё сверх этого пишется в серию с метками "other". Значения меток
+берутся из фиксированных множеств (стадии, имена tools, операции API,
+классы HTTP статусов), а не из пользовательских данных.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+import math
+import threading
+import time
+
+# Границы бакетов по умолчанию: от вызова кэша до долгого прогона агента
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+OTHER = "other"
+
+
+def status_label(status: int | str | None) -> str:
+    """HTTP статус для метки: 429 и 409 отдельно (лимиты и конфликты), остальные — классом."""
+    if status is None:
+        return "error"
+    if isinstance(status, str):
+        return status
+    if status in (409, 429):
+        return str(status)
+    return f"{status // 100}xx"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), max_series: int = 100):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        key = tuple([labels.get(name, "") for name in self.labelnames])
+        if key not in self._series and len(self._series) >= self.max_series:
+            return (OTHER,) * len(self.labelnames)
+        return key
+
+    def _labels_text(self, key: tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items(), key=lambda item: tuple(map(str, item[0])))
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value) -> list[str]:
+        return [f"{self.name}{self._labels_text(key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """+1 на время блока (запросы в работе)."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS, max_series: int = 100):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        # Счётчики по бакетам не накопительные; накопление — при выводе
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Измеряет длительность блока.
+
+        Метки можно дополнить внутри блока (например, статус ответа):
+            with histogram.time(operation="get") as labels:
+                labels["status"] = ...
+        """
+        labels = dict(labels)
+        started = time.perf_counter()
+        try:
+            yield labels
+            if "status" in self.labelnames:
+                labels.setdefault("status", "ok")
+        except BaseException:
+            labels.setdefault("status", "error")
+            raise
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_series(self, key, value) -> list[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{self._labels_text(key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels_text(key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._labels_text(key)} {count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик, выводимый одной страницей /metrics."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), **kwargs) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, **kwargs))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), **kwargs) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Стадии обработки заметки: upload, transcription, fast_path, agent, total
+STAGE_SECONDS = REGISTRY.histogram(
+    "voice_stage_seconds", "Duration of voice note processing stages", ("stage",)
+)
+AGENT_ITERATION_SECONDS = REGISTRY.histogram(
+    "voice_agent_iteration_seconds", "Duration of one agent LLM call", ("model", "status"), max_series=30
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "voice_tool_seconds", "Duration of agent tool calls", ("tool", "status"), max_series=50
+)
+GITHUB_SECONDS = REGISTRY.histogram(
+    "voice_github_request_seconds", "Duration of GitHub API requests", ("operation", "status"), max_series=50
+)
+CALENDAR_SECONDS = REGISTRY.histogram(
+    "voice_calendar_request_seconds", "Duration of Google Calendar API requests", ("operation", "status"), max_series=50
+)
+TOKENS = REGISTRY.counter(
+    "voice_llm_tokens_total", "LLM tokens used (kind: prompt, completion, cached)", ("model", "kind"), max_series=30
+)
+COST = REGISTRY.counter(
+    "voice_cost_usd_total", "Estimated OpenAI spend in USD (LLM and Whisper)", ("model",), max_series=30
+)
+AUDIO_SECONDS = REGISTRY.counter(
+    "voice_audio_seconds_total", "Seconds of audio transcribed"
+)
+# Токены и стоимость одного запроса (прогон агента целиком)
+REQUEST_TOKENS = REGISTRY.histogram(
+    "voice_request_tokens", "LLM tokens per voice note", ("kind",),
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+)
+REQUEST_COST = REGISTRY.histogram(
+    "voice_request_cost_usd", "Estimated OpenAI spend per voice note in USD",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+PROMPT_CACHE_RATIO = REGISTRY.histogram(
+    "voice_prompt_cache_hit_ratio", "Share of prompt tokens served from the provider prompt cache per voice note",
+    ("variant",), buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+BUDGET_STOPS = REGISTRY.counter(
+    "voice_budget_exceeded_total", "Agent runs stopped early by a per-request budget", ("budget",)
+)
+RETRIES = REGISTRY.counter(
+    "voice_retries_total", "Retried operations (model fallback, vault commit races)", ("operation",)
+)
+CONFLICTS = REGISTRY.counter(
+    "voice_conflicts_total", "Conflicts (calendar busy slots, vault write conflicts)", ("kind",)
+)
+CACHE = REGISTRY.counter(
+    "voice_cache_requests_total", "Cache lookups by cache and result", ("cache", "result")
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "voice_requests_in_flight", "Voice note requests being processed", ("endpoint",)
+)
+# Лаг event loop (heartbeat watchdog) и блокировки дольше порога
+LOOP_LAG = REGISTRY.histogram(
+    "voice_event_loop_lag_seconds", "Event loop lag measured by the watchdog heartbeat",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_BLOCKS = REGISTRY.counter(
+    "voice_event_loop_blocks_total", "Event loop stalls longer than the watchdog threshold"
+)
+LOG_DROPPED = REGISTRY.counter(
+    "voice_log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+# Readiness пробы зависимостей (/api/health/deep)
+HEALTH_PROBE_SECONDS = REGISTRY.histogram(
+    "voice_health_probe_seconds", "Duration of dependency readiness probes", ("dependency", "status"), max_series=20
+)
+DEPENDENCY_UP = REGISTRY.gauge(
+    "voice_dependency_up", "Result of the last readiness probe per dependency (1 ok, 0 failed)", ("dependency",)
+)
+# Circuit breakers зависимостей (0 closed, 1 half-open, 2 open) и отклонённые без запроса вызовы
+CIRCUIT_STATE = REGISTRY.gauge(
+    "voice_circuit_state", "Circuit breaker state per dependency (0 closed, 1 half-open, 2 open)", ("dependency",)
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    "voice_circuit_rejected_total", "Calls rejected without a request because the circuit was open", ("dependency",)
+)
@@ -0,0 +1,230 @@
+"""
+Model Router
+
+Выбирает модель и лимит токенов для каждой транскрипции по её длине,
+количеству намерений и наблюдаемой задержке моделей. Ведёт статистику
+задержек (p50/p95) и журнал решений для офлайн-настройки политики.
+"""
+
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+import json
+import logging
+import threading
+import time
+
+from app.services.intents import count_intents
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RouteDecision:
+    """Решение роутера для одного запроса."""
+    model: str
+    max_tokens: int
+    fallback_model: str | None
+    reason: str
+    words: int
+    intents: int
+    calls: list[dict] = field(default_factory=list)
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """
+    Скользящее окно задержек и ошибок по каждой модели.
+
+    Окно ограничено и числом вызовов (window), и возрастом (max_age_seconds):
+    модель, которая перестала получать трафик, не остаётся с устаревшей
+    статистикой навсегда.
+    """
+
+    def __init__(self, window: int = 100, max_age_seconds: float | None = None):
+        self.window = window
+        self.max_age_seconds = max_age_seconds
+        self._latencies: dict[str, deque] = {}  # (monotonic, секунды)
+        self._errors: dict[str, deque] = {}  # (monotonic, ошибка)
+        self._lock = threading.Lock()
+
+    def _recent(self, samples: dict[str, deque], model: str) -> list:
+        """Значения не старше max_age_seconds (под self._lock)."""
+        values = samples.get(model)
+        if not values:
+            return []
+        if self.max_age_seconds is not None:
+            cutoff = time.monotonic() - self.max_age_seconds
+            while values and values[0][0] < cutoff:
+                values.popleft()
+        return [value for _, value in values]
+
+    def record(self, model: str, seconds: float, ok: bool = True) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._errors.setdefault(model, deque(maxlen=self.window)).append((now, not ok))
+            if ok:
+                self._latencies.setdefault(model, deque(maxlen=self.window)).append((now, seconds))
+
+    def samples(self, model: str) -> int:
+        with self._lock:
+            return len(self._recent(self._latencies, model))
+
+    def percentile(self, model: str, q: float) -> float | None:
+        with self._lock:
+            values = self._recent(self._latencies, model)
+        return _percentile(values, q)
+
+    def error_rate(self, model: str) -> float:
+        with self._lock:
+            errors = self._recent(self._errors, model)
+        return sum(errors) / len(errors) if errors else 0.0
+
+    def snapshot(self) -> dict:
+        """p50/p95 и доля ошибок по всем моделям."""
+        return {
+            model: {
+                "samples": self.samples(model),
+                "p50": self.percentile(model, 0.50),
+                "p95": self.percentile(model, 0.95),
+                "error_rate": round(self.error_rate(model), 3),
+            }
+            for model in sorted(set(self._latencies) | set(self._errors))
+        }
+
+
+class ModelRouter:
+    """
+    Роутер моделей для VoiceNotesAgent.
+
+    Короткие простые заметки идут в быструю модель, длинные или с
+    несколькими намерениями — в сильную. Если у выбранной модели p95
+    превышает бюджет задержки, а запасная модель стабильно быстрее,
+    они меняются местами. Понижённая модель почти не получает вызовов,
+    поэтому её задержки учитываются только за latency_window_seconds:
+    когда они устаревают, модель снова становится основной и заново
+    набирает статистику.
+    """
+
+    def __init__(
+        self,
+        fast_model: str = "gpt-4o-mini",
+        strong_model: str = "gpt-4o",
+        long_transcript_words: int = 250,
+        complex_intents: int = 3,
+        latency_budget_seconds: float = 8.0,
+        timeout_seconds: float = 45.0,
+        max_tokens_cap: int = 8192,
+        min_samples: int = 5,
+        decision_log_path: str | None = None,
+        window: int = 100,
+        latency_window_seconds: float | None = 300.0
+    ):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.long_transcript_words = long_transcript_words
+        self.complex_intents = complex_intents
+        self.latency_budget_seconds = latency_budget_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_tokens_cap = max_tokens_cap
+        self.min_samples = min_samples
+        self.decision_log_path = decision_log_path
+        self.latency = LatencyTracker(window=window, max_age_seconds=latency_window_seconds)
+        self._log_lock = threading.Lock()
+
+    def route(self, transcription: str) -> RouteDecision:
+        """
+        Выбирает модель и max_tokens для транскрипции.
+
+        Args:
+            transcription: Текст транскрипции
+
+        Returns:
+            RouteDecision с основной и запасной моделью
+        """
+        words = len(transcription.split())
+        intents = count_intents(transcription)
+
+        if words > self.long_transcript_words:
+            model, fallback, reason = self.strong_model, self.fast_model, "long"
+        elif intents >= self.complex_intents:
+            model, fallback, reason = self.strong_model, self.fast_model, "complex"
+        else:
+            model, fallback, reason = self.fast_model, self.strong_model, "simple"
+
+        if self._too_slow(model) and self._faster(fallback, model):
+            model, fallback = fallback, model
+            reason += "+latency"
+
+        # Ответ агента — в основном аргументы tool calls, которые пересказывают
+        # транскрипцию, поэтому лимит растёт с её длиной
+        max_tokens = min(self.max_tokens_cap, 1024 + words * 3)
+
+        if fallback == model:
+            fallback = None
+
+        return RouteDecision(
+            model=model,
+            max_tokens=max_tokens,
+            fallback_model=fallback,
+            reason=reason,
+            words=words,
+            intents=intents
+        )
+
+    def _too_slow(self, model: str) -> bool:
+        p95 = self.latency.percentile(model, 0.95)
+        return (
+            self.latency.samples(model) >= self.min_samples
+            and p95 is not None
+            and p95 > self.latency_budget_seconds
+        )
+
+    def _faster(self, candidate: str, current: str) -> bool:
+        if self.latency.samples(candidate) < self.min_samples:
+            return False
+        return self.latency.percentile(candidate, 0.95) < self.latency.percentile(current, 0.95)
+
+    def record_call(
+        self,
+        decision: RouteDecision,
+        model: str,
+        seconds: float,
+        ok: bool,
+        error: str | None = None
+    ) -> None:
+        """Записывает результат одного вызова chat completion."""
+        self.latency.record(model, seconds, ok=ok)
+        decision.calls.append({
+            "model": model,
+            "seconds": round(seconds, 3),
+            "ok": ok,
+            "error": error
+        })
+
+    def log_decision(self, decision: RouteDecision) -> None:
+        """Дописывает решение и его вызовы в JSONL журнал (если задан)."""
+        if not self.decision_log_path:
+            return
+        record = {"ts": datetime.now(timezone.utc).isoformat(), **asdict(decision)}
+        try:
+            with self._log_lock, open(self.decision_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning("Failed to write routing log: %s", e)
+
+    def stats(self) -> dict:
+        """Текущие p50/p95 по моделям."""
+        return {
+            "fast_model": self.fast_model,
+            "strong_model": self.strong_model,
+            "latency": self.latency.snapshot()
+        }
@@ -0,0 +1,308 @@
+"""
+Profiler
+
+Сэмплирующий профайлер живых запросов по требованию (PROFILING_ENABLED).
+
+Пока идёт хотя бы одна сессия, отдельный поток каждые interval_ms снимает
+стеки всех потоков через sys._current_frames():
+
+- wall-clock профиль — стеки всех потоков, включая простой event loop в
+  select() (ожидание сети) и потоки пула googleapiclient;
+- async профиль — логический стек корутин задачи запроса (по цепочке
+  cr_await, с дочерними задачами asyncio.gather) с пометкой, выполняется
+  ли корутина в момент сэмпла или ждёт;
+- лаг event loop — насколько позже запланированного просыпается
+  asyncio.sleep в пробной задаче (время, когда loop занят синхронным кодом).
+
+Стеки сохраняются в формате folded (flamegraph.pl, speedscope, inferno),
+сводка — в JSON. Без PROFILING_ENABLED middleware не подключается и
+endpoints не регистрируются: накладных расходов нет.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(code) -> str:
+    # Функция, а не строка: сэмплы одной функции складываются в один узел
+    path = code.co_filename.replace(os.sep, "/").split("/")
+    return f"{code.co_qualname} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def _thread_stack(frame) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _async_stacks(task: asyncio.Task, loop_stack: list, prefix: list[str]) -> list[list[str]]:
+    """
+    Логические стеки задачи: корутина за корутиной по cr_await, с ветками по дочерним задачам.
+
+    Выполняющаяся корутина (её фрейм есть в стеке потока event loop)
+    дополняется реальным стеком ниже неё — синхронный код, занимающий loop.
+    """
+    stack = list(prefix)
+    state = "waiting"
+    awaited = task.get_coro()
+    while awaited is not None:
+        frame = getattr(awaited, "cr_frame", None) or getattr(awaited, "gi_frame", None)
+        if frame is None:
+            break
+        if frame in loop_stack:
+            state = "running"
+            stack.extend(_frame_label(f.f_code) for f in loop_stack[loop_stack.index(frame):])
+            return [[state] + stack]
+        stack.append(_frame_label(frame.f_code))
+        awaited = getattr(awaited, "cr_await", None) or getattr(awaited, "gi_yieldfrom", None)
+
+    # Ожидание другой задачи или gather: продолжаем в дочерних задачах
+    children = getattr(awaited, "_children", None) or ([awaited] if isinstance(awaited, asyncio.Task) else [])
+    children = [child for child in children if isinstance(child, asyncio.Task) and not child.done()]
+    if children:
+        stacks = []
+        for child in children:
+            stacks.extend(_async_stacks(child, loop_stack, stack + [f"task {child.get_name()}"]))
+        return stacks
+    if awaited is not None:
+        stack.append(f"await {type(awaited).__name__}")
+    return [[state] + stack]
+
+
+@dataclass
+class ProfileSession:
+    """Профиль одного запроса."""
+    id: str
+    label: str
+    task: asyncio.Task
+    started: float = field(default_factory=time.perf_counter)
+    started_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    samples: int = 0
+    wall: Counter = field(default_factory=Counter)
+    tasks: Counter = field(default_factory=Counter)
+    loop_lag: list[float] = field(default_factory=list)
+    duration: float | None = None
+    probe: asyncio.Task | None = None
+
+    def summary(self, interval: float) -> dict:
+        lag = sorted(self.loop_lag)
+
+        def pct(q):
+            return round(lag[min(len(lag) - 1, int(q * len(lag)))] * 1000, 1) if lag else None
+
+        # Самое дорогое "собственное" время на потоке event loop
+        self_time = Counter()
+        for stack, count in self.wall.items():
+            frames = stack.split(";")
+            if frames[0] == "event-loop":
+                self_time[frames[-1]] += count
+        running = sum(c for s, c in self.tasks.items() if s.startswith("running;"))
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration or 0.0, 3),
+            "samples": self.samples,
+            "interval_ms": round(interval * 1000, 2),
+            "task_running_share": round(running / sum(self.tasks.values()), 3) if self.tasks else None,
+            "loop_lag_ms": {"p50": pct(0.5), "p99": pct(0.99), "max": pct(1.0), "probes": len(lag)},
+            "event_loop_top": [
+                {"frame": frame, "samples": count, "share": round(count / self.samples, 3)}
+                for frame, count in self_time.most_common(15)
+            ] if self.samples else [],
+        }
+
+
+class Profiler:
+    """
+    Сессии профилирования и поток сэмплирования.
+
+    Args:
+        token: Токен доступа к debug endpoints и заголовку X-Profile
+        output_dir: Куда сохранять профили
+        interval_ms: Период сэмплирования
+        max_armed: Сколько следующих запросов можно поставить в очередь на профилирование
+    """
+
+    def __init__(self, token: str, output_dir: str, interval_ms: float = 5.0, max_armed: int = 20):
+        self.token = token
+        self.output_dir = Path(output_dir)
+        self.interval = interval_ms / 1000
+        self.max_armed = max_armed
+        self.armed = 0
+        self._sessions: dict[str, ProfileSession] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._loop_thread_id: int | None = None
+
+    def authorized(self, token: str | None) -> bool:
+        return bool(token) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def arm(self, requests: int) -> int:
+        """Профилировать следующие requests запросов."""
+        self.armed = max(0, min(requests, self.max_armed))
+        return self.armed
+
+    def take_armed(self) -> bool:
+        if self.armed <= 0:
+            return False
+        self.armed -= 1
+        return True
+
+    def start(self, label: str) -> ProfileSession:
+        """Начинает сессию для текущей задачи (вызывать из event loop)."""
+        session = ProfileSession(
+            id=f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}",
+            label=label,
+            task=asyncio.current_task()
+        )
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._sessions[session.id] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        session.probe = asyncio.create_task(self._probe_lag(session), name=f"profiler-lag-{session.id}")
+        return session
+
+    async def stop(self, session: ProfileSession) -> dict:
+        """Заканчивает сессию и сохраняет folded стеки и сводку."""
+        session.duration = time.perf_counter() - session.started
+        with self._lock:
+            self._sessions.pop(session.id, None)
+        summary = session.summary(self.interval)
+        await asyncio.to_thread(self._write, session, summary)
+        logger.info(
+            "Profile %s (%s): %d samples in %ss, loop lag p99 %s ms",
+            session.id, session.label, session.samples,
+            summary["duration_seconds"], summary["loop_lag_ms"]["p99"]
+        )
+        return summary
+
+    async def _probe_lag(self, session: ProfileSession) -> None:
+        loop = asyncio.get_running_loop()
+        while session.id in self._sessions:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            session.loop_lag.append(max(0.0, loop.time() - expected))
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            wall = []
+            loop_stack = []
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                name = "event-loop" if ident == self._loop_thread_id else names.get(ident, f"thread-{ident}")
+                wall.append(";".join([name] + _thread_stack(frame)))
+                if ident == self._loop_thread_id:
+                    while frame is not None:
+                        loop_stack.append(frame)
+                        frame = frame.f_back
+            loop_stack.reverse()
+            del frames
+
+            # Под блокировкой: после stop() сессия больше не меняется
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                for session in self._sessions.values():
+                    session.samples += 1
+                    session.wall.update(wall)
+                    if session.task is None or session.task.done():
+                        continue
+                    try:
+                        for stack in _async_stacks(session.task, loop_stack, [f"task {session.task.get_name()}"]):
+                            session.tasks[";".join(stack)] += 1
+                    except RuntimeError:
+                        # Цепочка корутин изменилась во время обхода — пропускаем сэмпл
+                        pass
+            del loop_stack
+            time.sleep(self.interval)
+
+    def _write(self, session: ProfileSession, summary: dict) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / session.id
+        base.with_suffix(".wall.folded").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in session.wall.items()), encoding="utf-8"
+        )
+        base.with_suffix(".async.folded").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in session.tasks.items()), encoding="utf-8"
+        )
+        base.with_suffix(".json").write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def list_profiles(self) -> list[dict]:
+        if not self.output_dir.exists():
+            return []
+        profiles = []
+        for path in sorted(self.output_dir.glob("*.json"), reverse=True):
+            data = json.loads(path.read_text(encoding="utf-8"))
+            profiles.append({key: data[key] for key in ("id", "label", "started_at", "duration_seconds", "samples")})
+        return profiles
+
+    def profile_path(self, profile_id: str, kind: str) -> Path | None:
+        """Файл профиля: kind = wall | async | summary."""
+        suffix = {"wall": ".wall.folded", "async": ".async.folded", "summary": ".json"}.get(kind)
+        if suffix is None or not profile_id.replace("-", "").isalnum():
+            return None
+        path = (self.output_dir / profile_id).with_suffix(suffix)
+        return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: профилирует запросы к paths, если профилировщик взведён
+    (POST /debug/profile) или запрос пришёл с X-Profile и X-Debug-Token.
+
+    Профилированный ответ получает заголовок X-Profile-Id.
+    """
+
+    def __init__(self, app, profiler: Profiler, paths: set[str]):
+        self.app = app
+        self.profiler = profiler
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        flagged = b"x-profile" in headers and self.profiler.authorized(
+            headers.get(b"x-debug-token", b"").decode("latin-1")
+        )
+        if not flagged and not self.profiler.take_armed():
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.start(f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", session.id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            await self.profiler.stop(session)
@@ -0,0 +1,99 @@
+"""
+Tool Result Governor
+
+Ограничивает размер результатов tool calls, которые попадают в историю
+сообщений агента. Каждый результат переотправляется модели на всех
+следующих итерациях цикла, поэтому большие read_note / list_notes
+делают стоимость запроса квадратичной по размеру vault.
+"""
+
+from dataclasses import dataclass, field
+
+
+# Грубая оценка: ~3 символа на токен для смешанного русского/английского текста
+CHARS_PER_TOKEN = 3
+
+DEFAULT_TOOL_BUDGETS = {
+    "read_note": 1500,
+    "list_notes": 600,
+    "list_calendar_events": 600,
+}
+
+TRUNCATION_HINTS = {
+    "read_note": "Чтобы прочитать нужную часть, вызови read_note с параметром section (заголовок раздела).",
+    "list_notes": "Уточни search_query или запроси следующую страницу через cursor.",
+    "list_calendar_events": "Уменьши max_results.",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка количества токенов в тексте."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class ResultGovernor:
+    """
+    Бюджет токенов на результаты tools в рамках одного прогона агента.
+
+    Attributes:
+        per_tool_tokens: Лимит на один результат по имени tool
+        default_tool_tokens: Лимит для tools без отдельного бюджета
+        per_run_tokens: Общий лимит на все результаты за прогон
+        min_tokens: Минимум, который отдаётся даже при исчерпанном бюджете прогона
+    """
+    per_tool_tokens: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_TOOL_BUDGETS))
+    default_tool_tokens: int = 1000
+    per_run_tokens: int = 6000
+    min_tokens: int = 150
+    raw_tokens: int = 0
+    sent_tokens: int = 0
+    truncated: int = 0
+
+    def govern(self, tool_name: str, result: str) -> str:
+        """
+        Применяет бюджеты к результату tool call.
+
+        Args:
+            tool_name: Имя tool
+            result: Полный результат
+
+        Returns:
+            Результат как есть или сокращённый с пометкой о сокращении
+        """
+        tokens = estimate_tokens(result)
+        self.raw_tokens += tokens
+
+        remaining_run = max(self.per_run_tokens - self.sent_tokens, self.min_tokens)
+        budget = min(self.per_tool_tokens.get(tool_name, self.default_tool_tokens), remaining_run)
+
+        if tokens <= budget:
+            self.sent_tokens += tokens
+            return result
+
+        governed = self._truncate(tool_name, result, budget, tokens)
+        self.truncated += 1
+        self.sent_tokens += estimate_tokens(governed)
+        return governed
+
+    def _truncate(self, tool_name: str, result: str, budget: int, tokens: int) -> str:
+        head = result[:budget * CHARS_PER_TOKEN]
+        # Режем по границе строки, чтобы не обрывать путь или пункт списка
+        newline = head.rfind("\n")
+        if newline > len(head) // 2:
+            head = head[:newline]
+
+        hint = TRUNCATION_HINTS.get(tool_name, "")
+        note = (
+            f"\n\n[Результат сокращён: показано ~{estimate_tokens(head)} "
+            f"из ~{tokens} токенов. {hint}]"
+        )
+        return head.rstrip() + note
+
+    def stats(self) -> dict:
+        """Токены результатов tools до и после ограничения."""
+        return {
+            "raw_tokens": self.raw_tokens,
+            "sent_tokens": self.sent_tokens,
+            "truncated": self.truncated,
+        }
@@ -0,0 +1,115 @@
+"""
+Tool Memo
+
+Мемоизация read-only tool calls в рамках одного прогона агента.
+
+Модель часто повторяет list_notes / read_note с теми же аргументами;
+повтор отдаётся из памяти вместо нового запроса к GitHub. Записи
+сбрасываются, когда write tool в том же прогоне меняет затронутый путь.
+"""
+
+import json
+
+
+READ_ONLY_TOOLS = frozenset({"list_notes", "read_note", "list_calendar_events"})
+
+# Значения по умолчанию — чтобы {"limit": 30} и {} давали один ключ
+_DEFAULTS = {
+    "list_notes": {"folder": None, "search_query": None, "limit": 30, "cursor": 0},
+    "read_note": {"section": None},
+    "list_calendar_events": {"max_results": 5, "date": None},
+}
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def normalize_args(function_name: str, function_args: dict) -> dict:
+    """Приводит аргументы к канонической форме (дефолты, пробелы, регистр поиска)."""
+    normalized = dict(_DEFAULTS.get(function_name, {}))
+    for name, value in function_args.items():
+        normalized[name] = _normalize_value(value)
+    if normalized.get("search_query"):
+        normalized["search_query"] = normalized["search_query"].lower()
+    if normalized.get("section"):
+        normalized["section"] = normalized["section"].lower()
+    if normalized.get("date"):
+        normalized["date"] = normalized["date"].lower()
+    return normalized
+
+
+class ToolMemo:
+    """
+    Таблица результатов read-only tools для одного прогона агента.
+
+    Ключ — имя tool и нормализованные аргументы.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, tuple[str, dict, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(function_name: str, normalized: dict) -> str:
+        return function_name + ":" + json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+    def get(self, function_name: str, function_args: dict) -> str | None:
+        """Возвращает закэшированный результат или None."""
+        if function_name not in READ_ONLY_TOOLS:
+            return None
+        entry = self._entries.get(self._key(function_name, normalize_args(function_name, function_args)))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[2]
+
+    def put(self, function_name: str, function_args: dict, result: str) -> None:
+        """Сохраняет результат read-only tool (ошибки не кэшируются)."""
+        if function_name not in READ_ONLY_TOOLS or result.lstrip("❌ ").startswith("Ошибка"):
+            return
+        normalized = normalize_args(function_name, function_args)
+        self._entries[self._key(function_name, normalized)] = (function_name, normalized, result)
+
+    def invalidate_for_write(self, function_name: str, function_args: dict) -> None:
+        """Сбрасывает записи, которые мог изменить write tool."""
+        if function_name in READ_ONLY_TOOLS:
+            return
+        for key, (name, args, _) in list(self._entries.items()):
+            if _is_stale(function_name, function_args, name, args):
+                del self._entries[key]
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def _is_stale(write_name: str, write_args: dict, read_name: str, read_args: dict) -> bool:
+    """Мог ли write tool изменить результат закэшированного read tool."""
+    note_path = read_args.get("note_path") or ""
+
+    if write_name == "create_note":
+        # Новый файл появляется в листинге своей папки и в листинге всех папок;
+        # create_or_update может перезаписать существующую заметку в этой папке
+        folder = write_args.get("folder") or "Voice Notes"
+        if read_name == "list_notes":
+            return read_args["folder"] in (None, folder)
+        return read_name == "read_note" and note_path.startswith(f"{folder}/")
+    if write_name == "append_to_note":
+        return read_name == "read_note" and note_path == (write_args.get("note_path") or "").strip()
+    if write_name == "add_todo_task":
+        return read_name == "read_note" and note_path == "TODO.md"
+    if write_name == "create_calendar_event":
+        return read_name == "list_calendar_events"
+    # Неизвестный write tool — считаем устаревшим всё
+    return True
@@ -0,0 +1,347 @@
+"""
+Tracing
+
+Вложенные спаны обработки заметки: запрос -> транскрипция -> итерации
+агента -> tools -> HTTP вызовы GitHub / Calendar.
+
+Текущий спан хранится в contextvar, поэтому вложенность сохраняется через
+await и в задачах asyncio.gather без передачи контекста руками. Спаны
+трассы копятся в памяти и после завершения корневого спана отдаются
+экспортёрам в фоновом потоке (запись файла и HTTP не блокируют event loop):
+
+- JsonlExporter — спан на строку в локальный файл для офлайн анализа
+  (python -m app.services.tracing traces.jsonl печатает деревья трасс);
+- OtlpHttpExporter — OTLP/HTTP JSON (/v1/traces), принимается OpenTelemetry
+  Collector, Jaeger, Tempo и т.п.
+
+Входящий W3C заголовок traceparent продолжает трассу вызывающего.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+import functools
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# Ограничения на размер трассы в памяти
+MAX_SPANS_PER_TRACE = 1000
+MAX_ATTRIBUTE_LENGTH = 500
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+@dataclass
+class Span:
+    """Спан трассы."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    status: str = "unset"  # unset | ok | error
+    status_message: str | None = None
+    # span_id локального корня: буфер трассы в Tracer (не экспортируется)
+    root_id: str | None = field(default=None, repr=False)
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is None:
+            return
+        if isinstance(value, str) and len(value) > MAX_ATTRIBUTE_LENGTH:
+            value = value[:MAX_ATTRIBUTE_LENGTH] + "…"
+        elif not isinstance(value, (str, bool, int, float)):
+            value = str(value)[:MAX_ATTRIBUTE_LENGTH]
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, message: str) -> None:
+        self.status = "error"
+        self.status_message = message[:MAX_ATTRIBUTE_LENGTH]
+
+    @property
+    def duration_ms(self) -> float | None:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns is not None else None
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def current_trace_id() -> str | None:
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+class JsonlExporter:
+    """Спан на строку JSON в файл."""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = Path(path)
+        self.service_name = service_name
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: list[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps({"service": self.service_name, **span.as_dict()}, ensure_ascii=False) + "\n")
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    """
+    OTLP/HTTP JSON экспорт (POST {endpoint}/v1/traces).
+
+    Args:
+        endpoint: Базовый URL коллектора, например http://localhost:4318
+        service_name: service.name ресурса
+        headers: Дополнительные заголовки (авторизация коллектора)
+    """
+
+    def __init__(self, endpoint: str, service_name: str, headers: dict | None = None, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.client = httpx.Client(headers=headers or {}, timeout=timeout)
+
+    def payload(self, spans: list[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "voice-notes-service"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                    "name": span.name,
+                    "kind": 1,  # SPAN_KIND_INTERNAL
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                    "status": {
+                        "code": {"unset": 0, "ok": 1, "error": 2}[span.status],
+                        **({"message": span.status_message} if span.status_message else {}),
+                    },
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, spans: list[Span]) -> None:
+        response = self.client.post(self.url, json=self.payload(spans))
+        response.raise_for_status()
+
+
+class Tracer:
+    """
+    Создаёт спаны и отдаёт завершённые трассы экспортёрам.
+
+    Без экспортёров спаны всё равно создаются (trace id нужен в ответе API),
+    но никуда не пишутся.
+    """
+
+    def __init__(self):
+        self.exporters: list = []
+        # Буферы по корневому спану, а не по trace id: два запроса с одним
+        # входящим traceparent — разные корни одной трассы
+        self._traces: dict[str, list[Span]] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=1000)
+        self._thread: threading.Thread | None = None
+        self.dropped = 0
+
+    def configure(self, exporters: list) -> None:
+        self.exporters = exporters
+
+    def start(self) -> None:
+        """Запускает поток экспорта (если есть экспортёры)."""
+        if self.exporters and self._thread is None:
+            self._thread = threading.Thread(target=self._export_loop, name="trace-export", daemon=True)
+            self._thread.start()
+
+    @contextmanager
+    def span(self, name: str, traceparent: str | None = None, **attributes):
+        """
+        Открывает спан, дочерний к текущему (или корневой новой трассы).
+
+        Args:
+            name: Имя спана
+            traceparent: W3C traceparent входящего запроса (только для корневого спана)
+            **attributes: Атрибуты спана
+        """
+        parent = _current_span.get()
+        remote_parent = None
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            match = _TRACEPARENT_RE.match(traceparent or "")
+            if match:
+                trace_id, remote_parent = match.group(1), match.group(2)
+            else:
+                trace_id = _new_id(16)
+            parent_id = remote_parent
+
+        span = Span(name, trace_id, _new_id(8), parent_id, time.time_ns())
+        span.set_attributes(**attributes)
+        is_root = parent is None
+        span.root_id = span.span_id if is_root else parent.root_id
+        if is_root:
+            with self._lock:
+                self._traces[span.root_id] = []
+
+        token = _current_span.set(span)
+        try:
+            yield span
+            if span.status == "unset":
+                span.status = "ok"
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span, is_root)
+
+    def _finish(self, span: Span, is_root: bool) -> None:
+        with self._lock:
+            spans = self._traces.get(span.root_id)
+            if spans is not None and len(spans) < MAX_SPANS_PER_TRACE:
+                spans.append(span)
+            if is_root:
+                spans = self._traces.pop(span.root_id, [span])
+            elif spans is None:
+                # Спан закончился после корня (фоновая задача) — отдаём отдельно
+                spans = [span]
+            else:
+                return
+        if self._thread is None:
+            return
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export_loop(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            for exporter in self.exporters:
+                try:
+                    exporter.export(spans)
+                except Exception as e:
+                    logger.warning("Trace export via %s failed: %s", type(exporter).__name__, e)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Дописывает накопленные трассы и останавливает поток экспорта."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+tracer = Tracer()
+
+
+def traced_tool(name: str, *attribute_args: str):
+    """
+    Декоратор tool функции: спан tool.<name> с выбранными аргументами как атрибутами.
+
+    Результат, начинающийся с "❌", помечает спан ошибкой (tools возвращают
+    ошибки текстом для агента, а не исключением).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            attributes = {f"tool.{key}": kwargs.get(key) for key in attribute_args}
+            with tracer.span(f"tool.{name}", **{"tool.name": name}, **attributes) as span:
+                result = await func(*args, **kwargs)
+                if isinstance(result, str) and result.startswith("❌"):
+                    span.set_error(result.splitlines()[0])
+                return result
+        return wrapper
+    return decorator
+
+
+def format_trace(spans: list[dict]) -> str:
+    """Дерево спанов одной трассы с длительностями (спаны — dict из JSONL)."""
+    children: dict = {}
+    ids = {span["span_id"] for span in spans}
+    for span in sorted(spans, key=lambda s: s["start_ns"]):
+        parent = span["parent_id"] if span["parent_id"] in ids else None
+        children.setdefault(parent, []).append(span)
+
+    lines = []
+
+    def walk(parent, depth):
+        for span in children.get(parent, []):
+            mark = " ❌" if span["status"] == "error" else ""
+            attrs = ", ".join(f"{k}={v}" for k, v in span["attributes"].items())
+            lines.append(f"{'  ' * depth}{span['duration_ms']:>9.1f} ms  {span['name']}{mark}  {attrs}")
+            walk(span["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m app.services.tracing traces.jsonl [trace_id] — деревья трасс, самые долгие первыми
+    traces: dict = {}
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for line in f:
+            span = json.loads(line)
+            traces.setdefault(span["trace_id"], []).append(span)
+    selected = [sys.argv[2]] if len(sys.argv) > 2 else sorted(
+        traces, key=lambda t: -max(s["duration_ms"] or 0 for s in traces[t])
+    )[:10]
+    for trace_id in selected:
+        print(f"trace {trace_id}")
+        print(format_trace(traces[trace_id]))
+        print()
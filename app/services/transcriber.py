@@ -5,14 +5,55 @@ Whisper Transcriber Service
 Инструкции в LEARNING.md
 """
 
-from openai import AsyncOpenAI
+from dataclasses import dataclass
+from pathlib import Path
+import asyncio
+
+import httpx
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, guard
+from app.services.metrics import AUDIO_SECONDS, COST
+from app.services.tracing import tracer
+from app.services.usage import whisper_cost
+
+# Форматы, которые принимаем на вход (все поддерживаются Whisper API)
+AUDIO_EXTENSIONS = {'.m4a', '.mp3', '.wav', '.webm'}
+
+
+@dataclass
+class Transcription:
+    """Текст транскрипции и длительность аудио (для учёта стоимости Whisper)."""
+    text: str
+    duration_seconds: float | None = None
 
 
 class WhisperTranscriber:
     """Service for audio transcription using OpenAI Whisper."""
 
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        http_client: httpx.AsyncClient | None = None,
+        breaker: CircuitBreaker | None = None
+    ):
+        self.api_key = api_key
+        self.http_client = http_client
+        self._client = None
+        # Circuit breaker OpenAI (общий с агентом): при открытом — отказ без загрузки аудио
+        self.breaker = breaker
+
+    @property
+    def client(self):
+        """AsyncOpenAI клиент; openai загружается при первом обращении, а не при старте."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(api_key=self.api_key, http_client=self.http_client)
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
 
     async def transcribe(self, audio_file_path: str) -> str:
         """
@@ -27,19 +68,40 @@ class WhisperTranscriber:
         Raises:
             Exception: Если транскрипция не удалась
         """
-        try:
-            # Открываем файл в бинарном режиме
-            with open(audio_file_path, 'rb') as audio_file:
+        return (await self.transcribe_verbose(audio_file_path)).text
+
+    async def transcribe_verbose(self, audio_file_path: str) -> Transcription:
+        """
+        Транскрибирует аудио файл; вместе с текстом возвращает длительность аудио.
+
+        Whisper тарифицируется по минутам аудио, длительность берётся из
+        verbose_json ответа.
+        """
+        with tracer.span("whisper.transcribe", model="whisper-1") as span:
+            try:
+                # Читаем файл в потоке: open()/read() на диске не должны держать event loop
+                path = Path(audio_file_path)
+                content = await asyncio.to_thread(path.read_bytes)
+                span.set_attribute("audio.bytes", len(content))
                 # Вызываем Whisper API для транскрипции
-                transcription = await self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="ru"
-                )
-
-                return transcription.text
-
-        except FileNotFoundError:
-            raise Exception(f"Аудио файл не найден: {audio_file_path}")
-        except Exception as e:
-            raise Exception(f"Ошибка транскрипции: {str(e)}")
+                with guard(self.breaker):
+                    transcription = await self.client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=(path.name, content),
+                        language="ru",
+                        response_format="verbose_json"
+                    )
+
+                duration = getattr(transcription, "duration", None)
+                if duration is not None:
+                    AUDIO_SECONDS.inc(duration)
+                    COST.inc(whisper_cost(duration), model="whisper-1")
+                span.set_attributes(**{"transcription.chars": len(transcription.text), "audio.seconds": duration})
+                return Transcription(transcription.text, duration)
+
+            except FileNotFoundError:
+                raise Exception(f"Аудио файл не найден: {audio_file_path}")
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                raise Exception(f"Ошибка транскрипции: {str(e)}")
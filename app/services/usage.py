@@ -0,0 +1,149 @@
+"""
+Usage
+
+Учёт токенов и стоимости одного запроса: prompt / completion / cached токены
+каждой итерации агента и длительность аудио Whisper, сумма по запросу,
+стоимость по прайсу и проверка бюджетов запроса.
+
+На каждой итерации агента prompt заново включает всю историю (system prompt,
+транскрипцию, ответы модели и результаты tools), поэтому prompt токены
+растут с числом итераций — по iterations в ответе это видно. Неизменный
+префикс (system prompt, tools, предыдущие сообщения) провайдер отдаёт из
+prompt cache: доля cached токенов — cache_hit_ratio.
+"""
+
+from dataclasses import dataclass, field
+
+# USD за 1M токенов: prompt, cached prompt, completion
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+}
+# USD за минуту аудио
+WHISPER_PRICE_PER_MINUTE = 0.006
+
+
+def _model_price(model: str) -> tuple[float, float, float] | None:
+    # Версии с датой (gpt-4o-2024-08-06) — по базовой модели; самый длинный префикс
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model == name or model.startswith(name + "-"):
+            return MODEL_PRICES[name]
+    return None
+
+
+def llm_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float | None:
+    """Стоимость одного вызова в USD (None — модели нет в прайсе)."""
+    price = _model_price(model)
+    if price is None:
+        return None
+    prompt_price, cached_price, completion_price = price
+    return (
+        (prompt_tokens - cached_tokens) * prompt_price
+        + cached_tokens * cached_price
+        + completion_tokens * completion_price
+    ) / 1_000_000
+
+
+def whisper_cost(audio_seconds: float) -> float:
+    return audio_seconds / 60 * WHISPER_PRICE_PER_MINUTE
+
+
+def cache_hit_ratio(cached_tokens: int, prompt_tokens: int) -> float | None:
+    """Доля prompt токенов из кэша провайдера."""
+    return round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None
+
+
+@dataclass
+class IterationUsage:
+    """Токены одного chat completion."""
+    iteration: int
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    cost_usd: float | None
+
+    def as_dict(self) -> dict:
+        return {
+            "iteration": self.iteration,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_hit_ratio": cache_hit_ratio(self.cached_tokens, self.prompt_tokens),
+            "cost_usd": round(self.cost_usd, 6) if self.cost_usd is not None else None
+        }
+
+
+@dataclass
+class UsageMeter:
+    """
+    Токены и стоимость одного прогона агента.
+
+    Args:
+        max_tokens: Бюджет prompt + completion токенов на запрос (0 — без лимита)
+        max_cost_usd: Бюджет стоимости на запрос (0 — без лимита)
+    """
+    max_tokens: int = 0
+    max_cost_usd: float = 0.0
+    iterations: list[IterationUsage] = field(default_factory=list)
+
+    def record(self, iteration: int, model: str, usage) -> IterationUsage | None:
+        """Записывает usage ответа chat completion (None у ответа — ничего не пишет)."""
+        if usage is None:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        record = IterationUsage(
+            iteration=iteration,
+            model=model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_tokens=cached,
+            cost_usd=llm_cost(model, usage.prompt_tokens, usage.completion_tokens, cached)
+        )
+        self.iterations.append(record)
+        return record
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(i.prompt_tokens for i in self.iterations)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(i.completion_tokens for i in self.iterations)
+
+    @property
+    def cached_tokens(self) -> int:
+        return sum(i.cached_tokens for i in self.iterations)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def cost_usd(self) -> float:
+        # Модели не из прайса в стоимость не входят
+        return sum(i.cost_usd for i in self.iterations if i.cost_usd is not None)
+
+    def exceeded(self) -> str | None:
+        """Какой бюджет превышен: "tokens", "cost" или None."""
+        if self.max_tokens and self.total_tokens >= self.max_tokens:
+            return "tokens"
+        if self.max_cost_usd and self.cost_usd >= self.max_cost_usd:
+            return "cost"
+        return None
+
+    def summary(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_hit_ratio": cache_hit_ratio(self.cached_tokens, self.prompt_tokens),
+            "total_tokens": self.total_tokens,
+            "llm_calls": len(self.iterations),
+            "cost_usd": round(self.cost_usd, 6),
+            "iterations": [i.as_dict() for i in self.iterations]
+        }
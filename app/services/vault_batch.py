@@ -0,0 +1,173 @@
+"""
+Vault Batch
+
+Буфер записей в vault для пакетной обработки заметок (POST /api/voice/batch).
+
+Tools пишут в vault как обычно (get_file / create_file / update_file), но
+записи складываются в память поверх текущего состояния репозитория, а в
+конце пакета уходят одним коммитом через Git Data API вместо коммита на
+каждую задачу или заметку. Чтения видят уже буферизованные записи, так что
+несколько заметок подряд дописывают TODO.md, а не затирают друг друга.
+"""
+
+from dataclasses import dataclass, field
+import asyncio
+import logging
+
+from app.services.github_vault import FileInfo, GitHubVaultService
+from app.services.metrics import CONFLICTS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    """Буферизованное содержимое файла."""
+    content: str
+    version: int
+    writers: set[int] = field(default_factory=set)
+
+
+class BufferedVault:
+    """
+    Оверлей записей над GitHubVaultService с одним коммитом в конце.
+
+    Для каждой заметки пакета берётся view(index): через него видно, какие
+    заметки записали какие файлы, — если коммит не удался, ошибку получают
+    только они.
+
+    Args:
+        vault: GitHubVaultService
+    """
+
+    def __init__(self, vault: GitHubVaultService):
+        self.vault = vault
+        self._pending: dict[str, _Pending] = {}
+        # Состояние репозитория: путь -> FileInfo (None — файла нет)
+        self._base: dict[str, FileInfo | None] = {}
+        self._loading: dict[str, asyncio.Task] = {}
+        self._messages: list[str] = []
+        self._version = 0
+
+    def view(self, index: int) -> "VaultView":
+        return VaultView(self, index)
+
+    async def _load(self, path: str) -> FileInfo | None:
+        """Читает файл из репозитория один раз (параллельные чтения ждут один запрос)."""
+        if path not in self._base:
+            task = self._loading.get(path)
+            if task is None:
+                task = asyncio.ensure_future(self.vault.get_file(path))
+                self._loading[path] = task
+            try:
+                info = await task
+            finally:
+                self._loading.pop(path, None)
+            self._base.setdefault(path, info)
+        return self._base[path]
+
+    async def get_file(self, path: str) -> FileInfo | None:
+        base = await self._load(path)
+        # Состояние берётся после await: запись другой заметки, сделанная,
+        # пока мы ждали, уже видна, и read-modify-write в tool не теряет её
+        pending = self._pending.get(path)
+        if pending is not None:
+            return FileInfo(path=path, sha=f"pending-{pending.version}", content=pending.content)
+        return base
+
+    def _write(self, path: str, content: str, sha: str | None, commit_message: str, writer: int) -> FileInfo:
+        pending = self._pending.get(path)
+        current = (
+            f"pending-{pending.version}" if pending is not None
+            else self._base[path].sha if self._base.get(path) else None
+        )
+        # Как 409 у Contents API: запись поверх версии, которую tool не видел
+        if sha is not None and sha != current:
+            CONFLICTS.inc(kind="vault_write")
+            raise Exception(f"Конфликт записи {path}: файл изменён другой заметкой пакета")
+
+        self._version += 1
+        writers = pending.writers if pending is not None else set()
+        writers.add(writer)
+        self._pending[path] = _Pending(content, self._version, writers)
+        self._messages.append(commit_message)
+        return FileInfo(path=path, sha=f"pending-{self._version}", content=content)
+
+    async def create_file(self, path: str, content: str, commit_message: str, writer: int = -1) -> FileInfo:
+        if path in self._pending or await self._load(path) is not None:
+            raise Exception(f"Файл уже существует: {path}")
+        return self._write(path, content, None, commit_message, writer)
+
+    async def update_file(self, path: str, content: str, sha: str, commit_message: str, writer: int = -1) -> FileInfo:
+        if path not in self._pending and await self._load(path) is None:
+            raise FileNotFoundError(f"Файл не найден: {path}")
+        return self._write(path, content, sha, commit_message, writer)
+
+    async def create_or_update_file(self, path: str, content: str, commit_message: str, writer: int = -1) -> FileInfo:
+        await self._load(path)
+        return self._write(path, content, None, commit_message, writer)
+
+    async def list_folder(self, folder_path: str) -> list[str]:
+        try:
+            files = await self.vault.list_folder(folder_path)
+        except Exception:
+            # Папка может появиться только в этом пакете
+            files = []
+        prefix = folder_path.rstrip("/") + "/"
+        for path in self._pending:
+            name = path[len(prefix):]
+            if path.startswith(prefix) and "/" not in name and name not in files:
+                files.append(name)
+        return files
+
+    def writers(self) -> set[int]:
+        """Индексы заметок, у которых есть незакоммиченные записи."""
+        return {writer for pending in self._pending.values() for writer in pending.writers}
+
+    def stats(self) -> dict:
+        return {"files": len(self._pending), "writes": len(self._messages)}
+
+    async def flush(self, summary: str) -> str | None:
+        """
+        Коммитит все буферизованные записи одним коммитом.
+
+        Args:
+            summary: Первая строка сообщения коммита (в теле — сообщения отдельных записей)
+
+        Returns:
+            SHA коммита или None, если записей не было
+        """
+        if not self._pending:
+            return None
+        files = {path: pending.content for path, pending in self._pending.items()}
+        base_shas = {path: info.sha if info else None for path, info in self._base.items() if path in files}
+        message = summary + "\n\n" + "\n".join(f"- {m}" for m in self._messages)
+        sha = await self.vault.commit_files(files, message, base_shas=base_shas)
+        logger.info("Vault batch committed: %d files, %d writes in %.7s", len(files), len(self._messages), sha)
+        self._base.clear()
+        self._pending.clear()
+        self._messages.clear()
+        return sha
+
+
+class VaultView:
+    """Интерфейс GitHubVaultService для одной заметки пакета поверх общего BufferedVault."""
+
+    def __init__(self, buffer: BufferedVault, index: int):
+        self.buffer = buffer
+        self.index = index
+
+    async def get_file(self, path: str) -> FileInfo | None:
+        return await self.buffer.get_file(path)
+
+    async def create_file(self, path: str, content: str, commit_message: str) -> FileInfo:
+        return await self.buffer.create_file(path, content, commit_message, writer=self.index)
+
+    async def update_file(self, path: str, content: str, sha: str, commit_message: str) -> FileInfo:
+        return await self.buffer.update_file(path, content, sha, commit_message, writer=self.index)
+
+    async def create_or_update_file(self, path: str, content: str, commit_message: str) -> FileInfo:
+        return await self.buffer.create_or_update_file(path, content, commit_message, writer=self.index)
+
+    async def list_folder(self, folder_path: str) -> list[str]:
+        return await self.buffer.list_folder(folder_path)
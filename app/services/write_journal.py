@@ -0,0 +1,181 @@
+"""
+Write Journal
+
+Журнал отложенных записей в vault: пока GitHub недоступен (breaker открыт),
+create_note / add_todo_task / append_to_note не теряются и не ждут таймаутов —
+вызов tool с аргументами дописывается в JSONL, а агент сразу получает ответ
+"сохранено в журнал".
+
+Фоновая задача (start() в lifespan) раз в interval_seconds повторяет записи
+по порядку через те же tools. Повтор останавливается на первой неудаче
+(порядок важен: append_to_note после create_note той же заметки); запись,
+не прошедшая max_attempts раз, удаляется из журнала с ошибкой в логе.
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+
+from app.services.circuit_breaker import OPEN, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Tools, которые пишут в vault: их вызовы журналируются при недоступном GitHub
+JOURNALED_TOOLS = {"create_note", "add_todo_task", "append_to_note"}
+
+
+class WriteJournal:
+    """
+    Журнал записей в vault (JSONL) и их повтор.
+
+    Args:
+        path: Файл журнала
+        vault: GitHubVaultService, в который повторяются записи
+        interval_seconds: Период повтора
+        max_attempts: Сколько раз повторять запись, прежде чем отбросить
+    """
+
+    def __init__(self, path: str | Path, vault, interval_seconds: float = 30.0, max_attempts: int = 5):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.vault = vault
+        self.interval_seconds = interval_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self.pending = len(self._load())
+        self.journaled_total = 0
+        self.replayed_total = 0
+        self.dropped_total = 0
+
+    def _load(self) -> list[dict]:
+        if not self.path.exists():
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _append(self, entry: dict) -> None:
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.pending += 1
+
+    def _commit(self, done: set[str], attempts: dict[str, tuple[int, str]]) -> None:
+        """Убирает выполненные записи и обновляет счётчики попыток (атомарная перезапись файла)."""
+        with self._lock:
+            # Перечитываем: пока шёл повтор, в журнал могли дописать новые записи
+            entries = [entry for entry in self._load() if entry["id"] not in done]
+            for entry in entries:
+                if entry["id"] in attempts:
+                    entry["attempts"], entry["error"] = attempts[entry["id"]]
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+            os.replace(tmp, self.path)
+            self.pending = len(entries)
+
+    async def append(self, tool: str, arguments: dict) -> None:
+        """Записывает отложенный вызов tool."""
+        entry = {
+            "id": uuid.uuid4().hex,
+            "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "tool": tool,
+            "arguments": arguments,
+            "attempts": 0,
+        }
+        await asyncio.to_thread(self._append, entry)
+        self.journaled_total += 1
+        logger.warning("Vault unavailable, %s journaled (%d pending)", tool, self.pending)
+
+    async def replay(self) -> int:
+        """
+        Повторяет записи журнала по порядку.
+
+        Returns:
+            Сколько записей выполнено
+        """
+        from app.tools.note_tools import create_note, append_to_note
+        from app.tools.todo_tools import add_todo_task
+
+        tools = {"create_note": create_note, "add_todo_task": add_todo_task, "append_to_note": append_to_note}
+        done: set[str] = set()
+        attempts: dict[str, tuple[int, str]] = {}
+        for entry in await asyncio.to_thread(self._load):
+            try:
+                await tools[entry["tool"]](**entry["arguments"], vault=self.vault)
+            except CircuitOpenError:
+                break
+            except Exception as e:
+                tries = entry.get("attempts", 0) + 1
+                if tries >= self.max_attempts:
+                    logger.error("Journaled %s dropped after %d attempts: %s", entry["tool"], tries, e)
+                    done.add(entry["id"])
+                    self.dropped_total += 1
+                else:
+                    logger.warning("Journaled %s failed (attempt %d): %s", entry["tool"], tries, e)
+                    attempts[entry["id"]] = (tries, f"{type(e).__name__}: {e}")
+                break
+            done.add(entry["id"])
+            self.replayed_total += 1
+        if done or attempts:
+            await asyncio.to_thread(self._commit, done, attempts)
+        if done:
+            logger.info("Vault journal replayed: %d done, %d pending", len(done), self.pending)
+        return len(done)
+
+    async def run(self) -> None:
+        """Цикл повтора (пока задача не отменена)."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            breaker = getattr(self.vault, "breaker", None)
+            if not self.pending or (breaker is not None and breaker.state == OPEN):
+                continue
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.error("Vault journal replay failed: %s", e, exc_info=True)
+
+    def start(self) -> None:
+        """Запускает фоновый повтор (вызывается из lifespan)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновый повтор."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "journaled_total": self.journaled_total,
+            "replayed_total": self.replayed_total,
+            "dropped_total": self.dropped_total,
+        }
+
+
+async def unavailable_result(tool: str, arguments: dict, error: CircuitOpenError,
+                             journal: WriteJournal | None = None) -> str:
+    """
+    Результат tool, отклонённого breaker: сразу, текстом для агента.
+
+    Запись в vault при недоступном GitHub уходит в журнал (если он включён),
+    остальное — отказ с просьбой не повторять вызов.
+    """
+    if journal is not None and tool in JOURNALED_TOOLS and error.dependency == "github":
+        await journal.append(tool, arguments)
+        return (
+            f"❌ {error}. Запись сохранена в журнал и будет выполнена автоматически, "
+            "когда сервис восстановится — повторять вызов не нужно."
+        )
+    return f"❌ {error}. Не повторяй этот вызов сейчас: сообщи пользователю, что действие не выполнено."
@@ -6,114 +6,173 @@ Calendar Tools for AI Agent
 
 from datetime import datetime, timedelta
 from typing import Annotated
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.date_parser import ParsedDate, parse_date
+from app.services.free_busy import BusyInterval, FreeBusyResult, IntervalTree
 from app.services.google_calendar import GoogleCalendarService
-import re
+from app.services.metrics import CONFLICTS
+from app.services.tracing import traced_tool
 from zoneinfo import ZoneInfo
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Ниже этой уверенности разбор даты отклоняется, а не угадывается
+# ("в выходные вечером": и день, и час приблизительные)
+MIN_DATE_CONFIDENCE = 0.5
+# Длительность события, если её нет ни в аргументах, ни в диапазоне даты
+DEFAULT_DURATION_MINUTES = 60
 
-def parse_russian_date(date_str: str, timezone: str = "Europe/Berlin") -> datetime:
+
+def parse_russian_date(
+    date_str: str,
+    timezone: str = "Europe/Berlin",
+    for_day: bool = False,
+    min_confidence: float = MIN_DATE_CONFIDENCE
+) -> ParsedDate:
     """
-    Парсит русскоязычные описания дат в datetime с учетом временной зоны.
+    Парсит русскоязычные описания дат с учетом временной зоны.
 
     Args:
-        date_str: Строка с датой ("завтра", "в пятницу", "через неделю", "2026-01-20 15:00")
+        date_str: Строка с датой ("завтра", "в пятницу в 10", "в следующий вторник",
+            "в 3 часа дня", "завтра с 10 до 12", "через неделю", "2026-01-20 15:00")
         timezone: Временная зона (по умолчанию Europe/Berlin)
+        for_day: Нужен день, а не начало события (см. parse_date)
+        min_confidence: Минимальная уверенность разбора
 
     Returns:
-        datetime объект с временной зоной
+        ParsedDate: start с временной зоной (если время не указано — 10:00),
+        end — конец диапазона или None
+
+    Raises:
+        ValueError: Если дата не распознана, распознана не целиком
+            ("завтра в 15ч30": время "30" осталось вне выражения)
+            или с уверенностью ниже min_confidence
     """
-    date_str = date_str.lower().strip()
-    tz = ZoneInfo(timezone)
-    now = datetime.now(tz)
-
-    logger.info(f"📅 Parsing date: '{date_str}' (current time: {now.strftime('%Y-%m-%d %H:%M %Z')})")
-
-    # ISO формат с временем
-    if re.match(r"\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}", date_str):
-        dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
-        return dt.replace(tzinfo=tz)
-
-    # ISO формат без времени (берём 10:00 по умолчанию)
-    if re.match(r"\d{4}-\d{2}-\d{2}", date_str):
-        dt = datetime.strptime(date_str + " 10:00", "%Y-%m-%d %H:%M")
-        return dt.replace(tzinfo=tz)
-
-    # Парсим даты типа "3 февраля", "15 марта" и т.д.
-    months_ru = {
-        "января": 1, "февраля": 2, "марта": 3, "апреля": 4,
-        "мая": 5, "июня": 6, "июля": 7, "августа": 8,
-        "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12
-    }
-
-    # Ищем паттерн: число + месяц (например "3 февраля")
-    date_pattern = re.search(r"(\d{1,2})\s+(января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)", date_str)
-    if date_pattern:
-        day = int(date_pattern.group(1))
-        month = months_ru[date_pattern.group(2)]
-        logger.info(f"   ✓ Matched Russian date: day={day}, month={month}")
-
-        # Определяем год: если дата уже прошла в текущем году, берём следующий год
-        year = now.year
-        try:
-            target_date = now.replace(year=year, month=month, day=day)
-            if target_date < now:
-                # Дата уже прошла в этом году, берём следующий год
-                logger.info(f"   → Date {target_date.date()} is in the past, using next year")
-                year = now.year + 1
-                target_date = now.replace(year=year, month=month, day=day)
-            logger.info(f"   → Calculated date: {target_date.strftime('%Y-%m-%d')}")
-        except ValueError:
-            # Невалидная дата (например 31 февраля)
-            logger.warning(f"   ✗ Invalid date: {day}/{month}, using tomorrow")
-            target_date = now + timedelta(days=1)
-
-        # Извлекаем время если указано
-        time_match = re.search(r"(\d{1,2}):(\d{2})", date_str)
-        if time_match:
-            hour = int(time_match.group(1))
-            minute = int(time_match.group(2))
-            result = target_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        else:
-            result = target_date.replace(hour=10, minute=0, second=0, microsecond=0)
+    now = datetime.now(ZoneInfo(timezone))
+    parsed = parse_date(date_str, now, for_day=for_day)
+    if parsed is None:
+        raise ValueError(f"не удалось распознать дату '{date_str}'")
+    if parsed.leftover:
+        raise ValueError(
+            f"дата '{date_str}' распознана не целиком: '{' '.join(parsed.leftover)}' вне '{parsed.text}'"
+        )
+    if parsed.confidence < min_confidence:
+        raise ValueError(
+            f"дата '{date_str}' неоднозначна (уверенность {parsed.confidence:.2f}): "
+            "укажи день и время явно, например '2026-01-20 15:00'"
+        )
 
-        logger.info(f"   ✅ Final parsed date: {result.strftime('%Y-%m-%d %H:%M %Z')}")
-        return result
+    logger.debug("📅 Parsed date '%s' → %s (confidence %.2f)", date_str, parsed.start, parsed.confidence)
+    return parsed
+
+
+def event_duration(parsed: ParsedDate, duration_minutes: int | None) -> int:
+    """Длительность события: явная, иначе по диапазону в дате ("с 10 до 12"), иначе 60 минут."""
+    if duration_minutes:
+        return duration_minutes
+    if parsed.end is not None:
+        return int((parsed.end - parsed.start).total_seconds() // 60)
+    return DEFAULT_DURATION_MINUTES
+
+
+async def check_conflicts(
+    calendar: GoogleCalendarService,
+    title: str,
+    start_datetime: datetime,
+    end_datetime: datetime
+) -> str | None:
+    """
+    Проверяет интервал по free/busy (если проверка включена).
 
-    # Относительные даты
-    if "завтра" in date_str:
-        base = now + timedelta(days=1)
-    elif "послезавтра" in date_str:
-        base = now + timedelta(days=2)
-    elif "сегодня" in date_str:
-        base = now
-    elif "через неделю" in date_str:
-        base = now + timedelta(weeks=1)
-    elif "через месяц" in date_str:
-        base = now + timedelta(days=30)
-    else:
-        # По умолчанию - завтра
-        base = now + timedelta(days=1)
-
-    # Извлекаем время если указано
-    time_match = re.search(r"(\d{1,2}):(\d{2})", date_str)
-    if time_match:
-        hour = int(time_match.group(1))
-        minute = int(time_match.group(2))
-        return base.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    else:
-        # Время по умолчанию 10:00
-        return base.replace(hour=10, minute=0, second=0, microsecond=0)
+    Returns:
+        Сообщение о конфликте со свободными окнами или None, если время свободно
+        (или проверить не удалось — тогда событие создаётся как раньше)
+    """
+    if calendar.free_busy is None:
+        return None
+    try:
+        result = await calendar.free_busy.check(start_datetime, end_datetime)
+    except Exception as e:
+        logger.warning("Free/busy check failed, creating event without it: %s", e)
+        return None
+    return conflict_message(calendar, title, start_datetime, end_datetime, result)
+
+
+def conflict_message(
+    calendar: GoogleCalendarService,
+    title: str,
+    start_datetime: datetime,
+    end_datetime: datetime,
+    result: FreeBusyResult
+) -> str | None:
+    """Сообщение о конфликте со свободными окнами по результату free/busy (None — время свободно)."""
+    if not result.busy:
+        return None
+
+    tz = ZoneInfo(calendar.timezone)
+    busy = ", ".join(
+        (f"'{c.summary}' " if c.summary else "")
+        + f"{c.start.astimezone(tz).strftime('%d.%m %H:%M')}–{c.end.astimezone(tz).strftime('%H:%M')}"
+        for c in result.conflicts
+    )
+    message = (
+        f"⚠️ Событие '{title}' НЕ создано: на {start_datetime.strftime('%d.%m.%Y %H:%M')}–"
+        f"{end_datetime.strftime('%H:%M')} время занято ({busy})."
+    )
+    if result.free_slots:
+        slots = ", ".join(
+            f"{s.strftime('%d.%m.%Y %H:%M')}–{e.strftime('%H:%M')}" for s, e in result.free_slots
+        )
+        message += f" Свободные окна: {slots}."
+    return message + " Выбери свободное окно или повтори вызов с force=true, чтобы создать событие поверх занятого времени."
+
+
+def batch_conflicts(specs: list[dict], forced: list[bool]) -> dict[int, str]:
+    """
+    Пересечения событий одного batch запроса между собой.
+
+    Free/busy видит только уже созданные события, поэтому два пересекающихся
+    события из одного запроса проверяются здесь. События идут по порядку:
+    событие без force, пересекающееся с одним из предыдущих принятых,
+    не создаётся.
+
+    Returns:
+        Позиция в specs -> сообщение о конфликте
+    """
+    intervals = [BusyInterval(s["start_datetime"], s["end_datetime"], s["summary"]) for s in specs]
+    positions = {id(interval): i for i, interval in enumerate(intervals)}
+    tree = IntervalTree(intervals)
+    rejected: dict[int, str] = {}
+    for i, interval in enumerate(intervals):
+        if forced[i]:
+            continue
+        earlier = [
+            other for other in tree.overlapping(interval.start, interval.end)
+            if positions[id(other)] < i and positions[id(other)] not in rejected
+        ]
+        if not earlier:
+            continue
+        CONFLICTS.inc(kind="calendar_batch")
+        busy = ", ".join(
+            f"'{o.summary}' {o.start.strftime('%d.%m %H:%M')}–{o.end.strftime('%H:%M')}" for o in earlier
+        )
+        rejected[i] = (
+            f"⚠️ Событие '{interval.summary}' НЕ создано: на {interval.start.strftime('%d.%m.%Y %H:%M')}–"
+            f"{interval.end.strftime('%H:%M')} пересекается с событием из этого же запроса ({busy}). "
+            "Выбери другое время или повтори вызов с force=true, чтобы создать событие поверх занятого времени."
+        )
+    return rejected
 
 
+@traced_tool("create_calendar_event", "start_date", "duration_minutes", "force")
 async def create_calendar_event(
     title: Annotated[str, "Название события"],
     start_date: Annotated[str, "Дата и время начала (например: 'завтра в 15:00', '2025-01-20 10:00')"],
-    duration_minutes: Annotated[int, "Длительность в минутах"] = 60,
+    duration_minutes: Annotated[int | None, "Длительность в минутах"] = None,
     description: Annotated[str | None, "Описание события"] = None,
     location: Annotated[str | None, "Место проведения"] = None,
+    force: Annotated[bool, "Создать даже при пересечении с занятым временем"] = False,
     calendar: GoogleCalendarService | None = None
 ) -> str:
     """
@@ -123,26 +182,36 @@ async def create_calendar_event(
     Args:
         title: Название события
         start_date: Дата/время начала
-        duration_minutes: Длительность в минутах (по умолчанию 60)
+        duration_minutes: Длительность в минутах (по умолчанию — по диапазону
+            в start_date, "с 10 до 12", иначе 60)
         description: Описание события
         location: Место проведения
+        force: Не проверять пересечения с занятым временем
         calendar: GoogleCalendarService instance (передаётся автоматически)
 
     Returns:
-        Сообщение об успешном создании события
+        Сообщение об успешном создании события или о конфликте со свободными окнами
     """
     if calendar is None:
         return "❌ Ошибка: Google Calendar не настроен. Добавьте GOOGLE_CALENDAR_CREDENTIALS_JSON в переменные окружения."
 
     try:
         # Парсим дату начала с учетом timezone календаря
-        start_datetime = parse_russian_date(start_date, timezone=calendar.timezone)
+        parsed = parse_russian_date(start_date, timezone=calendar.timezone)
+        start_datetime = parsed.start
 
         # Вычисляем дату окончания
+        duration_minutes = event_duration(parsed, duration_minutes)
         end_datetime = start_datetime + timedelta(minutes=duration_minutes)
 
-        # Создаём событие (синхронный вызов Google API)
-        calendar.create_event(
+        # Двойное бронирование: возвращаем конфликт и свободные окна в том же tool call
+        if not force:
+            conflict = await check_conflicts(calendar, title, start_datetime, end_datetime)
+            if conflict:
+                return conflict
+
+        # Создаём событие (вызов Google API выполняется в пуле потоков)
+        await calendar.create_event(
             summary=title,
             start_datetime=start_datetime,
             end_datetime=end_datetime,
@@ -156,20 +225,126 @@ async def create_calendar_event(
             f"(длительность: {duration_minutes} мин)"
         )
 
+    except CircuitOpenError:
+        # Отказ без запроса: агент получает единый ответ "сервис недоступен"
+        raise
     except Exception as e:
         return f"Ошибка создания события: {str(e)}"
 
 
+@traced_tool("create_calendar_events")
+async def create_calendar_events(
+    events: list[dict],
+    calendar: GoogleCalendarService | None = None
+) -> list[str]:
+    """
+    Создаёт несколько событий одним batch запросом к Google Calendar.
+    Используется агентом, когда модель за один шаг просит создать
+    несколько событий (например, "встреча в 10, звонок в 14, ужин в 19").
+
+    Args:
+        events: Список аргументов create_calendar_event (title, start_date,
+            duration_minutes, description, location, force)
+        calendar: GoogleCalendarService instance
+
+    Returns:
+        Сообщение для каждого события в том же порядке —
+        об успешном создании, о конфликте (с занятым временем или с другим
+        событием этого же запроса) или об ошибке
+
+    Raises:
+        CircuitOpenError: breaker Google Calendar открыт и ни одно событие не создано
+    """
+    if calendar is None:
+        return [
+            "❌ Ошибка: Google Calendar не настроен. Добавьте GOOGLE_CALENDAR_CREDENTIALS_JSON в переменные окружения."
+        ] * len(events)
+
+    messages: list[str | None] = [None] * len(events)
+    specs = []
+    positions = []
+    forced = []
+    for i, args in enumerate(events):
+        try:
+            parsed = parse_russian_date(args["start_date"], timezone=calendar.timezone)
+            start_datetime = parsed.start
+            duration_minutes = event_duration(parsed, args.get("duration_minutes"))
+            end_datetime = start_datetime + timedelta(minutes=duration_minutes)
+            specs.append({
+                "summary": args["title"],
+                "start_datetime": start_datetime,
+                "end_datetime": end_datetime,
+                "description": args.get("description"),
+                "location": args.get("location"),
+            })
+            positions.append(i)
+            forced.append(bool(args.get("force")))
+        except Exception as e:
+            messages[i] = f"Ошибка создания события: {str(e)}"
+
+    # Занятое время: один запрос free/busy на окно всех событий, а не по запросу на событие
+    checked = [j for j, force in enumerate(forced) if not force]
+    if calendar.free_busy is not None and checked:
+        try:
+            busy = await calendar.free_busy.check_many(
+                [(specs[j]["start_datetime"], specs[j]["end_datetime"]) for j in checked]
+            )
+        except Exception as e:
+            logger.warning("Free/busy check failed, creating events without it: %s", e)
+            busy = []
+        for j, result in zip(checked, busy):
+            spec = specs[j]
+            conflict = conflict_message(calendar, spec["summary"], spec["start_datetime"], spec["end_datetime"], result)
+            if conflict:
+                messages[positions[j]] = conflict
+        keep = [j for j in range(len(specs)) if messages[positions[j]] is None]
+        specs, positions, forced = [specs[j] for j in keep], [positions[j] for j in keep], [forced[j] for j in keep]
+
+    overlaps = batch_conflicts(specs, forced)
+    for j, message in overlaps.items():
+        messages[positions[j]] = message
+    specs = [spec for j, spec in enumerate(specs) if j not in overlaps]
+    positions = [i for j, i in enumerate(positions) if j not in overlaps]
+
+    try:
+        results = await calendar.create_events(specs)
+    except CircuitOpenError:
+        # Как и create_calendar_event: агент отвечает "сервис недоступен" на каждый вызов
+        raise
+    except Exception as e:
+        results = [Exception(f"Ошибка создания события: {e}")] * len(specs)
+
+    for i, spec, result in zip(positions, specs, results):
+        if isinstance(result, CircuitOpenError):
+            # Breaker открылся посреди batch: часть событий уже создана
+            messages[i] = f"❌ {result}. Событие не создано."
+        elif isinstance(result, Exception):
+            # Текст ошибки уже с префиксом "Ошибка создания события"
+            messages[i] = str(result)
+        else:
+            duration_minutes = int((spec["end_datetime"] - spec["start_datetime"]).total_seconds() // 60)
+            messages[i] = (
+                f"Событие '{spec['summary']}' создано в календаре на "
+                f"{spec['start_datetime'].strftime('%d.%m.%Y %H:%M')} "
+                f"(длительность: {duration_minutes} мин)"
+            )
+
+    return messages
+
+
+@traced_tool("list_calendar_events", "date", "max_results")
 async def list_calendar_events(
     max_results: Annotated[int, "Максимальное количество событий"] = 5,
+    date: Annotated[str | None, "День (например: 'завтра', 'в четверг', '3 февраля')"] = None,
     calendar: GoogleCalendarService | None = None
 ) -> str:
     """
-    Возвращает список ближайших событий в календаре.
-    Используй когда пользователь спрашивает "что у меня в календаре", "какие встречи на неделе".
+    Возвращает список ближайших событий в календаре или событий на конкретный день.
+    Используй когда пользователь спрашивает "что у меня в календаре", "что у меня в четверг".
 
     Args:
-        max_results: Сколько событий показать (по умолчанию 5)
+        max_results: Сколько ближайших событий показать (по умолчанию 5)
+        date: День, события которого нужно показать (все события этого дня)
         calendar: GoogleCalendarService instance
 
     Returns:
@@ -179,12 +354,19 @@ async def list_calendar_events(
         return "❌ Ошибка: Google Calendar не настроен. Добавьте GOOGLE_CALENDAR_CREDENTIALS_JSON в переменные окружения."
 
     try:
-        events = calendar.list_upcoming_events(max_results=max_results)
-
-        if not events:
-            return "В календаре нет ближайших событий."
+        if date:
+            day_start = parse_russian_date(date, timezone=calendar.timezone, for_day=True).start.replace(hour=0, minute=0)
+            events = await calendar.list_events_between(day_start, day_start + timedelta(days=1))
+            day = day_start.strftime('%d.%m.%Y')
+            if not events:
+                return f"На {day} событий нет."
+            result = f"События на {day} ({len(events)}):\n\n"
+        else:
+            events = await calendar.list_upcoming_events(max_results=max_results)
+            if not events:
+                return "В календаре нет ближайших событий."
+            result = f"Ближайшие события ({len(events)}):\n\n"
 
-        result = f"Ближайшие события ({len(events)}):\n\n"
         for i, event in enumerate(events, 1):
             start = event["start"]
             # Парсим дату
@@ -198,5 +380,7 @@ async def list_calendar_events(
 
         return result
 
+    except CircuitOpenError:
+        raise
     except Exception as e:
         return f"Ошибка получения событий: {str(e)}"
@@ -7,9 +7,13 @@ Note Tools for AI Agent
 
 from datetime import datetime
 from typing import Annotated
+import re
+from app.services.circuit_breaker import CircuitOpenError
 from app.services.github_vault import GitHubVaultService
+from app.services.tracing import traced_tool
 
 
+@traced_tool("create_note", "folder", "title")
 async def create_note(
     title: Annotated[str, "Заголовок заметки (без расширения .md)"],
     content: Annotated[str, "Содержимое заметки в Markdown формате"],
@@ -57,6 +61,7 @@ tags: [voice-note]
     return f"Заметка '{title}' создана в {folder}/{filename}"
 
 
+@traced_tool("append_to_note", "note_path")
 async def append_to_note(
     note_path: Annotated[str, "Путь к заметке относительно vault (например: Work/Project X.md)"],
     content: Annotated[str, "Контент для добавления в Markdown"],
@@ -85,14 +90,20 @@ async def append_to_note(
     return f"Контент добавлен к заметке {note_path}"
 
 
+@traced_tool("list_notes", "folder", "search_query", "cursor")
 async def list_notes(
     folder: Annotated[str | None, "Папка для поиска: Ideas, Work, Personal, Voice Notes. Если None - поиск во всех папках"] = None,
     search_query: Annotated[str | None, "Поиск по названию (опционально)"] = None,
+    limit: Annotated[int, "Сколько заметок вернуть за раз"] = 30,
+    cursor: Annotated[int, "Позиция начала страницы (из подсказки предыдущего ответа)"] = 0,
     vault: GitHubVaultService | None = None
 ) -> str:
     """
     Возвращает список заметок в указанной папке или во всех папках (если folder=None).
     Используй чтобы найти существующую заметку перед append_to_note или read_note.
+
+    Список отдаётся страницами по limit заметок; если есть продолжение,
+    в конце ответа указан cursor следующей страницы.
     """
     if vault is None:
         raise ValueError("GitHubVaultService не передан!")
@@ -108,6 +119,9 @@ async def list_notes(
                 # Добавляем путь с папкой к каждой заметке
                 notes_with_path = [f"{f}/{file}" for file in files if file.endswith('.md')]
                 all_notes.extend(notes_with_path)
+            except CircuitOpenError:
+                # GitHub недоступен — это не "папки нет": агент должен получить отказ
+                raise
             except Exception:
                 # Игнорируем ошибки (папка может не существовать)
                 continue
@@ -126,13 +140,27 @@ async def list_notes(
         location = f"папке {folder}" if folder else "vault"
         return f"В {location} нет заметок" + (f" по запросу '{search_query}'" if search_query else "")
 
-    notes_list = "\n".join(f"- {note}" for note in all_notes)
+    total = len(all_notes)
+    cursor = max(cursor, 0)
+    limit = max(limit, 1)
+    page = all_notes[cursor:cursor + limit]
+
+    notes_list = "\n".join(f"- {note}" for note in page)
     location = folder if folder else "всех папках"
-    return f"Заметки в {location}:\n{notes_list}"
+    result = f"Заметки в {location}:\n{notes_list}"
 
+    if cursor + limit < total:
+        result += (
+            f"\n\n[Показаны {cursor + 1}-{cursor + len(page)} из {total}. "
+            f"Следующая страница: cursor={cursor + limit}]"
+        )
+    return result
 
+
+@traced_tool("read_note", "note_path", "section")
 async def read_note(
     note_path: Annotated[str, "Путь к заметке относительно vault (например: Work/2026-01-20-Project X.md)"],
+    section: Annotated[str | None, "Заголовок раздела, который нужно прочитать (опционально)"] = None,
     vault: GitHubVaultService | None = None
 ) -> str:
     """
@@ -141,6 +169,7 @@ async def read_note(
 
     Args:
         note_path: Полный путь к заметке (папка/файл.md)
+        section: Заголовок раздела — вернуть только его (для длинных заметок)
         vault: GitHubVaultService instance (будет передан автоматически)
 
     Returns:
@@ -160,5 +189,45 @@ async def read_note(
     if file_info is None:
         return f"❌ Заметка не найдена: {note_path}\n\nИспользуй list_notes() чтобы найти доступные заметки."
 
+    if section:
+        section_content = extract_section(file_info.content, section)
+        if section_content is None:
+            headings = "\n".join(f"- {h}" for h in list_headings(file_info.content))
+            return (
+                f"❌ Раздел '{section}' не найден в {note_path}\n\n"
+                f"Доступные разделы:\n{headings or '(нет заголовков)'}"
+            )
+        return f"📄 Заметка: {note_path} — раздел '{section}'\n\n{section_content}"
+
     # Возвращаем содержимое
     return f"📄 Заметка: {note_path}\n\n{file_info.content}"
+
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$", re.MULTILINE)
+
+
+def list_headings(content: str) -> list[str]:
+    """Возвращает заголовки Markdown заметки."""
+    return [match.group(2) for match in _HEADING_RE.finditer(content)]
+
+
+def extract_section(content: str, section: str) -> str | None:
+    """
+    Вырезает раздел Markdown по заголовку (до следующего заголовка того же или более высокого уровня).
+
+    Returns:
+        Текст раздела вместе с заголовком или None если раздел не найден
+    """
+    wanted = section.strip().lstrip("#").strip().lower()
+    headings = list(_HEADING_RE.finditer(content))
+    for i, match in enumerate(headings):
+        if wanted not in match.group(2).lower():
+            continue
+        level = len(match.group(1))
+        end = len(content)
+        for following in headings[i + 1:]:
+            if len(following.group(1)) <= level:
+                end = following.start()
+                break
+        return content[match.start():end].strip()
+    return None
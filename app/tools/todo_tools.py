@@ -7,8 +7,10 @@ TODO Tools for AI Agent
 
 from typing import Annotated
 from app.services.github_vault import GitHubVaultService
+from app.services.tracing import traced_tool
 
 
+@traced_tool("add_todo_task", "priority", "due_date")
 async def add_todo_task(
     task: Annotated[str, "Текст задачи (начинай с глагола)"],
     priority: Annotated[str, "Приоритет: high, medium, low"] = "medium",
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Admission control load test: latency under overload with and without back-pressure.
+
+Open-loop arrivals (Poisson) hit a stand-in for /api/voice at a multiple of
+its capacity. The stand-in models the upstream APIs: up to --capacity calls
+run at --service seconds, beyond that every call slows down proportionally
+(processor sharing), like OpenAI/GitHub under rate limiting.
+
+Without admission control every request is accepted and latency grows with
+the backlog; with AdmissionMiddleware excess requests get 429/503 with
+Retry-After and accepted requests keep a bounded p99.
+
+Usage:
+    python benchmarks/bench_admission.py [--load 3] [--duration 10] [--service 0.2]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from app.services.admission import AdmissionController, AdmissionMiddleware  # noqa: E402
+
+
+def upstream_app(capacity: int, service: float):
+    """ASGI app, время ответа которого растёт, когда одновременных вызовов больше capacity."""
+    state = {"in_flight": 0}
+
+    async def app(scope, receive, send):
+        # Читаем тело (как multipart с аудио)
+        while (await receive()).get("more_body"):
+            pass
+        state["in_flight"] += 1
+        try:
+            # Работа в "секундах при полной скорости"; скорость делится между вызовами сверх capacity
+            remaining = service
+            last = time.perf_counter()
+            while remaining > 0:
+                await asyncio.sleep(min(0.05, remaining))
+                now = time.perf_counter()
+                remaining -= (now - last) * capacity / max(capacity, state["in_flight"])
+                last = now
+        finally:
+            state["in_flight"] -= 1
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"success": true}'})
+
+    return app
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+async def run(app, rate: float, duration: float, seed: int) -> dict:
+    random.seed(seed)
+    latencies, statuses, retry_after = [], {}, []
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one():
+            started = time.perf_counter()
+            response = await client.post("/api/voice", content=b"x" * 1024)
+            elapsed = time.perf_counter() - started
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            elif "retry-after" in response.headers:
+                retry_after.append(int(response.headers["retry-after"]))
+
+        tasks = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            tasks.append(asyncio.create_task(one()))
+            await asyncio.sleep(random.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    return {"latencies": latencies, "statuses": statuses, "retry_after": retry_after}
+
+
+def report(name: str, result: dict) -> None:
+    lat = result["latencies"]
+    statuses = ", ".join(f"{code}: {n}" for code, n in sorted(result["statuses"].items()))
+    retry = result["retry_after"]
+    print(f"\n{name}")
+    print(f"  responses      {statuses}")
+    print(f"  accepted p50   {percentile(lat, 0.5):.2f}s   p99 {percentile(lat, 0.99):.2f}s   max {max(lat, default=float('nan')):.2f}s")
+    if retry:
+        print(f"  Retry-After    {min(retry)}..{max(retry)}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admission control load test")
+    parser.add_argument("--capacity", type=int, default=8, help="Upstream calls served at full speed")
+    parser.add_argument("--service", type=float, default=0.2, help="Seconds per request at capacity")
+    parser.add_argument("--load", type=float, default=3.0, help="Offered load as a multiple of capacity")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--queue", type=int, default=16)
+    parser.add_argument("--max-wait", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rate = args.load * args.capacity / args.service
+    print(f"⚡ {rate:.0f} req/s offered for {args.duration:.0f}s "
+          f"({args.load:.1f}x capacity of {args.capacity / args.service:.0f} req/s)")
+
+    baseline = asyncio.run(run(upstream_app(args.capacity, args.service), rate, args.duration, args.seed))
+    report("Without admission control", baseline)
+
+    controller = AdmissionController(
+        max_in_flight=args.capacity,
+        max_queue=args.queue,
+        max_wait_seconds=args.max_wait
+    )
+    guarded = AdmissionMiddleware(upstream_app(args.capacity, args.service), controller, paths={"/api/voice"})
+    admitted = asyncio.run(run(guarded, rate, args.duration, args.seed))
+    report("With admission control", admitted)
+
+    stats = controller.stats()["requests"]
+    print(f"  queue wait     p50 {stats['wait_p50_ms']} ms   p95 {stats['wait_p95_ms']} ms   max {stats['wait_max_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
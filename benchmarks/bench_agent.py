@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Agent benchmark: replays a corpus of transcripts through VoiceNotesAgent.
+
+Every transcript has its own cassette in benchmarks/cassettes/<id>.json with the
+recorded OpenAI, GitHub and Google Calendar HTTP traffic. Replay needs no keys
+and no network; recording uses the real services configured in .env.
+
+Requests are matched by their normalised body. When the agent's requests change
+(system prompt, tool schemas, Whisper or chat parameters) the recorded
+responses no longer describe what the service would get: replay still runs,
+but requests that did not match their recording are reported as stale.
+Re-record the affected cassettes then:
+
+    python benchmarks/bench_agent.py --record [--only <id>]
+
+Usage:
+    python benchmarks/bench_agent.py                    # replay with recorded latency
+    python benchmarks/bench_agent.py --latency none     # replay without delays
+    python benchmarks/bench_agent.py --latency 0.2      # simulated 200 ms per call
+    python benchmarks/bench_agent.py --record           # record cassettes (real services!)
+    python benchmarks/bench_agent.py --only todo-simple --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from app.services.agent import VoiceNotesAgent  # noqa: E402
+from app.services.cassette import Cassette, CassetteHttp, CassetteTransport  # noqa: E402
+from app.services.github_vault import GitHubVaultService  # noqa: E402
+from app.services.google_calendar import GoogleCalendarService  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+CORPUS = BENCH_DIR / "agent_corpus.jsonl"
+CASSETTES = BENCH_DIR / "cassettes"
+
+
+def build_agent(cassette: Cassette) -> VoiceNotesAgent:
+    """Собирает агента, все HTTP вызовы которого идут через кассету."""
+    if cassette.mode == "record":
+        from app.config import settings
+
+        meta = {
+            "repo_owner": settings.github_repo_owner,
+            "repo_name": settings.github_repo_name,
+            "branch": settings.github_branch,
+            "calendar_id": settings.google_calendar_id,
+            "timezone": settings.google_calendar_timezone,
+            "calendar": bool(settings.google_calendar_credentials),
+        }
+        cassette.meta = meta
+        cassette.save()
+        api_key, token, credentials = (
+            settings.openai_api_key, settings.github_token, settings.google_calendar_credentials
+        )
+    else:
+        meta = cassette.meta
+        api_key, token, credentials = "sk-replay", "replay", None
+
+    vault = GitHubVaultService(
+        token=token,
+        repo_owner=meta["repo_owner"],
+        repo_name=meta["repo_name"],
+        branch=meta["branch"],
+        transport=CassetteTransport(cassette, "github")
+    )
+    calendar = None
+    if meta.get("calendar"):
+        calendar = GoogleCalendarService(
+            credentials_json=credentials,
+            calendar_id=meta["calendar_id"],
+            timezone=meta["timezone"],
+            http_wrapper=lambda http: CassetteHttp(cassette, "google_calendar", http)
+        )
+    return VoiceNotesAgent(
+        api_key=api_key,
+        vault_service=vault,
+        calendar_service=calendar,
+        http_client=httpx.AsyncClient(transport=CassetteTransport(cassette, "openai"), timeout=600)
+    )
+
+
+def summarize(item: dict, cassette: Cassette, result: dict | None, seconds: float, error: str | None) -> dict:
+    """Метрики одного прогона по событиям кассеты."""
+    llm_turns = prompt_tokens = completion_tokens = 0
+    for event in cassette.events:
+        if event.service == "openai" and event.url.endswith("/chat/completions"):
+            llm_turns += 1
+            usage = (event.json() or {}).get("usage") or {}
+            prompt_tokens += usage.get("prompt_tokens", 0)
+            completion_tokens += usage.get("completion_tokens", 0)
+
+    stats = cassette.stats()
+    tools = [action["function"] for action in (result or {}).get("actions", [])]
+    return {
+        "id": item["id"],
+        "llm_turns": llm_turns,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tool_calls": len(tools),
+        "tools": tools,
+        "expected_tools_ok": sorted(tools) == sorted(item.get("expected", tools)),
+        "github_requests": stats.get("github", {}).get("requests", 0),
+        "calendar_requests": stats.get("google_calendar", {}).get("requests", 0),
+        "wall_seconds": round(seconds, 3),
+        "stale_requests": cassette.stale,
+        "error": error,
+    }
+
+
+async def run_one(item: dict, mode: str, latency: str) -> dict:
+    cassette = Cassette(CASSETTES / f"{item['id']}.json", mode=mode, latency=latency)
+    agent = build_agent(cassette)
+
+    started = time.perf_counter()
+    result = error = None
+    try:
+        result = await agent.process_transcription(item["text"])
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - started
+    return summarize(item, cassette, result, seconds, error)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay benchmark for VoiceNotesAgent")
+    parser.add_argument("--record", action="store_true", help="record cassettes against real services")
+    parser.add_argument("--latency", default="recorded", help="recorded | none | seconds per call")
+    parser.add_argument("--corpus", default=str(CORPUS))
+    parser.add_argument("--only", action="append", help="run only these transcript ids")
+    parser.add_argument("--json", help="write per-transcript results to this file")
+    args = parser.parse_args()
+
+    corpus = [json.loads(line) for line in Path(args.corpus).read_text(encoding="utf-8").splitlines() if line]
+    if args.only:
+        corpus = [item for item in corpus if item["id"] in args.only]
+
+    mode = "record" if args.record else "replay"
+    results = []
+    print(f"{'id':<20} {'turns':>5} {'prompt':>7} {'compl':>6} {'tools':>5} {'gh':>4} {'cal':>4} {'wall s':>7}")
+    for item in corpus:
+        if mode == "replay" and not (CASSETTES / f"{item['id']}.json").exists():
+            print(f"{item['id']:<20} ⏭  no cassette (run with --record first)")
+            continue
+        row = await run_one(item, mode, args.latency)
+        results.append(row)
+        mark = "❌ " + row["error"] if row["error"] else ("" if row["expected_tools_ok"] else "⚠️  tools differ")
+        if row["stale_requests"]:
+            mark += f" ⚠️  {row['stale_requests']} stale requests"
+        print(
+            f"{row['id']:<20} {row['llm_turns']:>5} {row['prompt_tokens']:>7} {row['completion_tokens']:>6} "
+            f"{row['tool_calls']:>5} {row['github_requests']:>4} {row['calendar_requests']:>4} "
+            f"{row['wall_seconds']:>7.2f} {mark}"
+        )
+
+    if results:
+        total = {key: sum(r[key] for r in results) for key in (
+            "llm_turns", "prompt_tokens", "completion_tokens", "tool_calls",
+            "github_requests", "calendar_requests", "wall_seconds"
+        )}
+        print(
+            f"{'TOTAL':<20} {total['llm_turns']:>5} {total['prompt_tokens']:>7} "
+            f"{total['completion_tokens']:>6} {total['tool_calls']:>5} {total['github_requests']:>4} "
+            f"{total['calendar_requests']:>4} {total['wall_seconds']:>7.2f}"
+        )
+        stale = [r["id"] for r in results if r["stale_requests"]]
+        if stale:
+            print(f"\n⚠️  Requests changed since recording: re-record with --record --only {' --only '.join(stale)}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Calendar concurrency check: the event loop keeps serving other work while
+Google Calendar calls are slow.
+
+A fake Calendar backend answers every request after --delay seconds. While
+--calls event inserts are in flight, a heartbeat coroutine ticks every 10 ms
+(standing in for other HTTP requests). The script reports the worst heartbeat
+gap for the old inline .execute() path and for GoogleCalendarService, and
+exits with status 1 if the service blocks the loop.
+
+Usage:
+    python benchmarks/bench_calendar_concurrency.py [--calls 4] [--delay 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httplib2  # noqa: E402
+
+from app.services.google_calendar import GoogleCalendarService  # noqa: E402
+
+TICK = 0.01
+
+
+class SlowCalendarHttp:
+    """httplib2-совместимый фейковый Calendar API с задержкой ответа."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        time.sleep(self.delay)
+        event = {
+            "id": "evt", "summary": "Slow", "htmlLink": "https://calendar.google.com/evt",
+            "start": {"dateTime": "2026-01-20T10:00:00+01:00"},
+            "end": {"dateTime": "2026-01-20T11:00:00+01:00"},
+        }
+        return httplib2.Response({"status": "200"}), json.dumps(event).encode()
+
+
+async def heartbeat(stop: asyncio.Event) -> tuple[int, float]:
+    """Тикает каждые TICK секунд; возвращает число тиков и худший интервал."""
+    ticks, worst = 0, 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(TICK)
+        now = time.perf_counter()
+        worst = max(worst, now - last)
+        last = now
+        ticks += 1
+    return ticks, worst
+
+
+async def measure(label: str, calls) -> float:
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(0)  # даём heartbeat стартовать
+    started = time.perf_counter()
+    await calls()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    ticks, worst = await beat
+    print(f"{label:<32} wall {elapsed:5.2f}s  heartbeats {ticks:4d}  worst gap {worst * 1000:7.1f} ms")
+    return worst
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    service = GoogleCalendarService(
+        credentials_json=None,
+        http_wrapper=lambda http: SlowCalendarHttp(args.delay),
+        max_workers=args.calls
+    )
+    start = datetime(2026, 1, 20, 10, 0)
+
+    async def inline_execute():
+        # Старое поведение: синхронный .execute() прямо в корутине
+        for _ in range(args.calls):
+            service.service.events().insert(calendarId="primary", body={}).execute()
+
+    async def offloaded():
+        await asyncio.gather(*(service.create_event("Slow", start) for _ in range(args.calls)))
+
+    print(f"📅 {args.calls} calendar inserts, {args.delay:.2f}s each\n")
+    await measure("inline .execute() (blocking)", inline_execute)
+    worst = await measure("GoogleCalendarService (pool)", offloaded)
+    service.close()
+
+    ok = worst < max(0.1, args.delay / 2)
+    print("\n✅ event loop stays responsive" if ok else "\n❌ event loop was blocked")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Calendar cold-start benchmark: import cost vs first-call cost.
+
+Each measurement runs in a fresh interpreter so module caches do not leak
+between runs:
+- import: `python -X importtime -c "import app.services.google_calendar"`
+  (and the googleapiclient/google-auth modules it used to import eagerly)
+- construct: GoogleCalendarService(...) — should be near zero now
+- first call: building the API client (credentials + cached discovery document)
+- second call: the already built client
+
+Usage:
+    python benchmarks/bench_calendar_startup.py [--credentials service_account.json] [--runs 3]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+from app.services.google_calendar import GoogleCalendarService
+t1 = time.perf_counter()
+credentials = json.load(open({credentials!r})) if {credentials!r} else None
+wrapper = None if credentials else (lambda http: object())
+service = GoogleCalendarService(credentials_json=credentials, http_wrapper=wrapper)
+t2 = time.perf_counter()
+service.service
+t3 = time.perf_counter()
+service.service
+t4 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "construct": t2 - t1, "first_call": t3 - t2, "second_call": t4 - t3}}))
+"""
+
+
+def importtime(module: str) -> float:
+    """Суммарное время импорта модуля (мс) по -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    # Последняя строка — сам модуль, cumulative включает все зависимости
+    last = [line for line in result.stderr.splitlines() if line.startswith("import time:")][-1]
+    return int(last.split("|")[1]) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calendar cold-start benchmark")
+    parser.add_argument("--credentials", default="", help="service account JSON (optional)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print("📦 Import time (cumulative, fresh interpreter):")
+    for module in ("app.services.google_calendar", "googleapiclient.discovery", "google.oauth2.service_account"):
+        times = [importtime(module) for _ in range(args.runs)]
+        print(f"   {module:<34} {statistics.median(times):8.1f} ms")
+
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD.format(root=str(ROOT), credentials=args.credentials)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        samples.append(json.loads(out))
+
+    print("\n⏱  GoogleCalendarService phases (median):")
+    for phase in ("import", "construct", "first_call", "second_call"):
+        value = statistics.median(sample[phase] for sample in samples) * 1000
+        print(f"   {phase:<34} {value:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
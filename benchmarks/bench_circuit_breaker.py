@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Voice notes during a GitHub outage, with and without circuit breakers.
+
+Runs --notes notes one after another through VoiceNotesAgent and a real
+GitHubVaultService against in-process stand-ins: OpenAI answers with a
+scripted turn (create_note + add_todo_task, then a summary), GitHub times
+out after --timeout-ms on every request (a degraded API, the client waiting
+out its timeout).
+
+- without breakers every note waits the timeout and fails;
+- with breakers the first notes fail until the failure rate trips the
+  GitHub breaker, after that notes finish at once and the writes go to the
+  vault journal. GitHub then recovers, and after --open-seconds the journal
+  is replayed into the vault.
+
+Reports per-note latency (p50/max), total time, GitHub requests sent and
+how the notes ended (done / failed / journaled).
+
+Usage:
+    python benchmarks/bench_circuit_breaker.py [--notes 20] [--timeout-ms 500] [--open-seconds 1]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from app.services.agent import VoiceNotesAgent  # noqa: E402
+from app.services.circuit_breaker import CircuitBreaker  # noqa: E402
+from app.services.github_vault import GitHubVaultService  # noqa: E402
+from app.services.write_journal import WriteJournal  # noqa: E402
+
+
+class Upstream:
+    """OpenAI со сценарием агента и GitHub, который не отвечает, пока down."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.down = True
+        self.files: dict[str, str] = {}
+        self.github_requests = 0
+        self.completions = 0
+
+    async def openai(self, request: httpx.Request) -> httpx.Response:
+        self.completions += 1
+        body = json.loads(request.content)
+        if body["messages"][-1]["role"] == "tool":
+            message = {"role": "assistant", "content": "Готово."}
+        else:
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_1", "type": "function", "function": {"name": "create_note", "arguments": json.dumps(
+                    {"title": f"Идея {self.completions}", "content": "Идея бота", "folder": "Ideas"},
+                    ensure_ascii=False)}},
+                {"id": "call_2", "type": "function", "function": {"name": "add_todo_task", "arguments": json.dumps(
+                    {"task": f"Купить молоко {self.completions}"}, ensure_ascii=False)}},
+            ]}
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{self.completions}", "object": "chat.completion", "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": 1500, "completion_tokens": 60, "total_tokens": 1560},
+        })
+
+    async def github(self, request: httpx.Request) -> httpx.Response:
+        self.github_requests += 1
+        if self.down:
+            await asyncio.sleep(self.timeout)
+            raise httpx.ReadTimeout("timed out", request=request)
+        path = request.url.path.split("/contents/", 1)[-1]
+        if request.method == "GET":
+            if path not in self.files:
+                return httpx.Response(404, json={"message": "Not Found"})
+            content = base64.b64encode(self.files[path].encode()).decode()
+            return httpx.Response(200, json={"sha": str(hash(self.files[path])), "content": content})
+        content = base64.b64decode(json.loads(request.content)["content"]).decode()
+        self.files[path] = content
+        return httpx.Response(201, json={"content": {"sha": str(hash(content))}})
+
+
+async def run(args, with_breaker: bool, journal_dir: Path) -> dict:
+    upstream = Upstream(args.timeout_ms / 1000)
+    breaker = CircuitBreaker(
+        "github", min_calls=args.min_calls, open_seconds=args.open_seconds
+    ) if with_breaker else None
+    vault = GitHubVaultService(
+        token="bench", repo_owner="bench", repo_name="vault",
+        transport=httpx.MockTransport(upstream.github), breaker=breaker
+    )
+    journal = WriteJournal(journal_dir / f"journal-{with_breaker}.jsonl", vault) if with_breaker else None
+    agent = VoiceNotesAgent(
+        api_key="sk-bench", vault_service=vault, journal=journal,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(upstream.openai))
+    )
+    await asyncio.to_thread(lambda: agent.client)
+
+    latencies, outcomes = [], {"done": 0, "failed": 0, "journaled": 0}
+    started = time.perf_counter()
+    for _ in range(args.notes):
+        note_started = time.perf_counter()
+        try:
+            result = await agent.process_transcription("Запиши идею и добавь задачу купить молоко")
+            journaled = any("журнал" in action["result"] for action in result["actions"])
+            outcomes["journaled" if journaled else "done"] += 1
+        except Exception:
+            outcomes["failed"] += 1
+        latencies.append(time.perf_counter() - note_started)
+    total = time.perf_counter() - started
+
+    replayed = None
+    if journal is not None:
+        upstream.down = False
+        await asyncio.sleep(args.open_seconds)
+        replayed = await journal.replay()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "total_s": total,
+        "github_requests": upstream.github_requests,
+        "outcomes": outcomes,
+        "replayed": replayed,
+        "vault_files": len(upstream.files),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice notes during a GitHub outage, with and without circuit breakers")
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--timeout-ms", type=float, default=500.0, help="how long each GitHub request hangs")
+    parser.add_argument("--min-calls", type=int, default=5, help="breaker: calls in the window before it may open")
+    parser.add_argument("--open-seconds", type=float, default=1.0, help="breaker: rejection period before a trial")
+    args = parser.parse_args()
+    # Журналирование каждой записи и переходы breaker — в логе сервиса, здесь только таблица
+    logging.basicConfig(level=logging.ERROR)
+
+    print(f"🔥 GitHub down (every request times out after {args.timeout_ms:.0f} ms), {args.notes} notes in a row")
+    print(f"{'setup':<18} {'p50 ms':>8} {'max ms':>8} {'total s':>8} {'GitHub req':>10}  outcomes")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, with_breaker in (("no breaker", False), ("circuit breaker", True)):
+            r = asyncio.run(run(args, with_breaker, Path(tmp)))
+            outcomes = ", ".join(f"{k} {v}" for k, v in r["outcomes"].items())
+            print(f"{label:<18} {r['p50_ms']:>8.1f} {r['max_ms']:>8.1f} {r['total_s']:>8.2f} "
+                  f"{r['github_requests']:>10}  {outcomes}")
+            if r["replayed"] is not None:
+                print(f"{'':<18} 🔁 after recovery: {r['replayed']} journaled writes replayed, "
+                      f"{r['vault_files']} files in the vault")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Date parser benchmark: accuracy against labelled fixtures and parse latency.
+
+Fixtures are resolved against a fixed "now" (Wednesday 2026-01-14 12:00,
+Europe/Berlin) so relative dates are deterministic. Latency is measured for
+single phrases (parse_date, as create_calendar_event uses it) and for a
+whole-transcript pre-scan (find_dates). A fixture with "leftover" expects the
+parse to be partial (create_calendar_event rejects it); "start": null expects
+no date at all.
+
+Usage:
+    python benchmarks/bench_date_parser.py [fixtures.jsonl]
+"""
+
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.date_parser import find_dates, parse_date  # noqa: E402
+
+FIXTURES = Path(__file__).with_name("date_parser_fixtures.jsonl")
+NOW = datetime(2026, 1, 14, 12, 0, tzinfo=ZoneInfo("Europe/Berlin"))  # среда
+
+TRANSCRIPT = (
+    "Так, значит завтра в 10 созвон с командой по проекту Альфа, потом в 3 часа дня "
+    "встреча с клиентом в офисе. Не забыть оплатить интернет до 25 декабря и купить "
+    "2 пакета молока. В следующий вторник с 14:00 до 15:30 ревью дизайна, а с 3 по 5 "
+    "февраля я в отпуске. Идея: сделать бота, который через пару дней напоминает о задачах. "
+)
+
+
+def check(parsed, expected: dict) -> bool:
+    """Совпадает ли разбор с разметкой."""
+    if expected["start"] is None:
+        return parsed is None
+    if parsed is None or parsed.start.strftime("%Y-%m-%d %H:%M") != expected["start"]:
+        return False
+    end = parsed.end.strftime("%Y-%m-%d %H:%M") if parsed.end else None
+    if end != expected.get("end"):
+        return False
+    if list(parsed.leftover) != expected.get("leftover", []):
+        return False
+    return "has_time" not in expected or parsed.has_time == expected["has_time"]
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else FIXTURES
+    fixtures = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line]
+
+    wrong = 0
+    print(f"📋 {len(fixtures)} fixtures from {path.name}\n")
+    for fixture in fixtures:
+        parsed = parse_date(fixture["text"], NOW, for_day=fixture.get("for_day", False))
+        ok = check(parsed, fixture)
+        wrong += not ok
+        shown = (
+            f"{parsed.start:%Y-%m-%d %H:%M}{' – ' + format(parsed.end, '%m-%d %H:%M') if parsed.end else ''}"
+            f" ({parsed.confidence:.2f})" if parsed else "—"
+        )
+        print(f"{'✅' if ok else '❌'} {fixture['text'][:44]:<44} {shown}")
+        if not ok:
+            print(f"     expected: {fixture['start']} {fixture.get('end') or ''}")
+
+    rounds = 2000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for fixture in fixtures:
+            parse_date(fixture["text"], NOW, for_day=fixture.get("for_day", False))
+    per_phrase_us = (time.perf_counter() - started) / (rounds * len(fixtures)) * 1e6
+
+    transcript = TRANSCRIPT * 10
+    started = time.perf_counter()
+    for _ in range(200):
+        found = find_dates(transcript, NOW)
+    per_scan_us = (time.perf_counter() - started) / 200 * 1e6
+
+    print(f"\nAccuracy:        {len(fixtures) - wrong}/{len(fixtures)}")
+    print(f"parse_date:      {per_phrase_us:.1f} µs per phrase")
+    print(f"find_dates:      {per_scan_us:.0f} µs per {len(transcript)}-char transcript "
+          f"({len(found)} expressions, {len(transcript) / per_scan_us:.1f} chars/µs)")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
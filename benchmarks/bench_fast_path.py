@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Fast path benchmark: accuracy against labelled fixtures and classifier latency.
+
+Usage:
+    python benchmarks/bench_fast_path.py [fixtures.jsonl]
+"""
+
+import json
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.fast_path import FastPath  # noqa: E402
+
+FIXTURES = Path(__file__).with_name("fast_path_fixtures.jsonl")
+TODAY = date(2026, 1, 14)  # среда — фиксируем, чтобы относительные даты были детерминированы
+
+
+def check(decision, expected: dict) -> bool:
+    """Совпадает ли решение fast path с разметкой."""
+    if decision.function != expected["function"]:
+        return False
+    args = decision.arguments
+    if "task" in expected and args.get("task") != expected["task"]:
+        return False
+    if "priority" in expected and args.get("priority") != expected["priority"]:
+        return False
+    if "folder" in expected and args.get("folder") != expected["folder"]:
+        return False
+    if "due_in_days" in expected:
+        return args.get("due_date") == (TODAY + timedelta(days=expected["due_in_days"])).isoformat()
+    return True
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else FIXTURES
+    fixtures = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line]
+
+    fast_path = FastPath(vault=None)
+    hits = correct_hits = wrong = 0
+
+    print(f"📋 {len(fixtures)} fixtures from {path.name}\n")
+    for fixture in fixtures:
+        decision = fast_path.classify(fixture["text"], today=TODAY)
+        taken = decision.function is not None and decision.confidence >= fast_path.min_confidence
+        if not taken:
+            # Промах fast path: заметка уходит в LLM — ошибкой это не считается,
+            # если разметка тоже ждала LLM
+            decision.function = None
+        ok = check(decision, fixture)
+        hits += taken
+        correct_hits += taken and ok
+        wrong += not ok
+        mark = "✅" if ok else "❌"
+        print(f"{mark} {'FAST' if taken else 'LLM ':4} {decision.reason:<16} {fixture['text'][:60]}")
+        if not ok:
+            print(f"     got: {decision.function} {decision.arguments}")
+
+    rounds = 2000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for fixture in fixtures:
+            fast_path.classify(fixture["text"], today=TODAY)
+    per_call_us = (time.perf_counter() - started) / (rounds * len(fixtures)) * 1e6
+
+    print(f"\nHit rate:        {hits}/{len(fixtures)} ({hits / len(fixtures):.0%})")
+    print(f"Hit precision:   {correct_hits}/{hits}" if hits else "Hit precision:   n/a")
+    print(f"Accuracy:        {len(fixtures) - wrong}/{len(fixtures)}")
+    print(f"Classify time:   {per_call_us:.1f} µs per note")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
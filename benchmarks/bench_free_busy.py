@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Free/busy lookup benchmark: interval tree vs linear scan.
+
+Generates a synthetic calendar (N events spread over a year, durations
+from 15 minutes to two days) and times overlap queries for random
+one-hour windows — the query create_calendar_event makes before inserting.
+
+Usage:
+    python benchmarks/bench_free_busy.py [--sizes 3000,30000,300000] [--queries 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.free_busy import BusyInterval, IntervalTree  # noqa: E402
+
+YEAR_MINUTES = 365 * 24 * 60
+DURATIONS = [15, 30, 60, 60, 90, 120, 24 * 60, 48 * 60]
+
+
+def synthetic_calendar(size: int, start: datetime) -> list[BusyInterval]:
+    events = []
+    for _ in range(size):
+        begin = start + timedelta(minutes=random.randrange(YEAR_MINUTES))
+        events.append(BusyInterval(begin, begin + timedelta(minutes=random.choice(DURATIONS))))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Free/busy lookup benchmark")
+    parser.add_argument("--sizes", default="3000,30000,300000")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    windows = []
+    for _ in range(args.queries):
+        begin = start + timedelta(minutes=random.randrange(YEAR_MINUTES))
+        windows.append((begin, begin + timedelta(hours=1)))
+
+    print(f"{'events':>8} {'build ms':>10} {'tree µs/q':>10} {'scan µs/q':>10} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        events = synthetic_calendar(size, start)
+
+        t0 = time.perf_counter()
+        tree = IntervalTree(events)
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        hits = sum(len(tree.overlapping(a, b)) for a, b in windows)
+        tree_us = (time.perf_counter() - t0) / len(windows) * 1e6
+
+        scan_windows = windows[: max(20, len(windows) * 3000 // size)]
+        t0 = time.perf_counter()
+        for a, b in scan_windows:
+            [e for e in events if e.start < b and e.end > a]
+        scan_us = (time.perf_counter() - t0) / len(scan_windows) * 1e6
+
+        print(f"{size:>8} {build * 1000:>10.1f} {tree_us:>10.1f} {scan_us:>10.1f} {scan_us / tree_us:>7.0f}x"
+              f"   ({hits / len(windows):.1f} conflicts/query)")
+
+
+if __name__ == "__main__":
+    main()
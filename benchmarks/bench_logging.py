@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Logging throughput with verbose (DEBUG) logging on, as seen from the event loop.
+
+Compares the old setup (StreamHandler formatting and writing in the calling
+coroutine) with the queue-based pipeline from app.services.log_pipeline (JSON
+and text), on a fast sink (a file) and a slow one (--slow-sink-us per write,
+like stderr piped into a busy log shipper). Reports the time each logging
+call holds the loop (p50/p99/max), records per second on the caller side,
+time to drain the queue, and records dropped on a full queue.
+
+Also measures what a disabled debug line costs: f-string vs %-arguments.
+
+Usage:
+    python benchmarks/bench_logging.py [--records 20000] [--slow-sink-us 200]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.log_pipeline import TEXT_FORMAT, configure_logging, set_request_id  # noqa: E402
+from app.services.metrics import LOG_DROPPED  # noqa: E402
+
+OLD_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+logger = logging.getLogger("bench")
+
+
+class SlowStream:
+    """Поток, каждая запись в который занимает delay секунд (медленный pipe)."""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def reset_root() -> logging.Logger:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    return root
+
+
+async def produce(records: int) -> list[float]:
+    """Логирует records строк из корутины; время каждого вызова в секундах."""
+    set_request_id("bench-request")
+    calls = []
+    actions = [{"function": "create_note", "arguments": {"title": "Идея", "folder": "Ideas"}}]
+    for i in range(records):
+        started = time.perf_counter()
+        if i % 50 == 0:
+            logger.info("✅ Calendar event created: '%s' at %s", "Встреча", "2026-10-20T10:00:00+02:00",
+                        extra={"event_id": f"evt{i}", "calendar_id": "primary"})
+        else:
+            logger.debug("Agent iteration %d: %d tool calls %s (tokens %d)", i % 5, len(actions), actions, 1500 + i)
+        calls.append(time.perf_counter() - started)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    return calls
+
+
+def run_case(name: str, mode: str, records: int, sink_delay: float, log_dir: Path) -> dict:
+    path = log_dir / f"{name.replace(' ', '-')}.log"
+    stream = SlowStream(open(path, "w", encoding="utf-8"), sink_delay)
+    listener = None
+    root = reset_root()
+    root.setLevel(logging.DEBUG)
+    if mode == "sync":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(OLD_FORMAT))
+        root.addHandler(handler)
+    else:
+        listener = configure_logging("DEBUG", mode, stream=stream)
+    dropped_before = LOG_DROPPED.value()
+
+    started = time.perf_counter()
+    calls = asyncio.run(produce(records))
+    caller = time.perf_counter() - started
+    if listener is not None:
+        listener.stop()
+    total = time.perf_counter() - started
+    reset_root()
+    stream.stream.close()
+
+    calls.sort()
+    return {
+        "name": name,
+        "p50_us": calls[len(calls) // 2] * 1e6,
+        "p99_us": calls[int(len(calls) * 0.99)] * 1e6,
+        "max_ms": calls[-1] * 1000,
+        "rate": records / caller,
+        "drain_s": total - caller,
+        "dropped": int(LOG_DROPPED.value() - dropped_before),
+    }
+
+
+def disabled_cost(n: int = 200_000) -> tuple[float, float]:
+    """Стоимость выключенной debug строки (нс на вызов): f-string и %-аргументы."""
+    reset_root()
+    logging.getLogger().setLevel(logging.INFO)
+    payload = {"actions": [{"function": "create_note", "arguments": {"title": "Идея"}}] * 3}
+
+    started = time.perf_counter()
+    for i in range(n):
+        logger.debug(f"Agent state {i}: {payload}")
+    eager = (time.perf_counter() - started) / n * 1e9
+
+    started = time.perf_counter()
+    for i in range(n):
+        logger.debug("Agent state %d: %s", i, payload)
+    lazy = (time.perf_counter() - started) / n * 1e9
+    return eager, lazy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging throughput with DEBUG on: sync handler vs queue pipeline")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--slow-sink-us", type=float, default=200.0, help="delay per write of the slow sink")
+    args = parser.parse_args()
+
+    print(f"📝 {args.records} records at DEBUG, logged from a coroutine")
+    print(f"{'setup':<28} {'p50 µs':>8} {'p99 µs':>8} {'max ms':>8} {'rec/s':>10} {'drain s':>8} {'dropped':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sink, delay in (("file", 0.0), (f"slow sink {args.slow_sink_us:.0f}µs", args.slow_sink_us / 1e6)):
+            for label, mode in (("sync handler", "sync"), ("queue + json", "json"), ("queue + text", "text")):
+                r = run_case(f"{label}, {sink}", mode, args.records, delay, Path(tmp))
+                print(
+                    f"{r['name']:<28} {r['p50_us']:>8.1f} {r['p99_us']:>8.1f} {r['max_ms']:>8.2f} "
+                    f"{r['rate']:>10.0f} {r['drain_s']:>8.2f} {r['dropped']:>8}"
+                )
+
+    eager, lazy = disabled_cost()
+    print(f"\n🔇 disabled debug line: f-string {eager:.0f} ns/call, %-args {lazy:.0f} ns/call")
+    print(f"(text format of the pipeline: {TEXT_FORMAT})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Metrics recording overhead on the hot path.
+
+Times the operations the request path performs per event — counter
+increments, histogram observations, the histogram timer context manager,
+the in-flight gauge — plus rendering /metrics, and compares a typical
+request's total recording cost with the latency it measures.
+
+Usage:
+    python benchmarks/bench_metrics.py [--iterations 200000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.metrics import Registry  # noqa: E402
+
+# Сколько записей метрик делает один запрос через агента:
+# 5 стадий, 3 итерации LLM (+ 2 счётчика токенов каждая), 4 tools (+ memo),
+# 6 запросов к GitHub, 2 к Calendar, gauge in-flight
+EVENTS_PER_REQUEST = {"observe": 5 + 3 + 4 + 6 + 2, "inc": 3 * 2 + 4, "timer": 4, "gauge": 2}
+
+
+def per_call_ns(fn, iterations: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics recording overhead")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    registry = Registry()
+    counter = registry.counter("bench_total", "bench", ("model", "kind"))
+    histogram = registry.histogram("bench_seconds", "bench", ("operation", "status"))
+    gauge = registry.gauge("bench_in_flight", "bench", ("endpoint",))
+
+    def timer():
+        with histogram.time(operation="get_contents"):
+            pass
+
+    def track():
+        with gauge.track(endpoint="voice"):
+            pass
+
+    def baseline():
+        pass
+
+    results = {
+        "baseline (empty call)": per_call_ns(baseline, n),
+        "counter.inc": per_call_ns(lambda: counter.inc(120, model="gpt-4o-mini", kind="prompt"), n),
+        "histogram.observe": per_call_ns(lambda: histogram.observe(0.137, operation="get_contents", status="2xx"), n),
+        "histogram.time()": per_call_ns(timer, n),
+        "gauge.track()": per_call_ns(track, n),
+    }
+    print(f"{'operation':<24} {'ns/call':>10}")
+    for name, ns in results.items():
+        print(f"{name:<24} {ns:>10.0f}")
+
+    per_request_us = (
+        EVENTS_PER_REQUEST["observe"] * results["histogram.observe"]
+        + EVENTS_PER_REQUEST["inc"] * results["counter.inc"]
+        + EVENTS_PER_REQUEST["timer"] * results["histogram.time()"]
+        + EVENTS_PER_REQUEST["gauge"] * results["gauge.track()"]
+    ) / 1000
+    print(f"\n⏱️  ~{per_request_us:.0f} µs of metrics per agent request "
+          f"({per_request_us / 3e6 * 100:.4f}% of a 3 s request)")
+
+    # Страница /metrics при ограниченной кардинальности: 100 серий на каждую метрику
+    big = Registry()
+    for i in range(10):
+        h = big.histogram(f"bench_{i}_seconds", "bench", ("operation", "status"))
+        for j in range(200):  # половина уйдёт в серию "other"
+            h.observe(0.1, operation=f"op{j}", status="2xx")
+    started = time.perf_counter()
+    page = big.render()
+    render_ms = (time.perf_counter() - started) * 1000
+    print(f"📄 /metrics render: {render_ms:.1f} ms for {page.count(chr(10))} lines "
+          f"(10 histograms x {len(big._metrics[0]._series)} series max)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+System prompt variants: cacheable prefix size, layout stability, latency and accuracy.
+
+Offline part (default): for every AGENT_PROMPT_VARIANT, the estimated tokens of
+the static prefix (system prompt + tool schemas) that the provider can serve
+from its prompt cache, and a check that two requests with different dates and
+transcripts share that prefix byte for byte.
+
+Live part (--live, needs OPENAI_API_KEY, costs a few cents): runs the agent
+corpus through every variant against an in-memory vault, --repeat times so the
+later passes hit a warm prompt cache, and reports accuracy (expected tools),
+wall time, prompt/cached tokens and cost.
+
+Usage:
+    python benchmarks/bench_prompt.py
+    python benchmarks/bench_prompt.py --live [--repeat 2] [--model gpt-4o-mini]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.agent import AGENT_TOOLS, SYSTEM_PROMPTS, VoiceNotesAgent, prompt_fingerprint, user_message  # noqa: E402
+from app.services.github_vault import FileInfo  # noqa: E402
+from app.services.model_router import ModelRouter  # noqa: E402
+from app.services.result_governor import estimate_tokens  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "agent_corpus.jsonl"
+
+# Заметки, которые ищут append / read из корпуса
+SEED_NOTES = {
+    "Ideas/2026-02-05-Экипировка для яхтинга.md": "# Экипировка для яхтинга\n\n- Куртка\n- Ботинки\n",
+    "Ideas/2026-01-20-Идея подарка для мамы.md": "# Идея подарка для мамы\n\nАбонемент на йогу.\n",
+}
+
+# Минимальный префикс, который провайдер кэширует
+CACHE_MIN_TOKENS = 1024
+
+
+class MemoryVault:
+    """Vault в памяти: tools работают как с GitHub, но ничего не пишут наружу."""
+
+    def __init__(self, files: dict[str, str]):
+        self.files = dict(files)
+
+    async def get_file(self, path: str) -> FileInfo | None:
+        content = self.files.get(path)
+        return FileInfo(path=path, sha=str(hash(content)), content=content) if content is not None else None
+
+    async def create_file(self, path: str, content: str, commit_message: str) -> FileInfo:
+        if path in self.files:
+            raise Exception(f"Файл уже существует: {path}")
+        self.files[path] = content
+        return FileInfo(path=path, sha=str(hash(content)), content=content)
+
+    async def update_file(self, path: str, content: str, sha: str, commit_message: str) -> FileInfo:
+        self.files[path] = content
+        return FileInfo(path=path, sha=str(hash(content)), content=content)
+
+    async def create_or_update_file(self, path: str, content: str, commit_message: str) -> FileInfo:
+        return await self.update_file(path, content, "", commit_message)
+
+    async def list_folder(self, folder_path: str) -> list[str]:
+        prefix = folder_path.rstrip("/") + "/"
+        return [p[len(prefix):] for p in self.files if p.startswith(prefix) and "/" not in p[len(prefix):]]
+
+
+def offline_report() -> None:
+    tools_tokens = estimate_tokens(json.dumps(AGENT_TOOLS, ensure_ascii=False))
+    now = datetime.now(ZoneInfo("Europe/Berlin"))
+    print(f"{'variant':<10} {'prompt tok':>10} {'tools tok':>9} {'prefix tok':>10} {'cacheable':>9} {'stable':>6}  fingerprint")
+    for variant, prompt in SYSTEM_PROMPTS.items():
+        prompt_tokens = estimate_tokens(prompt)
+        prefix = prompt_tokens + tools_tokens
+        # Два разных запроса: отличаться должно только сообщение пользователя
+        first = [{"role": "system", "content": prompt}, {"role": "user", "content": user_message("Купить молоко", now)}]
+        second = [{"role": "system", "content": prompt},
+                  {"role": "user", "content": user_message("Встреча завтра в 10", now + timedelta(days=3))}]
+        stable = first[0] == second[0] and first[1] != second[1]
+        print(
+            f"{variant:<10} {prompt_tokens:>10} {tools_tokens:>9} {prefix:>10} "
+            f"{'✅' if prefix >= CACHE_MIN_TOKENS else '❌':>9} {'✅' if stable else '❌':>6}  {prompt_fingerprint(prompt)}"
+        )
+    print(f"\n(tokens estimated at ~4 chars/token; the provider caches prefixes of {CACHE_MIN_TOKENS}+ tokens)")
+
+
+async def run_variant(variant: str, corpus: list[dict], model: str, api_key: str) -> list[dict]:
+    router = ModelRouter(fast_model=model, strong_model=model)
+    rows = []
+    for item in corpus:
+        agent = VoiceNotesAgent(
+            api_key=api_key, vault_service=MemoryVault(SEED_NOTES), router=router, prompt_variant=variant
+        )
+        started = time.perf_counter()
+        try:
+            result = await agent.process_transcription(item["text"])
+            error = None
+        except Exception as e:
+            result, error = {"actions": [], "usage": {}}, f"{type(e).__name__}: {e}"
+        tools = [action["function"] for action in result["actions"]]
+        usage = result["usage"]
+        rows.append({
+            "id": item["id"],
+            "ok": error is None and sorted(tools) == sorted(item["expected"]),
+            "seconds": time.perf_counter() - started,
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "cached_tokens": usage.get("cached_tokens", 0),
+            "cost_usd": usage.get("cost_usd", 0.0),
+            "error": error,
+        })
+    return rows
+
+
+async def live_report(args) -> None:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        sys.exit("OPENAI_API_KEY is not set")
+    corpus = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line]
+
+    print(f"\n🔴 live: {len(corpus)} transcripts x {args.repeat} passes on {args.model}")
+    print(f"{'variant':<10} {'pass':>4} {'accuracy':>9} {'p50 s':>6} {'mean s':>7} {'prompt':>8} {'cached':>7} {'cost $':>8}")
+    for variant in SYSTEM_PROMPTS:
+        for n in range(1, args.repeat + 1):
+            rows = await run_variant(variant, corpus, args.model, api_key)
+            seconds = sorted(r["seconds"] for r in rows)
+            prompt = sum(r["prompt_tokens"] for r in rows)
+            cached = sum(r["cached_tokens"] for r in rows)
+            print(
+                f"{variant:<10} {n:>4} {sum(r['ok'] for r in rows):>4}/{len(rows):<4} "
+                f"{seconds[len(seconds) // 2]:>6.2f} {sum(seconds) / len(seconds):>7.2f} "
+                f"{prompt:>8} {cached / prompt if prompt else 0:>7.0%} {sum(r['cost_usd'] for r in rows):>8.4f}"
+            )
+            for r in rows:
+                if not r["ok"]:
+                    print(f"{'':<10} ⚠️  {r['id']}: {r['error'] or 'tools differ'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="System prompt variants: prefix caching, latency, accuracy")
+    parser.add_argument("--live", action="store_true", help="run the corpus against the OpenAI API")
+    parser.add_argument("--repeat", type=int, default=2, help="passes per variant (later passes hit the cache)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    offline_report()
+    if args.live:
+        asyncio.run(live_report(args))
+
+
+if __name__ == "__main__":
+    main()
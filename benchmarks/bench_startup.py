@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Service cold start: import breakdown of app.main and time to the first 200.
+
+Each measurement runs in a fresh interpreter, from a scratch working
+directory (no .env, throwaway data/), with placeholder credentials:
+
+- import: `python -X importtime -c "import app.main"` — total and the
+  self time of the modules per top-level package, and whether openai /
+  googleapiclient were imported at all;
+- first 200: `uvicorn app.main:app` is spawned and GET /api/health polled
+  until it answers 200 — what a scale-to-zero host puts in front of the
+  first request.
+
+Results are appended to --history (JSONL, with the git commit), and the
+last run is compared with the previous entry, so cold start is tracked
+over time.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 3] [--history benchmarks/startup_history.jsonl] [--no-record]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HISTORY = Path(__file__).resolve().parent / "startup_history.jsonl"
+WATCHED = ("openai", "googleapiclient", "httpx", "fastapi", "pydantic", "app")
+
+
+def child_env() -> dict:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    for key, value in {"OPENAI_API_KEY": "sk-startup", "GITHUB_TOKEN": "startup",
+                       "GITHUB_REPO_OWNER": "startup", "GITHUB_REPO_NAME": "vault"}.items():
+        env.setdefault(key, value)
+    return env
+
+
+def import_breakdown(cwd: str) -> dict:
+    """-X importtime для app.main: общее время и собственное время модулей по пакетам (мс)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=cwd, env=child_env(), capture_output=True, text=True, check=True
+    )
+    packages: dict[str, float] = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # заголовок таблицы
+        name = name.strip()
+        if name == "app.main":
+            total = int(cumulative) / 1000
+        # Собственное время модуля — в его пакет верхнего уровня: суммы не пересекаются
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(own.split(":")[1]) / 1000
+    return {
+        "total_ms": total,
+        "packages": dict(sorted(packages.items(), key=lambda item: -item[1])),
+        "imported": {name: name in packages for name in ("openai", "googleapiclient")},
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_200(cwd: str, timeout: float = 30.0) -> float:
+    """Секунды от запуска uvicorn до первого 200 на /api/health."""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=cwd, env=child_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                sys.exit(f"uvicorn exited with {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        sys.exit(f"no 200 from /api/health within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def git_commit() -> str | None:
+    result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start: app.main import breakdown and time to first 200")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--history", default=str(HISTORY), help="JSONL file the results are appended to")
+    parser.add_argument("--no-record", action="store_true", help="do not append to the history")
+    args = parser.parse_args()
+
+    imports, first = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as cwd:
+            imports.append(import_breakdown(cwd))
+        with tempfile.TemporaryDirectory() as cwd:
+            first.append(time_to_first_200(cwd))
+
+    import_ms = statistics.median(run["total_ms"] for run in imports)
+    first_ms = statistics.median(first) * 1000
+    packages = imports[-1]["packages"]
+    print(f"🐍 import app.main: {import_ms:.0f} ms (median of {args.runs})")
+    for name, ms in list(packages.items())[:10]:
+        print(f"   {name:<24} {ms:>8.1f} ms")
+    for name, loaded in imports[-1]["imported"].items():
+        print(f"   {name:<24} {'imported at startup' if loaded else 'deferred'}")
+    print(f"🚀 spawn -> first 200 on /api/health: {first_ms:.0f} ms (median of {args.runs})")
+
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "import_ms": round(import_ms, 1),
+        "first_200_ms": round(first_ms, 1),
+        "packages_ms": {name: round(ms, 1) for name, ms in packages.items() if name in WATCHED},
+        "imported": imports[-1]["imported"],
+    }
+    history = Path(args.history)
+    previous = None
+    if history.exists():
+        lines = [line for line in history.read_text(encoding="utf-8").splitlines() if line]
+        previous = json.loads(lines[-1]) if lines else None
+    if previous:
+        print(
+            f"📈 vs {previous['commit']} ({previous['ts']}): import {previous['import_ms']:.0f} -> {import_ms:.0f} ms, "
+            f"first 200 {previous['first_200_ms']:.0f} -> {first_ms:.0f} ms"
+        )
+    if not args.no_record:
+        with open(history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"💾 appended to {history}")
+
+
+if __name__ == "__main__":
+    main()
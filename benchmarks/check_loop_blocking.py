@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Event loop blocking check: a scripted pipeline run under the loop watchdog.
+
+Runs several voice notes concurrently through the real service code — temp
+file write, WhisperTranscriber, VoiceNotesAgent with its tools, GitHubVaultService —
+against in-process stand-ins for the OpenAI and GitHub APIs (httpx.MockTransport
+with a small network delay). LoopWatchdog watches the loop the whole time;
+any stall longer than --threshold-ms is printed with the stack of the
+coroutine that held the loop, and the script exits with status 1.
+
+Run it after touching anything on the request path: a sync open(), .execute()
+or time.sleep() that slips into async code fails the check.
+--inject-block-ms adds a blocking call to the GitHub stand-in to confirm the
+check catches it.
+
+Usage:
+    python benchmarks/check_loop_blocking.py [--notes 8] [--threshold-ms 100]
+    python benchmarks/check_loop_blocking.py --inject-block-ms 300   # must fail
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from app.services.agent import VoiceNotesAgent  # noqa: E402
+from app.services.github_vault import GitHubVaultService  # noqa: E402
+from app.services.loop_watchdog import LoopWatchdog  # noqa: E402
+from app.services.transcriber import WhisperTranscriber  # noqa: E402
+
+TRANSCRIPT = "Запиши идею: сделать бота для заметок. И добавь задачу купить молоко."
+
+
+class Upstream:
+    """OpenAI и GitHub в процессе: фиксированный сценарий агента и vault в памяти."""
+
+    def __init__(self, latency: float, inject_block: float):
+        self.latency = latency
+        self.inject_block = inject_block
+        self.files: dict[str, str] = {}
+        self.requests = 0
+
+    async def openai(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        number = self.requests
+        await asyncio.sleep(self.latency)
+        if request.url.path.endswith("/audio/transcriptions"):
+            return httpx.Response(200, json={"task": "transcribe", "language": "russian", "duration": 4.2,
+                                             "text": TRANSCRIPT})
+        body = json.loads(request.content)
+        if body["messages"][-1]["role"] == "tool":
+            message = {"role": "assistant", "content": "Создал заметку и добавил задачу."}
+        else:
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_1", "type": "function", "function": {"name": "create_note", "arguments": json.dumps(
+                    {"title": f"Бот для заметок {number}", "content": "Идея бота", "folder": "Ideas"},
+                    ensure_ascii=False)}},
+                {"id": "call_2", "type": "function", "function": {"name": "add_todo_task", "arguments": json.dumps(
+                    {"task": "Купить молоко"}, ensure_ascii=False)}},
+            ]}
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{self.requests}", "object": "chat.completion", "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": 1500, "completion_tokens": 60, "total_tokens": 1560},
+        })
+
+    async def github(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        if self.inject_block:
+            time.sleep(self.inject_block)  # намеренно синхронно: так выглядит блокирующий вызов
+        path = request.url.path.split("/contents/", 1)[-1]
+        if request.method == "GET":
+            if path not in self.files:
+                return httpx.Response(404, json={"message": "Not Found"})
+            content = base64.b64encode(self.files[path].encode()).decode()
+            return httpx.Response(200, json={"sha": str(hash(self.files[path])), "content": content})
+        if request.method == "PUT":
+            content = base64.b64decode(json.loads(request.content)["content"]).decode()
+            self.files[path] = content
+            return httpx.Response(201, json={"content": {"sha": str(hash(content))}})
+        return httpx.Response(405)
+
+
+async def run(args) -> LoopWatchdog:
+    upstream = Upstream(args.latency_ms / 1000, args.inject_block_ms / 1000)
+    openai_http = httpx.AsyncClient(transport=httpx.MockTransport(upstream.openai))
+    transcriber = WhisperTranscriber(api_key="sk-check", http_client=openai_http)
+    vault = GitHubVaultService(
+        token="check", repo_owner="check", repo_name="vault", transport=httpx.MockTransport(upstream.github)
+    )
+    agent = VoiceNotesAgent(api_key="sk-check", vault_service=vault, http_client=openai_http)
+    # Как warm_up_openai в lifespan сервиса: импорт openai (~0.5 с) не на event loop
+    await asyncio.to_thread(lambda: (transcriber.client, agent.client))
+
+    watchdog = LoopWatchdog(threshold_ms=args.threshold_ms, interval_ms=args.interval_ms)
+    watchdog.start()
+    audio_dir = Path(args.audio_dir)
+    await asyncio.to_thread(audio_dir.mkdir, parents=True, exist_ok=True)
+
+    async def one_note(index: int) -> None:
+        audio_path = audio_dir / f"note-{index}.m4a"
+        await asyncio.to_thread(audio_path.write_bytes, b"\0" * 256 * 1024)
+        try:
+            transcription = await transcriber.transcribe_verbose(str(audio_path))
+            await agent.process_transcription(transcription.text)
+        finally:
+            await asyncio.to_thread(audio_path.unlink, missing_ok=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_note(i) for i in range(args.notes)))
+    # Последний heartbeat после конца прогона фиксирует блокировку в самом конце
+    await asyncio.sleep(watchdog.interval * 2)
+    await watchdog.stop()
+    print(f"⏱️  {args.notes} notes in {time.perf_counter() - started:.2f}s, "
+          f"{upstream.requests} OpenAI requests, {len(upstream.files)} vault files")
+    return watchdog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if the scripted pipeline blocks the event loop")
+    parser.add_argument("--notes", type=int, default=8, help="voice notes processed concurrently")
+    parser.add_argument("--threshold-ms", type=float, default=100.0, help="loop stall that counts as blocking")
+    parser.add_argument("--interval-ms", type=float, default=20.0, help="watchdog heartbeat period")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="simulated upstream API latency")
+    parser.add_argument("--inject-block-ms", type=float, default=0.0, help="blocking sleep in the GitHub stand-in")
+    parser.add_argument("--audio-dir", default="data/loop-check")
+    args = parser.parse_args()
+
+    watchdog = asyncio.run(run(args))
+    stats = watchdog.stats()
+    lag = stats["lag_ms"]
+    print(f"📈 loop lag p50 {lag['p50']} ms, p90 {lag['p90']} ms, p99 {lag['p99']} ms, "
+          f"max {lag['max']} ms ({lag['samples']} heartbeats)")
+
+    if not watchdog.blocks:
+        print(f"✅ event loop never blocked longer than {args.threshold_ms:.0f} ms")
+        return
+    print(f"❌ event loop blocked {stats['blocks_total']} time(s):")
+    for block in watchdog.blocks:
+        print(f"\n  {block['duration_ms']} ms in task {block['task'] or 'unknown'}")
+        print("".join(f"    {line}" for line in "".join(block["stack"]).splitlines(True)) or "    (no stack captured)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
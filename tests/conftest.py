@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# app.config требует ключи; тесты работают без сети
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("GITHUB_TOKEN", "test")
+os.environ.setdefault("GITHUB_REPO_OWNER", "test")
+os.environ.setdefault("GITHUB_REPO_NAME", "vault")
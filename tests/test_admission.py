@@ -0,0 +1,63 @@
+"""Отмена запроса, ждущего слот стадии, не должна оставлять слот занятым."""
+
+import asyncio
+
+import pytest
+
+from app.services.admission import Overloaded, Stage
+
+
+async def _cancel_waiter_as_slot_frees(stage: Stage, ticks: int) -> asyncio.Task:
+    """Держатель освобождает слот, через ticks итераций цикла ждущий запрос отменяется."""
+    release, never = asyncio.Event(), asyncio.Event()
+
+    async def holder():
+        async with stage.slot():
+            await release.wait()
+
+    async def waiter():
+        async with stage.slot():
+            await never.wait()
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    second = asyncio.create_task(waiter())
+    await asyncio.sleep(0.01)
+    release.set()
+    for _ in range(ticks):
+        await asyncio.sleep(0)
+    second.cancel()
+    await asyncio.wait([first, second], timeout=0.1)
+    return second
+
+
+@pytest.mark.parametrize("ticks", range(5))
+def test_cancelled_waiter_releases_slot(ticks):
+    async def scenario():
+        stage = Stage("agent", 1, max_wait_seconds=5)
+        waiter = await _cancel_waiter_as_slot_frees(stage, ticks)
+        assert waiter.cancelled()
+        # Слот свободен: следующий запрос получает его сразу
+        async with asyncio.timeout(1):
+            async with stage.slot():
+                pass
+        return stage
+
+    stage = asyncio.run(scenario())
+    assert stage.in_flight == 0 and stage.waiting == 0
+
+
+def test_wait_timeout_returns_503():
+    async def scenario():
+        stage = Stage("agent", 1, max_wait_seconds=0.05)
+        async with stage.slot():
+            with pytest.raises(Overloaded) as error:
+                async with stage.slot():
+                    pass
+        assert error.value.status_code == 503
+        async with stage.slot():
+            pass
+        return stage
+
+    stage = asyncio.run(scenario())
+    assert stage.timed_out == 1 and stage.in_flight == 0
@@ -0,0 +1,82 @@
+"""Breaker OpenAI, открывшийся после tool call: задание не повторяется и записи не дублируются."""
+
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+
+from app.services.agent import VoiceNotesAgent
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.github_vault import GitHubVaultService
+from app.services.job_queue import DONE, JobQueue, JobWorkerPool
+
+
+class Upstream:
+    """OpenAI: первая итерация — add_todo_task, после неё breaker открывается. GitHub: файлы в памяти."""
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.files: dict[str, str] = {}
+        self.completions = 0
+
+    async def openai(self, request: httpx.Request) -> httpx.Response:
+        self.completions += 1
+        body = json.loads(request.content)
+        # OpenAI «падает» сразу после ответа с tool call
+        self.breaker._open(time.monotonic())
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "tool_calls", "message": {
+                "role": "assistant", "content": None,
+                "tool_calls": [{"id": "call_1", "type": "function", "function": {
+                    "name": "add_todo_task", "arguments": json.dumps({"task": "Купить молоко"}, ensure_ascii=False)
+                }}],
+            }}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+        })
+
+    async def github(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split("/contents/", 1)[-1]
+        if request.method == "GET":
+            if path not in self.files:
+                return httpx.Response(404, json={"message": "Not Found"})
+            content = base64.b64encode(self.files[path].encode()).decode()
+            return httpx.Response(200, json={"sha": str(hash(self.files[path])), "content": content})
+        self.files[path] = base64.b64decode(json.loads(request.content)["content"]).decode()
+        return httpx.Response(201, json={"content": {"sha": str(hash(self.files[path]))}})
+
+
+def test_breaker_opening_after_tool_call_does_not_repeat_writes(tmp_path):
+    breaker = CircuitBreaker("openai", open_seconds=60)
+    upstream = Upstream(breaker)
+    vault = GitHubVaultService("test", "test", "vault", transport=httpx.MockTransport(upstream.github))
+    agent = VoiceNotesAgent(
+        api_key="sk-test", vault_service=vault, breaker=breaker,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(upstream.openai))
+    )
+    queue = JobQueue(tmp_path / "jobs.db")
+
+    async def handler(job):
+        return await agent.process_transcription("Купить молоко")
+
+    async def scenario():
+        pool = JobWorkerPool(queue, handler, workers=1, poll_seconds=0.05)
+        await pool.start()
+        job = await pool.submit("memo.m4a", "memo.m4a")
+        for _ in range(100):
+            if queue.get(job["id"])["status"] == DONE:
+                break
+            await asyncio.sleep(0.02)
+        await pool.stop()
+        return pool, queue.get(job["id"])
+
+    pool, job = asyncio.run(scenario())
+    queue.close()
+
+    assert job["status"] == DONE and pool.deferred == 0
+    assert [a["function"] for a in job["result"]["actions"]] == ["add_todo_task"]
+    assert "недоступен" in job["result"]["summary"]
+    assert upstream.completions == 1
+    assert upstream.files["TODO.md"].count("Купить молоко") == 1
@@ -0,0 +1,105 @@
+"""Batch создание событий: пересечения внутри запроса, один запрос free/busy, отказ breaker."""
+
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.agent import VoiceNotesAgent
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.free_busy import FreeBusyService
+from app.tools.calendar_tools import create_calendar_events
+
+TZ = ZoneInfo("Europe/Berlin")
+
+
+class FakeCalendar:
+    timezone = "Europe/Berlin"
+
+    def __init__(self, busy=(), results=None):
+        self.busy = list(busy)
+        self.results = results
+        self.created: list[dict] = []
+        self.free_busy_queries = 0
+        self.free_busy = None
+
+    async def query_free_busy(self, start, end):
+        self.free_busy_queries += 1
+        return [(s, e) for s, e in self.busy if s < end and e > start]
+
+    async def create_events(self, events: list[dict]) -> list:
+        if isinstance(self.results, Exception):
+            raise self.results
+        self.created.extend(events)
+        return self.results or [{"id": str(i)} for i in range(len(events))]
+
+
+def test_overlapping_events_in_one_batch_are_not_both_created():
+    calendar = FakeCalendar()
+    events = [
+        {"title": "Созвон", "start_date": "2026-11-20 10:00", "duration_minutes": 60},
+        {"title": "Встреча", "start_date": "2026-11-20 10:30", "duration_minutes": 30},
+        {"title": "Обед", "start_date": "2026-11-20 11:00", "duration_minutes": 60},
+        {"title": "Ревью", "start_date": "2026-11-20 11:30", "duration_minutes": 30, "force": True},
+    ]
+
+    messages = asyncio.run(create_calendar_events(events=events, calendar=calendar))
+
+    assert [e["summary"] for e in calendar.created] == ["Созвон", "Обед", "Ревью"]
+    assert messages[1].startswith("⚠️ Событие 'Встреча' НЕ создано") and "'Созвон'" in messages[1]
+    assert "создано в календаре" in messages[0] and "создано в календаре" in messages[2]
+    assert "создано в календаре" in messages[3]
+
+
+def test_batch_checks_free_busy_with_one_query():
+    calendar = FakeCalendar(busy=[(datetime(2026, 11, 27, 14, 0, tzinfo=TZ), datetime(2026, 11, 27, 15, 0, tzinfo=TZ))])
+    calendar.free_busy = FreeBusyService(calendar, horizon_days=1)
+    events = [
+        {"title": "Созвон", "start_date": "2026-11-20 10:00"},
+        {"title": "Встреча", "start_date": "2026-11-27 14:30"},
+        {"title": "Ужин", "start_date": "2026-11-27 19:00"},
+    ]
+
+    messages = asyncio.run(create_calendar_events(events=events, calendar=calendar))
+
+    # Окно от первого начала до последнего конца — неделя, но запрос один
+    assert calendar.free_busy_queries == 1
+    assert [e["summary"] for e in calendar.created] == ["Созвон", "Ужин"]
+    assert messages[1].startswith("⚠️ Событие 'Встреча' НЕ создано") and "время занято" in messages[1]
+
+
+def test_batch_error_text_has_single_prefix():
+    calendar = FakeCalendar(results=[Exception("Ошибка создания события: quota"), {"id": "1"}])
+    events = [
+        {"title": "Созвон", "start_date": "2026-11-20 10:00"},
+        {"title": "Обед", "start_date": "2026-11-20 13:00"},
+    ]
+
+    messages = asyncio.run(create_calendar_events(events=events, calendar=calendar))
+
+    assert messages[0] == "Ошибка создания события: quota"
+
+
+def test_open_breaker_gives_unavailable_result_for_every_call():
+    calendar = FakeCalendar(results=CircuitOpenError("google_calendar", 30))
+    events = [
+        {"title": "Созвон", "start_date": "2026-11-20 10:00"},
+        {"title": "Обед", "start_date": "2026-11-20 13:00"},
+    ]
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(create_calendar_events(events=events, calendar=calendar))
+
+    agent = VoiceNotesAgent(api_key="sk-test", vault_service=None, calendar_service=calendar)
+    calls = [
+        SimpleNamespace(id=f"call_{i}", function=SimpleNamespace(
+            name="create_calendar_event", arguments=json.dumps(args, ensure_ascii=False)
+        ))
+        for i, args in enumerate(events)
+    ]
+    results = asyncio.run(agent._create_events_batch(calls))
+
+    assert set(results) == {"call_0", "call_1"}
+    assert all(r.startswith("❌ Сервис google_calendar временно недоступен") for r in results.values())
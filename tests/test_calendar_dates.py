@@ -0,0 +1,81 @@
+"""Даты в инструментах календаря: диапазон задаёт длительность, неоднозначное отклоняется, день без сдвига."""
+
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.date_parser import parse_date
+from app.tools.calendar_tools import (
+    create_calendar_event,
+    create_calendar_events,
+    list_calendar_events,
+    parse_russian_date,
+)
+
+TZ = ZoneInfo("Europe/Berlin")
+WEEKDAYS = ["понедельник", "вторник", "среду", "четверг", "пятницу", "субботу", "воскресенье"]
+
+
+class FakeCalendar:
+    timezone = "Europe/Berlin"
+    free_busy = None
+
+    def __init__(self):
+        self.created: list[dict] = []
+        self.listed: list[tuple] = []
+
+    async def create_event(self, summary, start_datetime, end_datetime, description=None, location=None):
+        self.created.append({"summary": summary, "start": start_datetime, "end": end_datetime})
+
+    async def create_events(self, events: list[dict]) -> list:
+        self.created.extend(events)
+        return [{"id": str(i)} for i in range(len(events))]
+
+    async def list_events_between(self, start, end):
+        self.listed.append((start, end))
+        return []
+
+
+def test_range_in_start_date_sets_duration():
+    calendar = FakeCalendar()
+
+    message = asyncio.run(create_calendar_event(title="Созвон", start_date="завтра с 10 до 12", calendar=calendar))
+
+    event = calendar.created[0]
+    assert event["end"] - event["start"] == timedelta(hours=2)
+    assert "(длительность: 120 мин)" in message
+
+
+def test_explicit_duration_wins_over_range_in_batch():
+    calendar = FakeCalendar()
+    events = [
+        {"title": "Созвон", "start_date": "завтра с 10 до 12"},
+        {"title": "Обед", "start_date": "завтра с 13 до 14", "duration_minutes": 30},
+    ]
+
+    asyncio.run(create_calendar_events(events=events, calendar=calendar))
+
+    durations = [e["end_datetime"] - e["start_datetime"] for e in calendar.created]
+    assert durations == [timedelta(hours=2), timedelta(minutes=30)]
+
+
+def test_low_confidence_date_is_rejected():
+    with pytest.raises(ValueError, match="неоднозначна"):
+        parse_russian_date("в выходные вечером")
+
+    calendar = FakeCalendar()
+    message = asyncio.run(create_calendar_event(title="Кино", start_date="в выходные вечером", calendar=calendar))
+    assert message.startswith("Ошибка создания события") and not calendar.created
+
+
+def test_for_day_keeps_todays_weekday():
+    wednesday_noon = datetime(2026, 1, 14, 12, 0, tzinfo=TZ)
+    assert parse_date("в среду", wednesday_noon).start.date() == datetime(2026, 1, 21).date()
+    assert parse_date("в среду", wednesday_noon, for_day=True).start.date() == wednesday_noon.date()
+
+    calendar = FakeCalendar()
+    today = datetime.now(TZ)
+    asyncio.run(list_calendar_events(date=f"в {WEEKDAYS[today.weekday()]}", calendar=calendar))
+    assert calendar.listed[0][0].date() == today.date()
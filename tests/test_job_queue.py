@@ -0,0 +1,39 @@
+"""Задание, отклонённое открытым breaker, откладывается, а не падает."""
+
+import asyncio
+
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.job_queue import DONE, QUEUED, JobQueue, JobWorkerPool
+
+
+def test_circuit_open_job_is_deferred_and_retried(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.db")
+    calls = []
+
+    async def handler(job):
+        calls.append(job["attempts"])
+        if len(calls) == 1:
+            raise CircuitOpenError("openai", 0.2)
+        return {"ok": True}
+
+    async def scenario():
+        pool = JobWorkerPool(queue, handler, workers=1, poll_seconds=0.05)
+        await pool.start()
+        job = await pool.submit("memo.m4a", "memo.m4a")
+        await asyncio.sleep(0.1)
+        deferred = queue.get(job["id"])
+        for _ in range(50):
+            if queue.get(job["id"])["status"] == DONE:
+                break
+            await asyncio.sleep(0.05)
+        await pool.stop()
+        return pool, deferred, queue.get(job["id"])
+
+    pool, deferred, done = asyncio.run(scenario())
+    queue.close()
+
+    # Сначала задание ждёт в очереди (retry_after ещё не прошёл), потом выполняется
+    assert deferred["status"] == QUEUED and "openai" in deferred["error"] and deferred["run_after"]
+    assert done["status"] == DONE and done["result"] == {"ok": True}
+    assert calls == [1, 1]
+    assert pool.deferred == 1 and pool.failed == 0 and pool.completed == 1
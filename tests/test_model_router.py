@@ -0,0 +1,26 @@
+"""Понижение медленной модели не должно быть навсегда: её задержки устаревают."""
+
+from app.services import model_router
+from app.services.model_router import ModelRouter
+
+
+def test_demoted_model_is_retried_after_latency_window(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: clock[0])
+    router = ModelRouter(latency_budget_seconds=8.0, min_samples=5, latency_window_seconds=300)
+
+    for _ in range(5):
+        router.latency.record("gpt-4o-mini", 20.0)
+        router.latency.record("gpt-4o", 3.0)
+    assert router.route("Купить молоко").model == "gpt-4o"
+
+    # Быстрая модель больше не получает вызовов; сильная продолжает
+    clock[0] += 200
+    for _ in range(5):
+        router.latency.record("gpt-4o", 3.0)
+    assert router.route("Купить молоко").model == "gpt-4o"
+
+    clock[0] += 150
+    decision = router.route("Купить молоко")
+    assert decision.model == "gpt-4o-mini" and decision.reason == "simple"
+    assert router.latency.samples("gpt-4o-mini") == 0
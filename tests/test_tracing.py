@@ -0,0 +1,38 @@
+"""Параллельные запросы с одним входящим traceparent не смешивают свои спаны."""
+
+import asyncio
+
+from app.services.tracing import Tracer
+
+TRACEPARENT = "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+
+
+class ListExporter:
+    def __init__(self):
+        self.batches: list[list] = []
+
+    def export(self, spans) -> None:
+        self.batches.append(spans)
+
+
+def test_concurrent_roots_with_same_traceparent_keep_their_spans():
+    tracer = Tracer()
+    exporter = ListExporter()
+    tracer.configure([exporter])
+    tracer.start()
+
+    async def request(name: str):
+        with tracer.span(f"request.{name}", traceparent=TRACEPARENT):
+            await asyncio.sleep(0.01)
+            with tracer.span(f"agent.{name}"):
+                await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(request("a"), request("b"))
+
+    asyncio.run(scenario())
+    tracer.shutdown()
+
+    batches = sorted(sorted(span.name for span in batch) for batch in exporter.batches)
+    assert batches == [["agent.a", "request.a"], ["agent.b", "request.b"]]
+    assert {span.trace_id for batch in exporter.batches for span in batch} == {"ab" * 16}
@@ -0,0 +1,163 @@
+"""Batch commits (BufferedVault.flush -> commit_files) must not overwrite writes made after the read."""
+
+import asyncio
+import base64
+import hashlib
+import json
+
+import httpx
+
+from app.cli import FAILED, BulkImporter, Checkpoint
+from app.services.github_vault import GitHubVaultService
+from app.services.vault_batch import BufferedVault
+from app.tools.todo_tools import INITIAL_TODO_TEMPLATE, add_todo_task
+
+
+class FakeGitHub:
+    """Contents API и Git Data API одного репозитория в памяти (ветка main)."""
+
+    def __init__(self, files: dict[str, str]):
+        self.commits: dict[str, dict] = {}
+        self.trees: dict[str, dict[str, str]] = {}
+        self.head = self._commit(dict(files), parent=None)
+
+    @staticmethod
+    def _sha(*parts: str) -> str:
+        return hashlib.sha1("\0".join(parts).encode()).hexdigest()
+
+    def blob_sha(self, content: str) -> str:
+        return self._sha("blob", content)
+
+    def _tree(self, files: dict[str, str]) -> str:
+        sha = self._sha("tree", json.dumps(files, sort_keys=True))
+        self.trees[sha] = files
+        return sha
+
+    def _commit(self, files: dict[str, str], parent: str | None) -> str:
+        tree = self._tree(files)
+        sha = self._sha("commit", tree, parent or "", str(len(self.commits)))
+        self.commits[sha] = {"tree": tree, "parent": parent}
+        return sha
+
+    def files(self, commit: str | None = None) -> dict[str, str]:
+        return self.trees[self.commits[commit or self.head]["tree"]]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split("/repos/test/vault/", 1)[1]
+        body = json.loads(request.content) if request.content else {}
+
+        if path.startswith("contents/"):
+            name = path[len("contents/"):]
+            if request.method == "GET":
+                ref = request.url.params.get("ref", "main")
+                files = self.files(None if ref == "main" else ref)
+                if name not in files:
+                    return httpx.Response(404, json={"message": "Not Found"})
+                content = base64.b64encode(files[name].encode()).decode()
+                return httpx.Response(200, json={"sha": self.blob_sha(files[name]), "content": content})
+            # PUT: коммит одного файла, как /api/voice через Contents API
+            files = dict(self.files())
+            if body.get("sha") != (self.blob_sha(files[name]) if name in files else None):
+                return httpx.Response(409, json={"message": "sha mismatch"})
+            files[name] = base64.b64decode(body["content"]).decode()
+            self.head = self._commit(files, parent=self.head)
+            return httpx.Response(200, json={"content": {"sha": self.blob_sha(files[name])}})
+
+        if path == "git/ref/heads/main":
+            return httpx.Response(200, json={"object": {"sha": self.head}})
+        if path.startswith("git/commits/"):
+            return httpx.Response(200, json={"tree": {"sha": self.commits[path.rsplit("/", 1)[1]]["tree"]}})
+        if path == "git/trees":
+            files = dict(self.trees[body["base_tree"]])
+            files.update({entry["path"]: entry["content"] for entry in body["tree"]})
+            return httpx.Response(201, json={"sha": self._tree(files)})
+        if path == "git/commits":
+            tree = body["tree"]
+            sha = self._sha("commit", tree, body["parents"][0], str(len(self.commits)))
+            self.commits[sha] = {"tree": tree, "parent": body["parents"][0]}
+            return httpx.Response(201, json={"sha": sha})
+        if path == "git/refs/heads/main":
+            if self.commits[body["sha"]]["parent"] != self.head:
+                return httpx.Response(422, json={"message": "Update is not a fast forward"})
+            self.head = body["sha"]
+            return httpx.Response(200, json={"object": {"sha": self.head}})
+        return httpx.Response(404)
+
+
+def make_vault(github: FakeGitHub) -> GitHubVaultService:
+    return GitHubVaultService("test", "test", "vault", transport=httpx.MockTransport(github.handle))
+
+
+async def concurrent_voice_write(vault: GitHubVaultService, line: str) -> None:
+    """Запись отдельного запроса /api/voice мимо буфера."""
+    current = await vault.get_file("TODO.md")
+    await vault.update_file("TODO.md", current.content + line, current.sha, "Concurrent voice note")
+
+
+def test_flush_commits_buffered_writes():
+    github = FakeGitHub({"TODO.md": "# TODO\n"})
+    vault = make_vault(github)
+
+    async def scenario():
+        buffer = BufferedVault(vault)
+        todo = await buffer.get_file("TODO.md")
+        await buffer.update_file("TODO.md", todo.content + "- [ ] batch\n", todo.sha, "Batch task")
+        return await buffer.flush("Voice batch")
+
+    assert asyncio.run(scenario()) == github.head
+    assert github.files()["TODO.md"] == "# TODO\n- [ ] batch\n"
+
+
+def test_flush_rejects_file_changed_after_read():
+    github = FakeGitHub({"TODO.md": "# TODO\n"})
+    vault = make_vault(github)
+
+    async def scenario():
+        buffer = BufferedVault(vault)
+        todo = await buffer.get_file("TODO.md")
+        await buffer.update_file("TODO.md", todo.content + "- [ ] batch\n", todo.sha, "Batch task")
+        await concurrent_voice_write(vault, "- [ ] concurrent\n")
+        try:
+            await buffer.flush("Voice batch")
+        except Exception as e:
+            return str(e)
+        return None
+
+    error = asyncio.run(scenario())
+    assert error is not None and "Конфликт" in error
+    # Запись параллельного запроса не затёрта содержимым из буфера
+    assert github.files()["TODO.md"] == "# TODO\n- [ ] concurrent\n"
+
+
+class _Transcriber:
+    async def transcribe(self, path: str) -> str:
+        return "Купить молоко"
+
+
+class _Agent:
+    """Агент без LLM: одна задача в TODO.md через настоящий tool."""
+
+    async def process_transcription(self, transcription: str, vault=None) -> dict:
+        return {"summary": await add_todo_task(task=transcription, vault=vault)}
+
+
+def test_bulk_import_marks_notes_failed_when_file_changed_before_flush(tmp_path):
+    github = FakeGitHub({"TODO.md": INITIAL_TODO_TEMPLATE})
+    vault = make_vault(github)
+    checkpoint = Checkpoint(tmp_path / "import.jsonl")
+    importer = BulkImporter(_Transcriber(), _Agent(), None, vault, checkpoint, commit_every=100)
+    audio = tmp_path / "memo.m4a"
+    audio.write_bytes(b"\0")
+
+    async def scenario():
+        await importer.process(audio, "memo")
+        await concurrent_voice_write(vault, "- [ ] concurrent\n")
+        await importer.flush()
+
+    asyncio.run(scenario())
+    checkpoint.close()
+
+    state = checkpoint.get("memo")
+    assert state["stage"] == FAILED and "vault commit" in state["error"]
+    todo = github.files()["TODO.md"]
+    assert "- [ ] concurrent" in todo and "Купить молоко" not in todo